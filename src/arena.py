@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import os
+import json
+import math
+import time
+import threading
+
+import numpy as np
+
+from config import ArenaConfig
+from inference import InferenceServer
+from mcts import SearchSession, build_backend, get_mcts_cls
+from registry import ModelRegistry
+from utils import switch_player
+
+
+def wilson_interval(score, num_games, z=1.96):
+    """The Wilson score interval of a win rate, where a draw counts as half a win."""
+    if num_games == 0:
+        return 0.0, 1.0
+    denominator = 1 + z ** 2 / num_games
+    center = (score + z ** 2 / (2 * num_games)) / denominator
+    half_width = z * math.sqrt(score * (1 - score) / num_games + z ** 2 / (4 * num_games ** 2)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def score_to_elo(score, num_games):
+    """The Elo difference implied by a score, which is clipped by half a game so that it stays finite."""
+    eps = 0.5 / max(1, num_games)
+    score = min(max(score, eps), 1 - eps)
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(wins, draws, losses):
+    """The score of a match with its confidence interval, both as a win rate and as an Elo difference."""
+    num_games = wins + draws + losses
+    score = (wins + 0.5 * draws) / num_games if num_games else 0.5
+    low, high = wilson_interval(score, num_games)
+    return {'wins': wins, 'draws': draws, 'losses': losses, 'score': score, 'score_ci': [low, high],
+            'elo': score_to_elo(score, num_games),
+            'elo_ci': [score_to_elo(low, num_games), score_to_elo(high, num_games)]}
+
+
+class Arena(object):
+    """
+    Plays matches between two evaluators with deterministic search and no noise.
+
+    num_concurrent_games games are played by as many threads at once and the network inputs of each model are
+    batched across the games by one InferenceServer per model. Every game starts with num_opening_moves random moves,
+    otherwise all the games with the same colors would be the same, and every opening is played twice with the
+    colors swapped.
+    """
+
+    def __init__(self, config, evaluator_a, evaluator_b, prunings=None):
+        """
+        :param config: an instance of the ArenaConfig class
+        :param evaluator_a: the evaluator of the first model, e.g. InferenceServer.evaluate
+        :param evaluator_b: the evaluator of the second model
+        :param prunings: the pruning modes of MCTS of the two models, config.pruning for both by default
+        """
+        self.config = config
+        self.evaluators = (evaluator_a, evaluator_b)
+        self.prunings = (config.pruning, config.pruning) if prunings is None else tuple(prunings)
+
+    def build_session(self, evaluator, pruning=None):
+        config = self.config
+        mcts = get_mcts_cls(config)(config.board_size, strategy='deterministically', c_puct=config.c_puct,
+                                    add_noise=False, num_parallel_leaves=config.num_parallel_leaves,
+                                    evaluator=evaluator, pruning=pruning, pruning_radius=config.pruning_radius)
+        return SearchSession(mcts, config.history_len_per_player)
+
+    def get_openings(self, num_pairs):
+        rng = np.random.RandomState(self.config.seed)
+        num_actions = self.config.board_size ** 2
+        return [rng.choice(num_actions, self.config.num_opening_moves, replace=False).tolist()
+                for _ in range(num_pairs)]
+
+    def play_game(self, sessions, a_is_black, opening):
+        """Play one game between the sessions of the two models.
+
+        :param sessions: the search sessions of the first and the second model
+        :param a_is_black: true if the first model plays black
+        :param opening: the moves the game starts with
+        :return: 1 if the first model wins, -1 if it loses and 0 for a draw
+        """
+        for session in sessions:
+            session.reset()
+        players = {1: sessions[0] if a_is_black else sessions[1], 2: sessions[1] if a_is_black else sessions[0]}
+        board = sessions[0].board
+
+        player_id = 1
+        for num_moves in range(self.config.board_size ** 2):
+            if num_moves < len(opening):
+                action = opening[num_moves]
+            else:
+                action, _ = players[player_id].search(self.config.num_simulations, early_stop=self.config.early_stop)
+
+            # both trees follow every move, so each model reuses its search below the reply of the other one
+            for session in sessions:
+                session.advance(action)
+            if board.winning_flag:
+                return 1 if (player_id == 1) == a_is_black else -1
+            player_id = switch_player(player_id)
+        return 0
+
+    def play_match(self, num_games=None):
+        """Play num_games games, config.num_games by default, and return the summary of the first model."""
+        config = self.config
+        num_games = config.num_games if num_games is None else num_games
+        openings = self.get_openings((num_games + 1) // 2)
+        games = [(idx % 2 == 0, openings[idx // 2]) for idx in range(2 * len(openings))]
+
+        results = []
+        lock = threading.Lock()
+
+        def play():
+            sessions = [self.build_session(evaluator, pruning)
+                        for evaluator, pruning in zip(self.evaluators, self.prunings)]
+            while 1:
+                with lock:
+                    if not games:
+                        return
+                    a_is_black, opening = games.pop()
+                result = self.play_game(sessions, a_is_black, opening)
+                with lock:
+                    results.append(result)
+
+        tik = time.time()
+        t_list = [threading.Thread(target=play, name='arena_{idx}'.format(idx=idx), daemon=True)
+                  for idx in range(config.num_concurrent_games)]
+        for t in t_list:
+            t.start()
+        for t in t_list:
+            t.join()
+        elapsed = time.time() - tik
+
+        summary = summarize(results.count(1), results.count(0), results.count(-1))
+        summary['games_per_hour'] = len(results) / elapsed * 3600
+        return summary
+
+
+def build_inference_server(config, registry, version):
+    """An inference server running the given version, or random weights for version -1."""
+    backend, batch_size = build_backend(config)
+    if version >= 0:
+        backend.load_state_dict(registry.load(version), version)
+    server = InferenceServer(backend, batch_size, max_wait=config.max_wait)
+    server.start()
+    return server
+
+
+def evaluate_versions(config, registry, version_a, version_b):
+    """Play a match between two versions of the registry and return the summary of version_a."""
+    servers = [build_inference_server(config, registry, version) for version in (version_a, version_b)]
+    try:
+        summary = Arena(config, servers[0].evaluate, servers[1].evaluate).play_match()
+    finally:
+        for server in servers:
+            server.stop()
+    summary.update({'version': version_a, 'opponent': version_b, 'time': time.time()})
+    return summary
+
+
+def compare_pruning(config, registry, version, pruning):
+    """Play a version with a pruning mode against itself without pruning and return the summary of the pruned side.
+
+    Both sides share one inference server, as they run the same weights.
+    """
+    server = build_inference_server(config, registry, version)
+    try:
+        summary = Arena(config, server.evaluate, server.evaluate, prunings=(pruning, None)).play_match()
+    finally:
+        server.stop()
+    summary.update({'version': version, 'pruning': pruning, 'opponent_pruning': None, 'time': time.time()})
+    return summary
+
+
+def run_arena(config):
+    """Evaluate every new version published to config.model_dir against the best version, forever.
+
+    Without gating every new version is promoted after its match, so each version is compared with the previous
+    one. With config.gate_score, a new version is only promoted if it scores at least gate_score.
+    """
+    registry = ModelRegistry(config.model_dir)
+    if os.path.dirname(config.log_path):
+        os.makedirs(os.path.dirname(config.log_path), exist_ok=True)
+
+    last_version = registry.best_version()
+    while 1:
+        best_version = registry.best_version()
+        version = registry.latest_version()
+        if version == last_version or version < 0:
+            time.sleep(config.poll_interval)
+            continue
+
+        # before any promotion, best_version is -1, i.e. the first version plays against random weights
+        summary = evaluate_versions(config, registry, version, best_version)
+        summary['promoted'] = config.gate_score is None or summary['score'] >= config.gate_score
+        if summary['promoted']:
+            registry.promote(version)
+        last_version = version
+
+        print('version {version} vs {opponent}: score {score:.3f} [{low:.3f}, {high:.3f}], elo {elo:+.0f}, '
+              '{gph:.0f} games/hour, promoted: {promoted}'
+              .format(low=summary['score_ci'][0], high=summary['score_ci'][1], gph=summary['games_per_hour'],
+                      **summary))
+        with open(config.log_path, 'a') as f:
+            f.write(json.dumps(summary) + '\n')
+
+
+if __name__ == '__main__':
+
+    config = ArenaConfig()
+    run_arena(config)
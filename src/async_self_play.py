@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from board import Board
+from registry import ModelRegistry
+from transposition import EvaluationCache
+from utils import switch_player
+from instrument import Stats
+from mcts import (get_mcts_cls, change_sampling_strategy, collect_self_play_data, init_history, build_backend,
+                  build_shard_writer, build_reporter, build_profiler)
+
+
+class AsyncBatcher(object):
+    """
+    Gathers the network inputs awaited by many coroutines into batches, which run in an executor thread so that the
+    event loop keeps selecting leaves during a forward pass.
+
+    A batch is run as soon as it is full or its oldest input has waited for max_wait seconds. Its size, its latency,
+    the queue wait of its inputs and the number of inputs still pending when it starts, i.e. the backpressure of the
+    searches on the network, are recorded in stats.
+    """
+
+    def __init__(self, backend, batch_size, max_wait=0.005, stats=None):
+        """
+        :param backend: a callable mapping a batch of network inputs to probs and v, e.g. an InferenceBackend
+        :param batch_size: the max number of inputs in one forward pass
+        :param max_wait: the max seconds an input waits for the batch to fill up
+        :param stats: an instance of the Stats class to record the metrics of every batch in, None for no metrics
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stats = stats
+
+        self.num_batches = 0
+        self.num_samples = 0
+
+        self._pending = []  # (x, future, submit time)
+        self._has_pending = None
+        self._is_full = None
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='async_batcher')
+
+    @property
+    def num_pending(self):
+        """The number of inputs waiting for a forward pass."""
+        return len(self._pending)
+
+    async def evaluate(self, xs):
+        """Evaluate a batch of inputs together with the inputs of the other coroutines.
+
+        :return: probs with shape (len(xs), num_actions) and v with shape (len(xs),) as numpy arrays
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for x in xs:
+            future = loop.create_future()
+            self._pending.append((x, future, loop.time()))
+            futures.append(future)
+        self._has_pending.set()
+        if len(self._pending) >= self.batch_size:
+            self._is_full.set()
+
+        res = await asyncio.gather(*futures)
+        return np.stack([each[0] for each in res]), np.array([each[1] for each in res])
+
+    def start(self):
+        """Start the batching task on the running event loop and return it."""
+        self._has_pending, self._is_full = asyncio.Event(), asyncio.Event()
+        return asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while 1:
+            await self._has_pending.wait()
+            if not self._pending:
+                break  # stopped and nothing left
+
+            # wait until the batch is full or the oldest input has waited for max_wait
+            while len(self._pending) < self.batch_size and not self._stopped:
+                remaining = self._pending[0][2] + self.max_wait - loop.time()
+                if remaining <= 0:
+                    break
+                self._is_full.clear()
+                try:
+                    await asyncio.wait_for(self._is_full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            if not self._pending and not self._stopped:
+                self._has_pending.clear()
+            self._is_full.clear()
+
+            xs, futures, submit_times = zip(*batch)
+            tik = loop.time()
+            try:
+                probs, v = await loop.run_in_executor(self._executor, self.backend, np.stack(xs))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            if self.stats is not None:
+                self.record(len(batch), submit_times, tik, loop.time())
+            self.num_batches += 1
+            self.num_samples += len(batch)
+            for i, future in enumerate(futures):
+                future.set_result((probs[i], v[i].item()))
+        self._executor.shutdown()
+
+    def record(self, batch_size, submit_times, start_time, end_time):
+        stats = self.stats
+        stats.count('evaluations', batch_size)
+        stats.add_time('forward', end_time - start_time)
+        stats.add_value('batch_size', batch_size)
+        stats.add_value('batch_latency', end_time - start_time)
+        stats.add_value('pending_leaves', len(self._pending))
+        for submit_time in submit_times:
+            stats.add_value('queue_wait', start_time - submit_time)
+
+    def stop(self):
+        """Stop the batching task once the inputs pending have been evaluated."""
+        self._stopped = True
+        self._has_pending.set()
+
+
+class AsyncSelfPlay(object):
+    """
+    Self-play of many games in one thread, where the search of every game is a coroutine which awaits the
+    evaluations of its leaves from an AsyncBatcher.
+
+    A coroutine switch only costs a few microseconds and no OS thread, so one process can hold thousands of games.
+    Unlike LockstepSelfPlay, the games do not wait for each other, a batch is formed from whichever leaves are
+    pending when the forward pass before it ends.
+    """
+
+    def __init__(self, config, backend=None, writer=None, stats=None, batch_size=None):
+        """
+        :param config: an instance of the SelfPlayConfig class
+        :param backend: the InferenceBackend evaluating the leaves, None to search with random priors and values
+        :param batch_size: the max number of inputs in one forward pass, config.batch_size by default
+        :param writer: an instance of the ShardWriter class the finished games go to, None to drop them
+        :param stats: an instance of the Stats class to count the moves and the games and to record the batches in,
+            None for a new one
+        """
+        self.config = config
+        self.backend = backend
+        self.writer = writer
+        self.stats = stats if stats is not None else Stats()
+
+        self.cache = EvaluationCache(config.cache_mb) if config.cache_mb > 0 else None
+        self.mcts = get_mcts_cls(config)(config.board_size, c_puct=config.c_puct, use_nn=backend is not None,
+                                         evaluator=backend, num_parallel_leaves=config.num_parallel_leaves,
+                                         cache=self.cache, symmetry=config.symmetry, pruning=config.pruning,
+                                         pruning_radius=config.pruning_radius,
+                                         stats=self.stats if config.instrument else None)
+        batch_size = config.batch_size if batch_size is None else batch_size
+        self.batcher = AsyncBatcher(backend, batch_size, max_wait=config.max_wait, stats=self.stats) \
+            if backend is not None else None
+        self.registry = ModelRegistry(config.model_dir)
+        self.version = backend.version if backend is not None else -1
+        self.num_started = 0
+        self.num_finished = 0
+
+    def run(self):
+        """Play until config.max_games games have been finished."""
+        asyncio.run(self.play_all())
+
+    async def play_all(self):
+        if self.batcher is None:
+            await asyncio.gather(*[self.play_games() for _ in range(self.config.num_async_games)])
+            return
+
+        batcher_task = self.batcher.start()
+        watch_task = asyncio.ensure_future(self.watch_models())
+        try:
+            await asyncio.gather(*[self.play_games() for _ in range(self.config.num_async_games)])
+        finally:
+            watch_task.cancel()
+            self.batcher.stop()
+            await batcher_task
+
+    async def watch_models(self):
+        """Swap every new version published to config.model_dir in, see watch_models."""
+        config, loop = self.config, asyncio.get_running_loop()
+        while 1:
+            version = self.registry.best_version() if config.follow_best_model else self.registry.latest_version()
+            if version != self.version and version >= 0:
+                state_dict = await loop.run_in_executor(None, self.registry.load, version)
+                # the weights are double buffered, so this only waits for the copy of the model
+                await loop.run_in_executor(None, self.backend.load_state_dict, state_dict, version)
+                self.version = version
+                if self.cache is not None:
+                    self.cache.clear()  # the outputs of the previous model
+            await asyncio.sleep(config.model_poll_interval)
+
+    async def play_games(self):
+        while self.num_started < self.config.max_games:
+            self.num_started += 1
+            await self.play_game(self.num_started)
+
+    async def evaluate(self, leaves):
+        mcts = self.mcts
+        if self.batcher is None:
+            return mcts.evaluate_batch(leaves.xs)
+        request = mcts.prepare_batch(leaves.xs, leaves.keys, leaves.transforms)
+        new_probs, new_v = await self.batcher.evaluate(request.inputs) if request.inputs else (None, None)
+        return mcts.finish_batch(request, new_probs, new_v)
+
+    async def search(self, root, board, history, num_simulations, full_search):
+        """Run num_simulations simulations from root, see MCTS.run_simulations.
+
+        :return: the number of simulations run
+        """
+        config, mcts = self.config, self.mcts
+        num_done = 0
+        while num_done < num_simulations and root.result is None:
+            if config.early_stop and not full_search and mcts.is_decided(root, num_simulations - num_done):
+                break
+
+            leaves = mcts.select_leaves(root, board, history, min(config.num_parallel_leaves,
+                                                                  num_simulations - num_done))
+            num_done += leaves.num_done
+            if leaves.paths:
+                probs, v = await self.evaluate(leaves)
+                # mcts is shared by all the games, so its settings are only changed with no await before their use
+                mcts.add_noise = full_search
+                mcts.expand_leaves(leaves, probs, v)
+                num_done += len(leaves.paths)
+
+        self.stats.count('simulations', num_done)
+        return num_done
+
+    async def play_game(self, game_id):
+        config, mcts, stats = self.config, self.mcts, self.stats
+        board = Board(config.board_size, zobrist=mcts.zobrist)
+        history = init_history(config.history_len_per_player, config.board_size)
+        player_id = 1  # 1 for black 2 for white
+        root = mcts.create_root(player_id)
+
+        num_moves = 0
+        num_saved_simulations = 0
+        xs, pis, player_ids, versions, moves = [], [], [], [], []
+        while 1:
+            # playout cap randomization, see self_play
+            full_search = np.random.random() < config.full_search_prob
+            num_done = await self.search(root, board, history,
+                                         config.num_simulations if full_search else config.num_fast_simulations,
+                                         full_search)
+            num_saved_simulations += config.num_simulations - num_done
+
+            change_sampling_strategy(mcts, config.strategy_change_point, num_moves)
+            action, root, pi = mcts.sample_actions(root)
+            root.parent = None
+            if full_search:
+                xs.append(collect_self_play_data(player_id, history))
+                pis.append(pi)
+                player_ids.append(player_id)
+                versions.append(self.version)
+                moves.append(num_moves)
+                stats.count('full_searches')
+
+            won = board.make_move(action, player_id)
+            history.push(player_id, action)
+            num_moves += 1
+            stats.count('moves')
+
+            if won:
+                self.num_finished += 1
+                stats.count('games')
+                stats.count('black_wins' if player_id == 1 else 'white_wins')
+                stats.count('saved_simulations', num_saved_simulations)
+                if self.cache is not None:
+                    stats.count('cache_hits', self.cache.hits - stats.counts['cache_hits'])
+                    stats.count('cache_lookups', self.cache.hits + self.cache.misses - stats.counts['cache_lookups'])
+
+                if self.writer is not None and xs:
+                    zs = np.where(np.array(player_ids) == player_id, 1, -1)
+                    self.writer.put(np.stack(xs), np.array(pis), zs, player_ids, game_id, versions, moves)
+                return
+            elif num_moves == config.max_moves:
+                return
+
+            player_id = switch_player(player_id)
+
+
+def run_async_self_play(config):
+    """Self-play of config.max_games games by config.num_async_games coroutines, see AsyncSelfPlay."""
+    writer = build_shard_writer(config)
+    reporter = build_reporter(config, 'self_play')
+    profiler = build_profiler(config)
+    backend, batch_size = build_backend(config)
+    driver = AsyncSelfPlay(config, backend, writer, stats=reporter.register(), batch_size=batch_size)
+
+    writer.start()
+    reporter.start()
+    if profiler is not None:
+        profiler.add_thread()
+        profiler.start()
+    driver.run()
+    writer.close()
+    reporter.stop()
+    if profiler is not None:
+        profiler.stop()
+        profiler.dump(config.profile_path)
+    return driver
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import os
+import json
+import time
+import platform
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+import numpy as np
+import torch
+
+from board import Board
+from config import SelfPlayConfig
+from inference import InferenceServer
+from mcts import MCTS, init_history, self_play, build_backend, build_shard_writer
+from native_mcts import NativeMCTS
+from lockstep import LockstepSelfPlay
+from async_self_play import AsyncSelfPlay
+
+
+class CountingEvaluator(object):
+    """Wraps an evaluator to count its calls and the inputs it evaluates."""
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.num_calls = 0
+        self.num_samples = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, xs):
+        with self._lock:
+            self.num_calls += 1
+            self.num_samples += len(xs)
+        return self.evaluator(xs)
+
+
+def count_expanded_nodes(node):
+    """The number of expanded nodes of the tree below an ArrayNode, including itself."""
+    num_nodes, stack = 0, [node]
+    while stack:
+        node = stack.pop()
+        if node.actions is not None:
+            num_nodes += 1
+            stack.extend(node.child_nodes.values())
+    return num_nodes
+
+
+def get_positions(board_size, history_len_per_player, num_positions, num_moves, seed):
+    """Positions after num_moves random moves as (state, history, player to move), with the empty board first."""
+    rng = np.random.RandomState(seed)
+    positions = []
+    for i in range(num_positions):
+        board = Board(board_size)
+        history = init_history(history_len_per_player, board_size)
+        player_id = 1
+        for action in rng.choice(board_size ** 2, num_moves if i else 0, replace=False):
+            board.make_move(int(action), player_id)
+            history.push(player_id, int(action))
+            player_id = 2 if player_id == 1 else 1
+        positions.append((board.state.copy(), history, player_id))
+    return positions
+
+
+def bench_search(config, evaluator, num_positions=8, num_opening_moves=6, seed=0, native=False):
+    """Simulations/sec, nodes expanded/sec and network evals/sec of MCTS from fixed positions, without self-play.
+
+    :param evaluator: the evaluator of MCTS, None for random priors
+    :param native: true to search with NativeMCTS, whose node count also holds the leaves pending or proven
+    """
+    np.random.seed(seed)
+    counter = CountingEvaluator(evaluator) if evaluator is not None else None
+    mcts_cls = NativeMCTS if native else MCTS
+    mcts = mcts_cls(config.board_size, c_puct=config.c_puct, use_nn=evaluator is not None, evaluator=counter,
+                    num_parallel_leaves=config.num_parallel_leaves)
+
+    num_simulations, num_expanded, elapsed = 0, 0, 0.0
+    for state, history, player_id in get_positions(config.board_size, config.history_len_per_player, num_positions,
+                                                   num_opening_moves, seed):
+        root = mcts.create_root(player_id)
+        tik = time.perf_counter()
+        # a search stops early once its root is proven
+        num_simulations += mcts.run_simulations(root, state, config.num_simulations, history)
+        elapsed += time.perf_counter() - tik
+        num_expanded += root.get_tree().num_nodes if native else count_expanded_nodes(root)
+
+    result = {'simulations_per_sec': num_simulations / elapsed, 'nodes_expanded_per_sec': num_expanded / elapsed,
+              'num_simulations': num_simulations, 'num_expanded': num_expanded, 'seconds': elapsed}
+    if counter is not None:
+        result['evals_per_sec'] = counter.num_samples / elapsed
+        result['batch_fill_ratio'] = counter.num_samples / (counter.num_calls * config.num_parallel_leaves)
+    return result
+
+
+def bench_inference(backend, batch_sizes=(1, 8, 32, 128), num_repeats=20):
+    """Network evals/sec of the forward pass alone for every batch size."""
+    results = {}
+    for batch_size in batch_sizes:
+        latency = backend.benchmark(batch_size, num_repeats=num_repeats)
+        results[str(batch_size)] = {'latency': latency, 'evals_per_sec': batch_size / latency}
+    return results
+
+
+def bench_self_play(config, backend=None, batch_size=None, seed=0):
+    """Games/hour of threaded self-play, with the evals/sec and the batch fill ratio of the inference server.
+
+    :param backend: the inference backend, None to play with random priors
+    """
+    np.random.seed(seed)
+    num_games = multiprocessing.Value('i', 0)
+    model_version = multiprocessing.Value('i', -1)
+    server = InferenceServer(backend, batch_size, max_wait=config.max_wait) if backend is not None else None
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        config.data_dir = data_dir
+        writer = build_shard_writer(config)
+        writer.start()
+        if server is not None:
+            server.start()
+        evaluator = server.evaluate if server is not None else None
+
+        tik = time.perf_counter()
+        t_list = [threading.Thread(target=self_play, args=(config, evaluator, num_games, writer, model_version),
+                                   daemon=True) for _ in range(config.num_threads)]
+        for t in t_list:
+            t.start()
+        for t in t_list:
+            t.join()
+        elapsed = time.perf_counter() - tik
+
+        if server is not None:
+            server.stop()
+        writer.close()
+
+    result = {'games_per_hour': num_games.value / elapsed * 3600, 'num_games': num_games.value,
+              'positions_per_sec': writer.num_records / elapsed, 'seconds': elapsed}
+    if server is not None:
+        result['evals_per_sec'] = server.num_samples / elapsed
+        result['batch_fill_ratio'] = server.num_samples / (server.num_batches * batch_size)
+    return result
+
+
+def bench_lockstep(config, backend=None, seed=0):
+    """Games/hour of self-play in lockstep with config.num_lockstep_games games, with the evals/sec and the mean
+    batch size of the forward passes.
+
+    :param backend: the inference backend, None to play with random priors
+    """
+    np.random.seed(seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        config.data_dir = config.model_dir = data_dir  # an empty registry, so the weights are never swapped
+        writer = build_shard_writer(config)
+        writer.start()
+        driver = LockstepSelfPlay(config, backend, writer)
+        counter = CountingEvaluator(backend) if backend is not None else None
+        if counter is not None:
+            driver.mcts.evaluator = counter
+
+        tik = time.perf_counter()
+        driver.run()
+        elapsed = time.perf_counter() - tik
+        writer.close()
+
+    result = {'games_per_hour': driver.num_finished / elapsed * 3600, 'num_games': driver.num_finished,
+              'positions_per_sec': writer.num_records / elapsed, 'seconds': elapsed}
+    if counter is not None:
+        result['evals_per_sec'] = counter.num_samples / elapsed
+        result['mean_batch_size'] = counter.num_samples / counter.num_calls
+    return result
+
+
+def bench_async(config, backend=None, batch_size=None, seed=0):
+    """Games/hour of self-play by config.num_async_games coroutines, with the evals/sec and the mean batch size of
+    the forward passes.
+
+    :param backend: the inference backend, None to play with random priors
+    """
+    np.random.seed(seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        config.data_dir = config.model_dir = data_dir  # an empty registry, so the weights are never swapped
+        writer = build_shard_writer(config)
+        writer.start()
+        driver = AsyncSelfPlay(config, backend, writer, batch_size=batch_size)
+
+        tik = time.perf_counter()
+        driver.run()
+        elapsed = time.perf_counter() - tik
+        writer.close()
+
+    result = {'games_per_hour': driver.num_finished / elapsed * 3600, 'num_games': driver.num_finished,
+              'positions_per_sec': writer.num_records / elapsed, 'seconds': elapsed}
+    if driver.batcher is not None:
+        result['evals_per_sec'] = driver.batcher.num_samples / elapsed
+        result['mean_batch_size'] = driver.batcher.num_samples / driver.batcher.num_batches
+    return result
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(model='random', seed=0, output='../logs/benchmarks.jsonl', board_size=9, num_simulations=100,
+                   num_parallel_leaves=8, num_games=8, num_threads=4, num_lockstep_games=8, num_async_games=8,
+                   num_filters=16, num_blocks=1):
+    """Run all the benchmarks and append the results as one json line to output.
+
+    :param model: 'random' for random priors, i.e. MCTS with use_nn=False, or 'tiny' for a small model on cpu
+    :param seed: the seed of numpy and torch, which fixes the positions, the random priors and the weights
+    """
+    if model not in ('random', 'tiny'):
+        raise ValueError('Unknown model!!!')
+    torch.manual_seed(seed)
+
+    config = SelfPlayConfig(board_size=board_size, num_simulations=num_simulations,
+                            num_parallel_leaves=num_parallel_leaves, num_filters=num_filters, num_blocks=num_blocks,
+                            device='cpu', max_games=num_games, num_threads=num_threads,
+                            num_lockstep_games=num_lockstep_games, num_async_games=num_async_games,
+                            batch_size=num_threads)
+    backend, batch_size = build_backend(config) if model == 'tiny' else (None, None)
+
+    results = {'search': bench_search(config, backend, seed=seed),
+               'search_native': bench_search(config, backend, seed=seed, native=True)}
+    if backend is not None:
+        results['inference'] = bench_inference(backend)
+    results['self_play'] = bench_self_play(config, backend, batch_size, seed=seed)
+    results['self_play_lockstep'] = bench_lockstep(config, backend, seed=seed)
+    results['self_play_async'] = bench_async(config, backend, num_async_games * num_parallel_leaves, seed=seed)
+
+    record = {'time': time.time(), 'commit': get_commit(), 'platform': platform.platform(),
+              'torch_threads': torch.get_num_threads(), 'model': model, 'seed': seed,
+              'settings': {'board_size': board_size, 'num_simulations': num_simulations,
+                           'num_parallel_leaves': num_parallel_leaves, 'num_games': num_games,
+                           'num_threads': num_threads, 'num_lockstep_games': num_lockstep_games,
+                           'num_async_games': num_async_games, 'num_filters': num_filters, 'num_blocks': num_blocks},
+              'results': results}
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    return record
+
+
+if __name__ == '__main__':
+
+    for model in ('random', 'tiny'):
+        record = run_benchmarks(model=model)
+        print(json.dumps(record['results'], indent=2))
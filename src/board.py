@@ -16,19 +16,72 @@ class Board(object):
     A class to represent the state and to encode the rule of game.
     """
 
-    def __init__(self, board_size):
+    def __init__(self, board_size, zobrist=None):
+        """
+        :param board_size: size of the board
+        :param zobrist: an instance of the ZobristHash class to keep self.hash up to date in make_move and
+            unmake_move, None for no hashing
+        """
         self.board_size = board_size
         self.winning_flag = False
-        self.init_state = np.zeros([self.board_size] * 2, dtype=np.int)
+        self.init_state = np.zeros([self.board_size] * 2, dtype=int)
         self.state = self.init_state.copy()
+        # mirrors self.state with per-line bitsets, so that a win is detected in O(1) when a stone is put
+        self.bitboard = pynode.BitBoard(board_size)
+        self.zobrist = zobrist
+        self.hash = 0
 
     def reset_board(self):
         self.winning_flag = False
         self.state = self.init_state.copy()
+        self.bitboard.reset()
+        self.hash = 0
 
     def get_current_state(self):
         return self.state
 
+    def make_move(self, action, player_id):
+        """Put a stone on the board in place.
+
+        :param action: a two-dimensional tuple or an int type move value
+        :param player_id: a integer to indicate which player_id is playing
+        :return:
+            winning_flag: true if the stone makes five in a row
+        """
+        if not isinstance(action, tuple):
+            action = idx_2_loc(action, self.board_size)
+
+        assert self.state[action] == 0
+        self.state[action] = player_id
+        if self.zobrist is not None:
+            self.hash = self.zobrist.update(self.hash, action[0] * self.board_size + action[1], player_id)
+        self.winning_flag = self.bitboard.make_move(action[0], action[1], player_id)
+        return self.winning_flag
+
+    def unmake_move(self, action):
+        """Take back the stone put by make_move.
+
+        :param action: a two-dimensional tuple or an int type move value
+        """
+        if not isinstance(action, tuple):
+            action = idx_2_loc(action, self.board_size)
+
+        if self.zobrist is not None:
+            self.hash = self.zobrist.update(self.hash, action[0] * self.board_size + action[1], self.state[action])
+        self.state[action] = 0
+        self.bitboard.unmake_move(action[0], action[1])
+        self.winning_flag = False
+
+    def load_state(self, state):
+        """Set the board to the given state, e.g. the root state of a search."""
+        self.reset_board()
+        for x, y in np.argwhere(state != 0):
+            self.make_move((int(x), int(y)), int(state[x, y]))
+        self.winning_flag = False  # the order of the moves is unknown
+
+    def is_full(self):
+        return self.bitboard.is_full()
+
     @staticmethod
     def get_new_state(state, action, player_id):
         """Get the new state of the state given the action.
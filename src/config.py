@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+
+class SelfPlayConfig(object):
+    """
+    Settings of a self-play run, which are passed around explicitly instead of living in module-level globals.
+    """
+
+    def __init__(self, board_size=11, num_simulations=400, strategy_change_point=10, history_len_per_player=2,
+                 c_puct=5, num_parallel_leaves=1, full_search_prob=1.0, num_fast_simulations=None, early_stop=False,
+                 num_filters=128, num_blocks=5, device=None, fold_bn=False,
+                 model_dir='../models', data_dir='.', max_games=63, num_threads=64, num_workers=0, num_lockstep_games=0,
+                 num_async_games=0,
+                 batch_size=32, autotune_batch_size=False, max_batch_latency=None, max_wait=0.005,
+                 num_inference_threads=None, shard_size=5000, cache_mb=0, symmetry=None, pruning=None, pruning_radius=2,
+                 native_search=False, model_poll_interval=1.0,
+                 follow_best_model=False, log_dir='../logs/self_play', summary_interval=30, instrument=False,
+                 profile_path=None, profile_interval=0.01):
+        """
+        :param num_simulations: the simulations of a full search
+        :param full_search_prob: the probability of a full search for each move, the other moves get a fast search
+            without noise and are not recorded as training data, i.e. playout cap randomization, 1 to search and
+            record every move fully
+        :param num_fast_simulations: the simulations of a fast search, at least 1, num_simulations // 4 by default
+        :param early_stop: true to stop a fast search once its move is decided, see MCTS.run_simulations
+        :param device: the device to run the model on, None for cuda if it is available and cpu otherwise
+        :param fold_bn: true to fold the BatchNorm layers following convs into the convs for inference
+        :param num_threads: the number of self-play threads in each process
+        :param num_workers: the number of self-play processes sharing one inference process, 0 to play in threads
+            of the current process with an in-process inference server
+        :param num_lockstep_games: the number of games stepped in lockstep by one thread whose leaves are evaluated
+            together, which replaces the self-play threads and the inference server, 0 to play in threads
+        :param num_async_games: the number of games played at once by coroutines of one thread, which replaces the
+            self-play threads and the inference server by an asyncio batcher, 0 to play in threads
+        :param batch_size: the max number of network inputs in one forward pass
+        :param autotune_batch_size: true to replace batch_size by the batch size with the highest throughput
+            on the current machine
+        :param max_batch_latency: the max seconds of one forward pass allowed when autotuning the batch size
+        :param max_wait: the max seconds a network input waits for the batch to fill up
+        :param num_inference_threads: the number of intra-op threads of torch for inference, None to keep the default
+        :param data_dir: the folder of the self-play shards
+        :param shard_size: the number of positions per self-play shard
+        :param cache_mb: the memory budget in MB of the evaluation cache of each self-play thread, 0 for no cache
+        :param symmetry: the symmetry mode of MCTS, None, 'canonical' (needs cache_mb > 0) or 'random'
+        :param pruning: the pruning mode of MCTS, None to expand every empty cell, 'forced', 'radius' or
+            'forced_radius', see MovePruner
+        :param pruning_radius: the max distance in cells of a move to a stone for the radius modes
+        :param native_search: true to search with NativeMCTS, whose tree lives in the pynode extension and whose
+            loop runs without the GIL, needs cache_mb == 0 and symmetry None or 'random'
+        :param model_poll_interval: the seconds between two checks for a new model published to model_dir
+        :param follow_best_model: true to play with the best model promoted by the gating of the arena instead of
+            the latest model published
+        :param log_dir: the folder of the TensorBoard logs of the periodic summaries, None for no TensorBoard
+        :param summary_interval: the seconds between two summaries of the self-play counters
+        :param instrument: true to time the phases of the search and the forward passes and to record the batch
+            size and queue wait histograms, which costs nothing when false
+        :param profile_path: the file the collapsed stacks of the sampling profiler of the self-play threads are
+            written to at the end, None for no profiling
+        :param profile_interval: the seconds between two samples of the profiler
+        """
+        # game
+        self.board_size = board_size
+        self.max_moves = board_size ** 2
+
+        # search
+        self.num_simulations = num_simulations
+        self.full_search_prob = full_search_prob
+        self.num_fast_simulations = num_fast_simulations if num_fast_simulations is not None \
+            else max(1, num_simulations // 4)
+        if self.num_fast_simulations < 1:
+            raise ValueError('A fast search needs at least one simulation!!!')
+        self.early_stop = early_stop
+        self.strategy_change_point = strategy_change_point
+        self.history_len_per_player = history_len_per_player
+        self.c_puct = c_puct
+        self.num_parallel_leaves = num_parallel_leaves
+        self.cache_mb = cache_mb
+        self.symmetry = symmetry
+        self.pruning = pruning
+        self.pruning_radius = pruning_radius
+        self.native_search = native_search
+
+        # model
+        self.in_channels = history_len_per_player * 2 + 1
+        self.num_filters = num_filters
+        self.num_blocks = num_blocks
+        self.device = device
+        self.fold_bn = fold_bn
+        self.model_dir = model_dir
+        self.model_poll_interval = model_poll_interval
+        self.follow_best_model = follow_best_model
+
+        # self-play
+        self.data_dir = data_dir
+        self.max_games = max_games
+        self.num_threads = num_threads
+        self.num_workers = num_workers
+        self.num_lockstep_games = num_lockstep_games
+        self.num_async_games = num_async_games
+        self.batch_size = batch_size
+        self.autotune_batch_size = autotune_batch_size
+        self.max_batch_latency = max_batch_latency
+        self.max_wait = max_wait
+        self.num_inference_threads = num_inference_threads
+        self.shard_size = shard_size
+
+        # instrumentation
+        self.log_dir = log_dir
+        self.summary_interval = summary_interval
+        self.instrument = instrument
+        self.profile_path = profile_path
+        self.profile_interval = profile_interval
+
+
+class TrainConfig(object):
+    """
+    Settings of a training run. The model settings must match the SelfPlayConfig of the self-play feeding it.
+    """
+
+    def __init__(self, board_size=11, history_len_per_player=2, num_filters=128, num_blocks=5, device=None,
+                 num_threads=None, amp=False, data_dir='.', model_dir='../models', log_dir='../logs/train',
+                 batch_size=256, num_loader_workers=2, prefetch_factor=4, window_games=10000, sampling='uniform',
+                 half_life_games=None, augment=True, optimizer='sgd', lr=0.02, momentum=0.9, weight_decay=1e-4,
+                 lr_schedule='cosine', warmup_steps=500, lr_milestones=(), lr_gamma=0.1, num_steps=100000,
+                 checkpoint_every=1000, log_every=100, seed=0):
+        """
+        :param device: the device to train on, None for cuda if it is available and cpu otherwise
+        :param num_threads: the number of intra-op threads of torch on cpu, None to keep the default
+        :param amp: true to train in mixed precision, i.e. float16 on cuda and bfloat16 on cpu
+        :param data_dir: the folder of the self-play shards
+        :param model_dir: the folder of the ModelRegistry the checkpoints are published to
+        :param log_dir: the folder of the TensorBoard logs
+        :param num_loader_workers: the number of DataLoader processes sampling minibatches
+        :param prefetch_factor: the number of minibatches each DataLoader process prepares in advance
+        :param window_games: the number of the newest games of the replay buffer
+        :param sampling: 'uniform' or 'recency', see ReplayBuffer
+        :param optimizer: 'sgd' or 'adam'
+        :param lr_schedule: 'constant', 'step' (multiplied by lr_gamma at every step of lr_milestones) or 'cosine'
+            (decayed to 0 at num_steps), all after a linear warmup of warmup_steps steps
+        :param checkpoint_every: the number of steps between two checkpoints
+        :param log_every: the number of steps between two logs
+        """
+        # model
+        self.board_size = board_size
+        self.in_channels = history_len_per_player * 2 + 1
+        self.num_filters = num_filters
+        self.num_blocks = num_blocks
+        self.device = device
+        self.num_threads = num_threads
+        self.amp = amp
+
+        # data
+        self.data_dir = data_dir
+        self.model_dir = model_dir
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.num_loader_workers = num_loader_workers
+        self.prefetch_factor = prefetch_factor
+        self.window_games = window_games
+        self.sampling = sampling
+        self.half_life_games = half_life_games
+        self.augment = augment
+
+        # optimization
+        self.optimizer = optimizer
+        self.lr = lr
+        self.momentum = momentum
+        self.weight_decay = weight_decay
+        self.lr_schedule = lr_schedule
+        self.warmup_steps = warmup_steps
+        self.lr_milestones = lr_milestones
+        self.lr_gamma = lr_gamma
+        self.num_steps = num_steps
+        self.checkpoint_every = checkpoint_every
+        self.log_every = log_every
+        self.seed = seed
+
+
+class ArenaConfig(object):
+    """
+    Settings of the matches between two model versions. The model settings must match the SelfPlayConfig.
+    """
+
+    def __init__(self, board_size=11, history_len_per_player=2, num_filters=128, num_blocks=5, device=None,
+                 fold_bn=False, num_inference_threads=None, model_dir='../models', log_path='../logs/arena.jsonl',
+                 num_games=100, num_concurrent_games=16, num_simulations=200, c_puct=5, num_parallel_leaves=4,
+                 num_opening_moves=2, early_stop=True, pruning=None, pruning_radius=2, native_search=False,
+                 batch_size=32, max_wait=0.005, gate_score=None, poll_interval=60, seed=0):
+        """
+        :param num_games: the number of games per match, rounded up to an even number so that both models play
+            every opening with both colors
+        :param num_concurrent_games: the number of games played at once, whose network inputs are batched together
+        :param num_opening_moves: the number of random moves every game starts with, as the search is deterministic
+        :param early_stop: true to stop a search once its move is decided by the visits, which saves simulations
+            but may change a move the full search would have proven better, see MCTS.run_simulations
+        :param pruning: the pruning mode of MCTS for both models, see SelfPlayConfig
+        :param native_search: true to search with NativeMCTS for both models, see SelfPlayConfig
+        :param batch_size: the max number of network inputs in one forward pass of each model
+        :param gate_score: the score a new version needs against the best one to be promoted, None for no gating,
+            where every new version is promoted
+        :param poll_interval: the seconds between two checks for a new version to evaluate
+        :param log_path: the json lines file the results of the matches are appended to
+        """
+        # model
+        self.board_size = board_size
+        self.in_channels = history_len_per_player * 2 + 1
+        self.history_len_per_player = history_len_per_player
+        self.num_filters = num_filters
+        self.num_blocks = num_blocks
+        self.device = device
+        self.fold_bn = fold_bn
+        self.num_inference_threads = num_inference_threads
+        self.model_dir = model_dir
+        self.log_path = log_path
+
+        # match
+        self.num_games = num_games
+        self.num_concurrent_games = num_concurrent_games
+        self.num_simulations = num_simulations
+        self.c_puct = c_puct
+        self.num_parallel_leaves = num_parallel_leaves
+        self.num_opening_moves = num_opening_moves
+        self.early_stop = early_stop
+        self.pruning = pruning
+        self.pruning_radius = pruning_radius
+        self.native_search = native_search
+        self.batch_size = batch_size
+        self.autotune_batch_size = False
+        self.max_batch_latency = None
+        self.max_wait = max_wait
+        self.gate_score = gate_score
+        self.poll_interval = poll_interval
+        self.seed = seed
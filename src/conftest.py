@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+
+class LinearEvaluator(object):
+    """A fixed random linear model of the network inputs, so that every position gets its own priors and value, and
+    two searches only get the same outputs if they build the same inputs. The inputs evaluated are recorded."""
+
+    def __init__(self, board_size, history_len_per_player, seed=0):
+        rng = np.random.RandomState(seed)
+        num_features = (2 * history_len_per_player + 1) * board_size ** 2
+        self.w_p = rng.randn(num_features, board_size ** 2) * 0.3
+        self.w_v = rng.randn(num_features) * 0.1
+        self.inputs = []
+
+    def __call__(self, xs):
+        self.inputs.extend(np.array(x) for x in xs)
+        features = xs.reshape(len(xs), -1).astype(np.float64)
+        logits = features @ self.w_p
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs.astype(np.float32), np.tanh(features @ self.w_v).astype(np.float32)
+
+
+@pytest.fixture
+def linear_evaluator():
+    """A factory of LinearEvaluators taking the board size and the history length per player."""
+    return LinearEvaluator
@@ -9,12 +9,13 @@ Created on 2020-04-02
 # adapted from https://github.com/initial-h/AlphaZero_Gomoku_MPI/blob/master/GUI_v1_4.py
 
 
-from utils import switch_player
+from utils import switch_player, idx_2_loc
 from board import Board
-import numpy as np
+from config import SelfPlayConfig
+from mcts import SearchSession, build_backend, get_mcts_cls
+from registry import ModelRegistry
 import pygame
 from pygame.locals import *
-import time
 
 
 class GUI(object):
@@ -121,8 +122,7 @@ class GUI(object):
         if self.last_action_player:     # draw a cross on the last piece to mark the last move
             self._draw_pieces(self.last_action_player[0], self.last_action_player[1], False)
 
-        self.board.state = Board.get_new_state(self.board.state, action, player_id)
-        self.board.winning_flag = Board.has_won(action, self.board.state, self.board_size)
+        self.board.make_move(action, player_id)
         self._draw_pieces(action, player_id, True)
         self.state[action] = player_id
         self.last_action_player = action, player_id
@@ -291,49 +291,56 @@ class GUI(object):
         return True if area[0] < loc[0] < area[0] + area[2] and area[1] < loc[1] < area[1] + area[3] else False
 
 
-def get_ai_action(state):
-    time.sleep(0.1)
-    valid_actions = np.argwhere(state == 0)
-    idx = np.random.choice(range(valid_actions.shape[0]))
-    action = tuple(valid_actions[idx])
-    return action
+def build_session(config):
+    """
+    A search session with the newest model in config.model_dir, or with random evaluations if there is none yet.
+    """
+    registry = ModelRegistry(config.model_dir)
+    version = registry.latest_version()
 
+    evaluator = None
+    if version >= 0:
+        evaluator, _ = build_backend(config)
+        evaluator.load_state_dict(registry.load(version), version)
 
-def process_one_move(mode, click, player_id, ui, ai_first):
+    mcts = get_mcts_cls(config)(config.board_size, strategy='deterministically', c_puct=config.c_puct,
+                                use_nn=evaluator is not None, add_noise=False,
+                                num_parallel_leaves=config.num_parallel_leaves, evaluator=evaluator,
+                                pruning=config.pruning, pruning_radius=config.pruning_radius)
+    return SearchSession(mcts, config.history_len_per_player)
+
+
+def get_ai_action(session, num_simulations):
+    action, _ = session.search(num_simulations, early_stop=True)
+    return idx_2_loc(action, session.board_size)
+
+
+def process_one_move(mode, click, player_id, ui, ai_first, session, num_simulations):
     if mode == 'Man vs Man':
         action = click[1]
-        ui.render_step(action, player_id)
 
     elif mode == 'AI vs AI':
-        action = get_ai_action(ui.board.state)
-        ui.render_step(action, player_id)
+        action = get_ai_action(session, num_simulations)
 
     elif mode == 'Man vs AI':
-        if ai_first:
-            if player_id == 1:
-                action = get_ai_action(ui.board.state)
-                ui.render_step(action, player_id)
-            else:
-                action = click[1]
-                ui.render_step(action, player_id)
-
+        if ai_first == (player_id == 1):
+            action = get_ai_action(session, num_simulations)
         else:
-            if player_id == 1:
-                action = click[1]
-                ui.render_step(action, player_id)
-            else:
-                action = get_ai_action(ui.board.state)
-                ui.render_step(action, player_id)
+            action = click[1]
 
     else:
         raise ValueError("Unknown mode!!!")
 
-    return action
+    ui.render_step(action, player_id)
+    # both sides' moves go into the tree, so the AI keeps what it has searched below the human's reply
+    reused_visits = session.advance(action)
+    return action, reused_visits
 
 
 def main():
-    board_size = 11
-    ui = GUI(board_size)
+    config = SelfPlayConfig(board_size=11, num_parallel_leaves=8)
+    session = build_session(config)
+    ui = GUI(config.board_size)
     player_id = 1
     ai_first = False
     mode = 'Man vs Man'
@@ -353,18 +360,22 @@ def main():
         if click[0] == 'quit':
             exit()
         elif click[0] == 'Restart':
+            player_id = 1
             ui.restart_game()
+            session.reset()
         elif click[0] == 'ResetScore':
             ui.reset_score()
         elif click[0] in ('Man vs Man', 'Man vs AI', 'AI vs AI'):
             player_id = 1
             ui.restart_game(click[0])
             ui.reset_score()
+            session.reset()
             mode = click[0]
 
         elif click[0] == 'move':
-            action = process_one_move(mode, click, player_id, ui, ai_first)
-            print(action)
+            action, reused_visits = process_one_move(mode, click, player_id, ui, ai_first, session,
+                                                     config.num_simulations)
+            print(action, 'reused visits: {n}'.format(n=reused_visits))
 
             if ui.board.winning_flag:
                 ui.add_score(player_id)
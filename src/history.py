@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+from utils import idx_2_loc
+
+
+class HistoryPlanes(object):
+    """
+    Preallocated history planes of both players, i.e. the input of the network.
+
+    planes[0] is the player indicator, planes[1:1+L] is a ring of the last L planes of white stones and
+    planes[1+L:] is a ring of the last L planes of black stones, where L is history_len. Each ring has a head
+    pointing to its newest plane, so a new position is derived from the previous one by copying one plane
+    into the oldest slot and writing a single cell.
+    """
+
+    def __init__(self, history_len, board_size):
+        self.history_len = history_len
+        self.board_size = board_size
+        self.planes = np.zeros((2 * history_len + 1, board_size, board_size), dtype=np.float32)
+
+        # heads[0] for black and heads[1] for white, as an index into the ring
+        self.heads = [history_len - 1, history_len - 1]
+        # cells of the stones added by every push of each player, -1 for a push without a stone. The zero planes
+        # the rings start with count as pushes too, so pop can always rebuild the plane a push has overwritten.
+        self.cells = ([-1] * history_len, [-1] * history_len)
+        self._ring = np.arange(history_len)
+
+    def _base(self, player_id):
+        # 1 for black 2 for white
+        return 1 + self.history_len if player_id == 1 else 1
+
+    def push(self, player_id, action):
+        """Append the plane of player_id after it plays action.
+
+        :param player_id: the player who has just played
+        :param action: a two-dimensional tuple or an int type move value, None if no stone is added
+        """
+        k = player_id - 1
+        base = self._base(player_id)
+        head = (self.heads[k] + 1) % self.history_len
+
+        plane = self.planes[base + head]
+        plane[...] = self.planes[base + self.heads[k]]
+        if action is None:
+            cell = -1
+        else:
+            if isinstance(action, tuple):
+                cell = action[0] * self.board_size + action[1]
+            else:
+                cell = int(action)
+            plane[idx_2_loc(cell, self.board_size)] = 1
+
+        self.heads[k] = head
+        self.cells[k].append(cell)
+
+    def pop(self, player_id):
+        """Undo the last push of player_id."""
+        k = player_id - 1
+        cells = self.cells[k]
+        assert len(cells) > self.history_len, 'nothing to pop'
+
+        # the plane pushed out of the ring is the current oldest plane without the stone added by its push
+        base = self._base(player_id)
+        head = self.heads[k]
+        oldest = (head + 1) % self.history_len
+        cell = cells[-self.history_len]
+
+        plane = self.planes[base + head]
+        if oldest != head:
+            plane[...] = self.planes[base + oldest]
+        if cell != -1:
+            plane[idx_2_loc(cell, self.board_size)] = 0
+
+        self.heads[k] = (head - 1) % self.history_len
+        cells.pop()
+
+    def get_input(self, player_id):
+        """Return the planes of the state where player_id is gonna play, ordered from the oldest to the newest."""
+        # 1 for black 2 for white
+        self.planes[0] = 1 if player_id == 1 else 0
+        order = np.concatenate(([0],
+                                1 + (self.heads[1] + 1 + self._ring) % self.history_len,
+                                1 + self.history_len + (self.heads[0] + 1 + self._ring) % self.history_len))
+        return self.planes.take(order, axis=0)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class InferenceServer(object):
+    """
+    Batches the network inputs submitted by the self-play threads into one forward pass.
+
+    A batch is dispatched as soon as batch_size inputs are pending, or max_wait seconds after the oldest pending
+    input was submitted, whichever comes first, so the latency stays bounded when fewer threads than batch_size are
+    still playing. Callers get a Future per input instead of polling a shared dict.
+    """
+
+    def __init__(self, backend, batch_size, max_wait=0.005, stats=None):
+        """
+        :param backend: an instance of the InferenceBackend class
+        :param batch_size: the max number of inputs in one forward pass
+        :param max_wait: the max seconds an input waits for the batch to fill up
+        :param stats: an instance of the Stats class to record the forward time and the histograms of the batch
+            sizes and of the queue waits in, None for no recording
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stats = stats
+
+        self.num_batches = 0
+        self.num_samples = 0
+
+        self._cond = threading.Condition()
+        self._requests = []  # pending (x, future, submit time), the oldest first
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._serve, name='inference_server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the server after serving the inputs already submitted."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, x):
+        """Submit one network input and return a Future of (probs, v) as a numpy array and a float."""
+        future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError('The inference server has been stopped!!!')
+            self._requests.append((x, future, time.monotonic()))
+            if len(self._requests) == 1 or len(self._requests) >= self.batch_size:
+                self._cond.notify()
+        return future
+
+    def evaluate(self, xs):
+        """Blocking evaluation of a batch of inputs, which can be used as the evaluator of MCTS.
+
+        :return: probs with shape (len(xs), num_actions) and v with shape (len(xs),) as numpy arrays
+        """
+        futures = [self.submit(x) for x in xs]
+        res = [future.result() for future in futures]
+        probs = np.stack([each[0] for each in res])
+        v = np.array([each[1] for each in res])
+        return probs, v
+
+    def load_state_dict(self, state_dict, version=-1):
+        """Swap new weights in, which does not pause the forward passes, see InferenceBackend."""
+        self.backend.load_state_dict(state_dict, version)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._requests and not self._stopped:
+                self._cond.wait()
+
+            # wait until the batch is full or the oldest input has waited for max_wait
+            while self._requests and len(self._requests) < self.batch_size and not self._stopped:
+                remaining = self._requests[0][2] + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._requests[:self.batch_size]
+            del self._requests[:self.batch_size]
+            return batch
+
+    def record(self, batch_size, submit_times, start_time):
+        stats = self.stats
+        stats.count('evaluations', batch_size)
+        stats.add_time('forward', time.monotonic() - start_time)
+        stats.add_value('batch_size', batch_size)
+        for submit_time in submit_times:
+            stats.add_value('queue_wait', start_time - submit_time)
+
+    def _serve(self):
+        while 1:
+            batch = self._next_batch()
+            if not batch:
+                break  # stopped and nothing left
+
+            xs, futures, submit_times = zip(*batch)
+            tik = time.monotonic()
+            try:
+                probs, v = self.backend(np.stack(xs))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            if self.stats is not None:
+                self.record(len(batch), submit_times, tik)
+
+            self.num_batches += 1
+            self.num_samples += len(batch)
+            for i, future in enumerate(futures):
+                future.set_result((probs[i], v[i].item()))
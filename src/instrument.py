@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import defaultdict, Counter
+
+import numpy as np
+
+
+class Stats(object):
+    """
+    Counters, timers and histogram samples of one thread.
+
+    Only the owning thread writes them, and a Reporter reads them from another thread. The counters and timers are
+    copied by the reader in one step, so they need no lock, but the histogram samples are handed over to the reader,
+    so they are written and taken under a lock.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.times = defaultdict(float)
+        self.values = defaultdict(list)
+        self._values_lock = threading.Lock()
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def add_time(self, name, seconds):
+        self.times[name] += seconds
+
+    def add_value(self, name, value):
+        with self._values_lock:
+            self.values[name].append(value)
+
+    def take_values(self):
+        """Return the histogram samples recorded so far and start new ones."""
+        with self._values_lock:
+            values, self.values = self.values, defaultdict(list)
+        return values
+
+
+def timed(fn, stats, name):
+    """Wrap fn to add its wall time to stats.times[name] and its calls to stats.counts[name]."""
+    perf_counter = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        tik = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.times[name] += perf_counter() - tik
+            stats.counts[name] += 1
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument(obj, stats, phases):
+    """Time some methods of one object by shadowing them with timed wrappers in the instance's dict.
+
+    Objects which are not instrumented keep calling the plain methods, so instrumentation which is turned off costs
+    nothing on the hot path.
+
+    :param phases: a dict mapping method names to the phases they are timed as
+    """
+    for method_name, phase in phases.items():
+        method = getattr(obj, method_name)
+        if not getattr(method, 'instrumented', False):
+            setattr(obj, method_name, timed(method, stats, phase))
+    return obj
+
+
+class Reporter(object):
+    """
+    Periodically sums up the Stats of all the threads of a process, prints one summary line and writes the rates,
+    the share of time per phase and the histograms to TensorBoard.
+    """
+
+    def __init__(self, interval=30, log_dir=None):
+        """
+        :param interval: the seconds between two summaries
+        :param log_dir: the folder of the TensorBoard logs, None for no TensorBoard
+        """
+        self.interval = interval
+        self.log_dir = log_dir
+        self.stats_list = []
+        self.num_reports = 0
+
+        self._lock = threading.Lock()
+        self._last_counts = Counter()
+        self._last_times = Counter()
+        self._last_time = time.time()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._writer = None
+
+    def register(self, stats=None):
+        """Register the Stats of a thread, a new one by default, and return it."""
+        stats = Stats() if stats is None else stats
+        with self._lock:
+            self.stats_list.append(stats)
+        return stats
+
+    def start(self):
+        if self.log_dir is not None:
+            from torch.utils.tensorboard import SummaryWriter
+            self._writer = SummaryWriter(self.log_dir)
+        self._thread = threading.Thread(target=self._run, name='reporter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread after a last summary."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        if self._writer is not None:
+            self._writer.close()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.report()
+        self.report()
+
+    def collect(self):
+        """Return the counts and times summed over the threads since the last call, the seconds elapsed and the
+        histogram samples."""
+        counts, times, values = Counter(), Counter(), defaultdict(list)
+        with self._lock:
+            stats_list = list(self.stats_list)
+        for stats in stats_list:
+            counts.update(dict(stats.counts))
+            times.update(dict(stats.times))
+            for name, each in stats.take_values().items():
+                values[name].extend(each)
+
+        now = time.time()
+        delta_counts = {k: v - self._last_counts[k] for k, v in counts.items()}
+        delta_times = {k: v - self._last_times[k] for k, v in times.items()}
+        elapsed = now - self._last_time
+        self._last_counts, self._last_times, self._last_time = counts, times, now
+        return counts, delta_counts, delta_times, elapsed, values
+
+    def report(self):
+        counts, delta_counts, delta_times, elapsed, values = self.collect()
+        if elapsed <= 0:
+            return
+        step = self.num_reports
+        self.num_reports += 1
+
+        rates = ['games: {n}'.format(n=counts['games'])] if 'games' in counts else []
+        rates = ', '.join(rates + ['{name}/sec: {rate:.1f}'.format(name=name, rate=delta_counts[name] / elapsed)
+                                   for name in ('moves', 'simulations', 'evaluations') if name in delta_counts])
+        phase_time = sum(delta_times.values())
+        phases = ', '.join('{name}: {share:.0%}'.format(name=name, share=seconds / phase_time)
+                           for name, seconds in sorted(delta_times.items(), key=lambda each: -each[1])) \
+            if phase_time > 0 else ''
+        if delta_counts.get('cache_lookups'):
+            rates += ', cache hit rate: {rate:.1%}'.format(
+                rate=delta_counts.get('cache_hits', 0) / delta_counts['cache_lookups'])
+        saved_per_game = delta_counts['saved_simulations'] / delta_counts['games'] \
+            if delta_counts.get('games') and 'saved_simulations' in delta_counts else None
+        if saved_per_game is not None:
+            rates += ', saved simulations/game: {n:.0f}'.format(n=saved_per_game)
+        histograms = ', '.join('{name}: {mean:.4g} avg'.format(name=name, mean=np.mean(each))
+                               for name, each in sorted(values.items()) if each)
+        print('{pid}: {rates}{phases}{histograms}'
+              .format(pid=os.getpid(), rates=rates,
+                      phases=' | ' + phases if phases else '', histograms=' | ' + histograms if histograms else ''))
+
+        if self._writer is not None:
+            for name, n in delta_counts.items():
+                self._writer.add_scalar('rate/' + name, n / elapsed, step)
+            for name, seconds in delta_times.items():
+                self._writer.add_scalar('time_share/' + name, seconds / elapsed, step)
+            if saved_per_game is not None:
+                self._writer.add_scalar('saved_simulations_per_game', saved_per_game, step)
+            for name, each in values.items():
+                if each:
+                    self._writer.add_histogram(name, np.asarray(each), step)
+            self._writer.flush()
+
+
+class SamplingProfiler(object):
+    """
+    A sampling profiler of selected threads, which records their python stacks every interval seconds.
+
+    The samples are kept per thread as collapsed stacks, i.e. 'outer;...;inner count' lines, which flamegraph tools
+    read. It only costs the sampling thread, the profiled threads run unchanged.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = defaultdict(Counter)  # thread name -> collapsed stack -> count
+        self._threads = {}  # thread id -> thread name
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_thread(self, thread=None):
+        """Profile a thread, the current one by default."""
+        thread = threading.current_thread() if thread is None else thread
+        self._threads[thread.ident] = thread.name
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling_profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, thread_name in list(self._threads.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.samples[thread_name][self._collapse(frame)] += 1
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append('{func} ({file}:{line})'.format(func=code.co_name, file=os.path.basename(code.co_filename),
+                                                         line=code.co_firstlineno))
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def dump(self, path):
+        """Write the collapsed stacks of every thread to path, each line prefixed with the thread name."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            for thread_name, stacks in self.samples.items():
+                for stack, n in stacks.most_common():
+                    f.write('{thread};{stack} {n}\n'.format(thread=thread_name, stack=stack, n=n))
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import time
+
+import numpy as np
+
+from board import Board
+from registry import ModelRegistry
+from transposition import EvaluationCache
+from utils import switch_player
+from instrument import Stats
+from mcts import (get_mcts_cls, change_sampling_strategy, collect_self_play_data, init_history, build_backend,
+                  build_shard_writer, build_reporter, build_profiler)
+
+
+class LockstepGame(object):
+    """One game of the lockstep driver, with its own tree, board and history and the search of its current move."""
+
+    def __init__(self, mcts, config, game_id):
+        self.game_id = game_id
+        self.board = Board(config.board_size, zobrist=mcts.zobrist)
+        self.history = init_history(config.history_len_per_player, config.board_size)
+        self.player_id = 1  # 1 for black 2 for white
+        self.root = mcts.create_root(self.player_id)
+        self.num_moves = 0
+        self.num_saved_simulations = 0
+        self.xs, self.pis, self.player_ids, self.versions, self.moves = [], [], [], [], []
+
+        # the search of the current move
+        self.full_search = True
+        self.num_simulations = 0
+        self.num_done = 0
+        self.leaves = None
+
+
+class LockstepSelfPlay(object):
+    """
+    Self-play of many games in lockstep by a single thread, without self-play threads, queues or an inference server.
+
+    Every step selects up to num_parallel_leaves leaves from the tree of every game, evaluates the leaves of all the
+    games in one forward pass and backs them all up, so a batch holds about num_lockstep_games * num_parallel_leaves
+    inputs and never waits to fill up. A game whose move is searched plays it within the step, and a finished game is
+    replaced by a new one until config.max_games games have been started.
+    """
+
+    def __init__(self, config, backend=None, writer=None, stats=None):
+        """
+        :param config: an instance of the SelfPlayConfig class
+        :param backend: the InferenceBackend evaluating the leaves, None to search with random priors and values
+        :param writer: an instance of the ShardWriter class the finished games go to, None to drop them
+        :param stats: an instance of the Stats class to count the moves and the games in, None for a new one
+        """
+        self.config = config
+        self.backend = backend
+        self.writer = writer
+        self.stats = stats if stats is not None else Stats()
+
+        self.cache = EvaluationCache(config.cache_mb) if config.cache_mb > 0 else None
+        self.mcts = get_mcts_cls(config)(config.board_size, c_puct=config.c_puct, use_nn=backend is not None,
+                                         evaluator=backend, num_parallel_leaves=config.num_parallel_leaves,
+                                         cache=self.cache, symmetry=config.symmetry, pruning=config.pruning,
+                                         pruning_radius=config.pruning_radius,
+                                         stats=self.stats if config.instrument else None)
+        self.registry = ModelRegistry(config.model_dir)
+        self.version = backend.version if backend is not None else -1
+        self.num_started = 0
+        self.num_finished = 0
+        self.games = []
+        self._last_poll = None
+
+    def run(self):
+        """Play until config.max_games games have been finished."""
+        self.games = [game for game in (self.new_game() for _ in range(self.config.num_lockstep_games))
+                      if game is not None]
+        while self.games:
+            self.poll_model()
+            self.step()
+
+    def poll_model(self):
+        """Swap a new version published to config.model_dir in, at most every config.model_poll_interval seconds.
+
+        The swap runs between two steps, so no leaf is ever evaluated by two versions.
+        """
+        config = self.config
+        if self.backend is None or (self._last_poll is not None
+                                    and time.time() - self._last_poll < config.model_poll_interval):
+            return
+        self._last_poll = time.time()
+
+        version = self.registry.best_version() if config.follow_best_model else self.registry.latest_version()
+        if version != self.version and version >= 0:
+            self.backend.load_state_dict(self.registry.load(version), version)
+            self.version = version
+            if self.cache is not None:
+                self.cache.clear()  # the outputs of the previous model
+
+    def new_game(self):
+        """Start a new game, or return None if config.max_games games have been started."""
+        if self.num_started >= self.config.max_games:
+            return None
+        self.num_started += 1
+        game = LockstepGame(self.mcts, self.config, self.num_started)
+        self.start_move(game)
+        return game
+
+    def start_move(self, game):
+        # playout cap randomization, see self_play
+        config = self.config
+        game.full_search = np.random.random() < config.full_search_prob
+        game.num_simulations = config.num_simulations if game.full_search else config.num_fast_simulations
+        game.num_done = 0
+
+    def is_searched(self, game):
+        num_left = game.num_simulations - game.num_done
+        return num_left <= 0 or game.root.result is not None or (self.config.early_stop and not game.full_search
+                                                                 and self.mcts.is_decided(game.root, num_left))
+
+    def step(self):
+        """Run one batch of simulations for every game and play the moves which have been searched.
+
+        :return: the number of games still playing
+        """
+        mcts, num_parallel_leaves = self.mcts, self.config.num_parallel_leaves
+
+        games = []
+        for game in self.games:
+            while game is not None and self.is_searched(game):
+                game = self.play_move(game)
+            if game is None:
+                continue
+
+            game.leaves = mcts.select_leaves(game.root, game.board, game.history,
+                                             min(num_parallel_leaves, game.num_simulations - game.num_done))
+            game.num_done += game.leaves.num_done
+            self.stats.count('simulations', game.leaves.num_done)
+            games.append(game)
+        self.games = games
+
+        # one forward pass for the leaves of all the games
+        xs, keys, transforms = [], [], []
+        for game in games:
+            xs.extend(game.leaves.xs)
+            keys.extend(game.leaves.keys)
+            transforms.extend(game.leaves.transforms)
+        if not xs:
+            return len(games)
+        probs, v = mcts.evaluate_batch(xs, keys, transforms)
+        if self.config.instrument:
+            self.stats.add_value('batch_size', len(xs))
+
+        start = 0
+        for game in games:
+            num_leaves = len(game.leaves.paths)
+            mcts.add_noise = game.full_search
+            mcts.expand_leaves(game.leaves, probs[start:start + num_leaves], v[start:start + num_leaves])
+            game.num_done += num_leaves
+            game.leaves = None
+            start += num_leaves
+        self.stats.count('simulations', len(xs))
+        return len(games)
+
+    def play_move(self, game):
+        """Play the move searched for game.
+
+        :return: game, a new game if game is over, or None if it is over and there are no more games to start
+        """
+        config, mcts, stats = self.config, self.mcts, self.stats
+        player_id = game.player_id
+
+        change_sampling_strategy(mcts, config.strategy_change_point, game.num_moves)
+        action, next_node, pi = mcts.sample_actions(game.root)
+        next_node.parent = None
+        if game.full_search:
+            game.xs.append(collect_self_play_data(player_id, game.history))
+            game.pis.append(pi)
+            game.player_ids.append(player_id)
+            game.versions.append(self.version)
+            game.moves.append(game.num_moves)
+            stats.count('full_searches')
+        game.num_saved_simulations += config.num_simulations - game.num_done
+
+        won = game.board.make_move(action, player_id)
+        game.history.push(player_id, action)
+        game.root = next_node
+        game.num_moves += 1
+        stats.count('moves')
+
+        if won:
+            self.finish_game(game, player_id)
+            return self.new_game()
+        elif game.num_moves == config.max_moves:
+            return self.new_game()
+
+        game.player_id = switch_player(player_id)
+        self.start_move(game)
+        return game
+
+    def finish_game(self, game, winner):
+        stats = self.stats
+        self.num_finished += 1
+        stats.count('games')
+        stats.count('black_wins' if winner == 1 else 'white_wins')
+        stats.count('saved_simulations', game.num_saved_simulations)
+        if self.cache is not None:
+            stats.count('cache_hits', self.cache.hits - stats.counts['cache_hits'])
+            stats.count('cache_lookups', self.cache.hits + self.cache.misses - stats.counts['cache_lookups'])
+
+        if self.writer is not None and game.xs:
+            zs = np.where(np.array(game.player_ids) == winner, 1, -1)
+            self.writer.put(np.stack(game.xs), np.array(game.pis), zs, game.player_ids, game.game_id, game.versions,
+                            game.moves)
+
+
+def run_lockstep_self_play(config):
+    """Self-play of config.max_games games stepped in lockstep by the current thread, see LockstepSelfPlay."""
+    writer = build_shard_writer(config)
+    reporter = build_reporter(config, 'self_play')
+    profiler = build_profiler(config)
+    backend, _ = build_backend(config)
+    driver = LockstepSelfPlay(config, backend, writer, stats=reporter.register())
+
+    writer.start()
+    reporter.start()
+    if profiler is not None:
+        profiler.add_thread()
+        profiler.start()
+    driver.run()
+    writer.close()
+    reporter.stop()
+    if profiler is not None:
+        profiler.stop()
+        profiler.dump(config.profile_path)
+    return driver
@@ -7,25 +7,30 @@ Created on 2020/4/5
 """
 
 
-import torch
 import time
-from collections import deque
-from utils import switch_player
-from model import Model
+from utils import switch_player, loc_2_idx
+from model import Model, InferenceBackend
 import threading
-from queue import Queue
+import multiprocessing
 
-import pickle
-import datetime
 import os
-from copy import deepcopy
 import numpy as np
 from board import Board
+from inference import InferenceServer
+from transposition import ZobristHash, EvaluationCache
+from symmetry import Symmetries
+from config import SelfPlayConfig
+from history import HistoryPlanes
+from shards import ShardWriter
+from registry import ModelRegistry
+from instrument import Stats, Reporter, SamplingProfiler, instrument
+from threats import MovePruner
 import pynode
 
 
 class Node(object):
-    __slots__ = ('parent', 'p', 'player_id', 'N', 'Q', 'actions', 'child_nodes')
+    __slots__ = ('parent', 'p', 'player_id', 'N', 'Q', 'actions', 'child_nodes', 'result', 'solved_idx', 'num_solved',
+                 'valid')
 
     def __init__(self, parent, p, player_id):
         """Class for representing nodes in the monte carlo tree.
@@ -41,11 +46,15 @@ class Node(object):
         self.N = 0
         self.Q = 0
         self.player_id = player_id
+        self.result = None  # the proven value for the player to move, 1 win, 0 draw or -1 loss, None if unknown
 
     def expand(self, actions, probs):
         next_player_id = switch_player(self.player_id)
         self.actions = actions
         self.child_nodes = [Node(self, prob, next_player_id) for prob in probs]
+        self.solved_idx = -1  # the child proving a win or a draw
+        self.num_solved = 0   # the number of children proven
+        self.valid = None     # false for the children proven to lose, which are never selected, None if there is none
 
     @staticmethod
     def is_leaf_node(node):
@@ -55,13 +64,141 @@ class Node(object):
             return True
 
 
+class ArrayNode(object):
+    __slots__ = ('parent', 'player_id', 'visits', 'actions', 'P', 'N', 'W', 'child_nodes', 'result', 'solved_idx',
+                 'num_solved', 'valid')
+
+    def __init__(self, parent, player_id):
+        """Class for representing nodes whose children's stats are kept in contiguous numpy arrays.
+
+        Expanding an ArrayNode allocates three arrays instead of one Node per legal move, and child ArrayNodes are
+        only created when they are selected for the first time.
+
+        :param parent: an instance of the ArrayNode class, which is the parent of the current node
+        :param player_id: the player who is gonna play based on the current state
+        """
+        self.parent = parent
+        self.player_id = player_id
+        self.visits = 0  # the number of simulations passing through this node, i.e. N of the edge leading here
+        self.result = None  # the proven value, see Node
+
+        self.actions = None
+        self.child_nodes = None
+
+    def expand(self, actions, probs):
+        self.visits += 1
+        self.actions = actions
+        self.P = np.asarray(probs, dtype=np.float64)      # priors of the children
+        self.N = np.zeros(len(actions), dtype=np.int32)    # visit counts of the children
+        self.W = np.zeros(len(actions), dtype=np.float64)  # value sums of the children
+        self.child_nodes = {}
+        self.solved_idx = -1
+        self.num_solved = 0
+        self.valid = None
+
+    def get_child(self, idx):
+        child_node = self.child_nodes.get(idx)
+        if child_node is None:
+            child_node = ArrayNode(self, switch_player(self.player_id))
+            self.child_nodes[idx] = child_node
+        return child_node
+
+    def update(self, idx, v):
+        self.N[idx] += 1
+        self.W[idx] += v
+
+    @staticmethod
+    def is_leaf_node(node):
+        return node.actions is None
+
+
+class PendingLeaves(object):
+    __slots__ = ('paths', 'xs', 'keys', 'transforms', 'valid_actions_list', 'num_done')
+
+    def __init__(self):
+        """The leaves selected with virtual losses which wait for their evaluation, see MCTS.select_leaves."""
+        self.paths = []  # (path, leaf node)
+        self.xs = []
+        self.keys = []
+        self.transforms = []
+        self.valid_actions_list = []
+        self.num_done = 0  # the simulations which have ended at a terminal state instead of a leaf
+
+
+class EvaluationRequest(object):
+    __slots__ = ('transforms', 'inputs', 'input_transforms', 'missing', 'probs', 'v')
+
+    def __init__(self, transforms):
+        """The network inputs of a batch which are not cached, see MCTS.prepare_batch.
+
+        :param transforms: the dihedral transform of every position of the batch
+        """
+        self.transforms = transforms
+        self.inputs = None            # the transformed inputs to evaluate
+        self.input_transforms = None  # the transforms of the inputs to evaluate
+        self.missing = None           # cache key -> indexes of the positions, None without cache
+        self.probs = None             # the cached probs and v, filled in for the positions which are cached
+        self.v = None
+
+
 class MCTS(object):
 
     def __init__(self, board_size, strategy='stochastically', c_puct=5,
-                 use_nn=True, add_noise=True, alpha=0.03, eps=0.25):
+                 use_nn=True, add_noise=True, alpha=0.03, eps=0.25, tree='array', make_unmake=True,
+                 num_parallel_leaves=1, virtual_loss=1, evaluator=None, cache=None, symmetry=None, pruning=None,
+                 pruning_radius=2, stats=None):
+        """
+        :param tree: 'array' to keep children's stats in numpy arrays (ArrayNode), 'node' for one Node per child
+        :param make_unmake: true to play and take back moves on one mutable board per search,
+            false to copy the state at every level
+        :param num_parallel_leaves: the max number of in-flight leaves evaluated together in one network call,
+            1 to run the simulations strictly one by one
+        :param virtual_loss: the value an in-flight simulation counts as for the edges on its path
+        :param evaluator: a callable mapping a batch of network inputs to probs with shape (batch, num_actions) and
+            v with shape (batch,), both as numpy arrays, e.g. InferenceServer.evaluate; required if use_nn is true
+        :param cache: an instance of the EvaluationCache class to look the network outputs up by Zobrist hash
+            before calling the evaluator, None for no cache
+        :param symmetry: None to evaluate every position as it is, 'canonical' to evaluate and cache each position
+            once in its canonical orientation under the 8 dihedral transforms, which needs a cache, or 'random' to
+            evaluate each leaf under a random transform
+        :param pruning: None to expand every leaf with all the empty cells, or the mode of MovePruner to expand it
+            with the forced moves and/or the moves near the stones only, which needs make_unmake
+        :param pruning_radius: the radius of MovePruner
+        :param stats: an instance of the Stats class to time the phases of the search in, None for no timing
+        """
         self.board_size = board_size
         self.num_actions = board_size ** 2
 
+        if tree == 'array':
+            self.node_cls = ArrayNode
+        elif tree == 'node':
+            self.node_cls = Node
+        else:
+            raise ValueError('Unknown tree!!!')
+        self.tree = tree
+        self.make_unmake = make_unmake
+
+        if num_parallel_leaves > 1 and (tree != 'array' or not make_unmake):
+            raise ValueError('Parallel leaves need the array tree and make_unmake!!!')
+        self.num_parallel_leaves = num_parallel_leaves
+        self.virtual_loss = virtual_loss
+        if use_nn and evaluator is None:
+            raise ValueError('An evaluator is needed to use the neural net!!!')
+        self.evaluator = evaluator
+
+        if symmetry not in (None, 'canonical', 'random'):
+            raise ValueError('Unknown symmetry!!!')
+        if symmetry == 'canonical' and cache is None:
+            raise ValueError('Canonical symmetry needs a cache!!!')
+        self.cache = cache
+        self.zobrist = ZobristHash(board_size) if cache is not None else None
+        self.symmetry = symmetry
+        self.symmetries = Symmetries(board_size) if symmetry is not None else None
+
+        if pruning is not None and not make_unmake:
+            raise ValueError('Pruning needs make_unmake!!!')
+        self.pruner = MovePruner(pruning, pruning_radius) if pruning is not None else None
+
         self.strategy = strategy
         self.c_puct = c_puct
 
@@ -70,32 +207,235 @@ class MCTS(object):
         self.alpha = alpha
         self.eps = eps
 
-    def search(self, action, start_node, start_state, history_buffer_black, history_buffer_white):
-        update_history_buffer(start_node.player_id, start_state, history_buffer_black, history_buffer_white)
+        self.stats = stats
+        if stats is not None:
+            instrument(self, stats, {'select_child': 'select', 'evaluate_batch': 'evaluate', 'backup': 'backup',
+                                     'backup_path': 'backup', 'add_dirichlet_noise': 'noise',
+                                     'get_cache_key': 'cache_key', 'get_valid_actions': 'prune'})
+
+    def create_root(self, player_id):
+        if self.tree == 'array':
+            return ArrayNode(parent=None, player_id=player_id)
+        return Node(parent=None, p=None, player_id=player_id)
+
+    def search(self, action, start_node, start_state, history):
+        """Run one simulation from start_node.
+
+        :param history: an instance of the HistoryPlanes class including start_state, which is restored on return
+        :return: the value of start_state from the perspective of the player who played the action leading to it
+        """
+        if start_node.result is not None:
+            return -start_node.result  # a proven node, e.g. a terminal state, is not searched again
         if Board.has_won(action, start_state, self.board_size):
-            v = 1
+            start_node.result = -1  # the player who is gonna play on start_state has lost
+            return -start_node.result
+        if (start_state != 0).all():
+            start_node.result = 0  # a draw on the full board
+            return -start_node.result
+
+        if self.node_cls.is_leaf_node(start_node):
+            actions, probs, v = self.get_probs_and_v(start_state, start_node.player_id, history)
+            start_node.expand(actions, probs)
             return -v
 
-        if Node.is_leaf_node(start_node):
-            actions, probs, v = self.get_probs_and_v(start_state, start_node.player_id,
-                                                     history_buffer_black, history_buffer_white)
+        best_idx, best_action, best_child_node, best_state = self.choose_max_ucb_move(start_node, start_state)
+        proven = best_child_node.result is not None
+
+        history.push(start_node.player_id, best_action)
+        v = self.search(best_action, best_child_node, best_state, history)
+        history.pop(start_node.player_id)
+
+        self.backup(start_node, best_idx, best_child_node, v)
+        if not proven and best_child_node.result is not None:
+            self.solve_child(start_node, best_idx, -best_child_node.result)
+        return -v
+
+    def search_in_place(self, won, start_node, board, history):
+        """Same as search, but plays and takes back the moves on one mutable board instead of copying the state.
+
+        :param won: true if the move leading to start_node made five in a row
+        :param board: an instance of the Board class holding the state of start_node, which is restored on return
+        :param history: an instance of the HistoryPlanes class including the state, which is restored on return
+        :return: the value of the state from the perspective of the player who played the action leading to it
+        """
+        if start_node.result is not None:
+            return -start_node.result
+        if won or board.is_full():
+            start_node.result = -1 if won else 0  # the player who is gonna play on the state has lost, or a draw
+            return -start_node.result
+
+        if self.node_cls.is_leaf_node(start_node):
+            valid_actions, v = self.get_valid_actions(board, start_node.player_id)
+            if v is not None:
+                self.expand_decided(start_node, valid_actions, v)
+                return -v
+            actions, probs, v = self.get_probs_and_v(board.state, start_node.player_id, history, board.hash,
+                                                     valid_actions)
             start_node.expand(actions, probs)
             return -v
 
-        best_action, best_child_node, best_state = self.choose_max_ucb_move(start_node, start_state)
-
-        v = self.search(best_action, best_child_node, best_state, history_buffer_black, history_buffer_white)
+        best_idx, best_action, best_child_node = self.select_child(start_node)
+        proven = best_child_node.result is not None
 
-        start_node.Q = ((start_node.Q * start_node.N) + v) / (start_node.N + 1)
-        best_child_node.N += 1
+        won = board.make_move(best_action, start_node.player_id)
+        history.push(start_node.player_id, best_action)
+        v = self.search_in_place(won, best_child_node, board, history)
+        history.pop(start_node.player_id)
+        board.unmake_move(best_action)
 
+        self.backup(start_node, best_idx, best_child_node, v)
+        if not proven and best_child_node.result is not None:
+            self.solve_child(start_node, best_idx, -best_child_node.result)
         return -v
 
-    def get_one_move_by_simulations(self, node, state, num_simulations, history_buffer_black, history_buffer_white):
-        for _ in range(num_simulations):
-            self.search(action=None, start_node=node, start_state=state,
-                        history_buffer_black=deepcopy(history_buffer_black),
-                        history_buffer_white=deepcopy(history_buffer_white))
+    def search_parallel(self, node, board, history, num_leaves):
+        """Run up to num_leaves simulations on the array tree whose leaves are evaluated in one network call.
+
+        Every edge on the path to an in-flight leaf gets a virtual loss, i.e. one visit valued -virtual_loss, so the
+        following selections spread over other branches. The virtual loss is replaced by the real value on backup,
+        or taken back if the path ends at a leaf which is already in flight.
+
+        :param board: an instance of the Board class holding the state of node, which is restored on return
+        :param history: an instance of the HistoryPlanes class including the state, which is restored on return
+        :return: the number of simulations done
+        """
+        leaves = self.select_leaves(node, board, history, num_leaves)
+        if leaves.paths:
+            probs, v = self.evaluate_batch(leaves.xs, leaves.keys, leaves.transforms)
+            self.expand_leaves(leaves, probs, v)
+        return leaves.num_done + len(leaves.paths)
+
+    def select_leaves(self, node, board, history, num_leaves):
+        """Select up to num_leaves distinct leaves below node with virtual losses, to be evaluated together.
+
+        :return: an instance of the PendingLeaves class, whose simulations ending at a proven node are done
+        """
+        leaves = PendingLeaves()
+        leaf_nodes = set()
+        for _ in range(num_leaves):
+            if node.result is not None:
+                break  # node is proven, so its move is known
+
+            path, leaf_node = self.select_leaf(node, board, history)
+            if leaf_node.result is not None:
+                self.backup_path(path, -leaf_node.result)
+                leaves.num_done += 1
+            elif leaf_node in leaf_nodes:
+                self.revert_path(path)
+                self.unwind_path(path, board, history)
+                break
+            else:
+                valid_actions, v = self.get_valid_actions(board, leaf_node.player_id)
+                if v is not None:
+                    # a decided position is expanded and backed up right away, without the network
+                    self.expand_decided(leaf_node, valid_actions, v)
+                    self.solve_path(path, leaf_node)
+                    self.backup_path(path, -v)
+                    leaves.num_done += 1
+                else:
+                    leaf_nodes.add(leaf_node)
+                    leaves.paths.append((path, leaf_node))
+                    leaves.xs.append(collect_self_play_data(leaf_node.player_id, history) if self.use_nn else None)
+                    key, k = self.get_cache_key(leaf_node.player_id, board.state, position_hash=board.hash)
+                    leaves.keys.append(key)
+                    leaves.transforms.append(k)
+                    leaves.valid_actions_list.append(valid_actions)
+
+            self.unwind_path(path, board, history)
+        return leaves
+
+    def expand_leaves(self, leaves, probs, v):
+        """Expand the leaves selected by select_leaves with their probs and v and replace their virtual losses."""
+        for i, (path, leaf_node) in enumerate(leaves.paths):
+            valid_actions = leaves.valid_actions_list[i]
+            leaf_node.expand(valid_actions, self.get_priors(probs[i], valid_actions))
+            self.backup_path(path, -v[i])
+
+    def select_leaf(self, node, board, history):
+        """Walk down from node to a leaf or a proven node, e.g. a terminal state, adding a virtual loss to every edge
+        on the way. A terminal state reached for the first time is proven, see solve_path.
+
+        :return: the path as a list of (node, idx, action) and the last node
+        """
+        path = []
+        while node.result is None and not ArrayNode.is_leaf_node(node):
+            best_idx, best_action, best_child_node = self.select_child(node)
+            node.N[best_idx] += 1
+            node.W[best_idx] -= self.virtual_loss
+            path.append((node, best_idx, best_action))
+
+            won = board.make_move(best_action, node.player_id)
+            history.push(node.player_id, best_action)
+            node = best_child_node
+            if node.result is None and (won or board.is_full()):
+                node.result = -1 if won else 0  # the player who is gonna play on the state has lost, or a draw
+                self.solve_path(path, node)
+        return path, node
+
+    @staticmethod
+    def unwind_path(path, board, history):
+        for node, _, action in reversed(path):
+            history.pop(node.player_id)
+            board.unmake_move(action)
+
+    def backup_path(self, path, v):
+        """Replace the virtual losses on path with v, which is from the view of the player who played the last move."""
+        for node, idx, _ in reversed(path):
+            node.W[idx] += self.virtual_loss + v
+            v = -v
+
+    def revert_path(self, path):
+        for node, idx, _ in path:
+            node.N[idx] -= 1
+            node.W[idx] += self.virtual_loss
+            node.visits -= 1
+
+    def solve_path(self, path, node):
+        """Propagate the proof of node, the last node of path, to the nodes on path as far as it proves them."""
+        for parent, idx, _ in reversed(path):
+            if not self.solve_child(parent, idx, -node.result):
+                return
+            node = parent
+
+    def solve_child(self, node, idx, v):
+        """Record that the child idx of node is proven to be worth v for the player to move on node.
+
+        node is proven a win by a winning child, or worth its best child once all its children are proven. A losing
+        child is never selected again. With pruning, the proofs only cover the moves kept.
+
+        :return: true if node is proven by this child
+        """
+        if v == 1:
+            node.result, node.solved_idx = 1, idx
+            return True
+
+        node.num_solved += 1
+        if v == -1:
+            if node.valid is None:
+                node.valid = np.ones(len(node.actions), dtype=bool)
+            node.valid[idx] = False
+        if node.num_solved < len(node.actions):
+            return False
+
+        child_nodes = node.child_nodes.items() if self.tree == 'array' else enumerate(node.child_nodes)
+        node.solved_idx, node.result = max(((i, -child_node.result) for i, child_node in child_nodes
+                                            if child_node.result is not None), key=lambda each: each[1])
+        return True
+
+    @staticmethod
+    def expand_decided(node, actions, v):
+        """Expand a position whose value v is known to the pruning with uniform priors and prove it, where every
+        move kept wins if v is 1."""
+        node.expand(actions, np.full(len(actions), 1 / len(actions)))
+        node.result = int(v)
+        node.solved_idx = 0 if v == 1 else -1
+
+    def get_one_move_by_simulations(self, node, state, num_simulations, history, early_stop=False):
+        """
+        :param history: an instance of the HistoryPlanes class including state, which is left unchanged
+        :param early_stop: see run_simulations
+        """
+        self.run_simulations(node, state, num_simulations, history, early_stop=early_stop)
         action, next_node, pi = self.sample_actions(node)
 
         # discard all other branches except the branch of the new node,
@@ -103,9 +443,97 @@ class MCTS(object):
         next_node.parent = None
         return action, next_node, pi  # the action will lead to the next_node, that is, the next state
 
+    def run_simulations(self, node, state, num_simulations, history, early_stop=False):
+        """Run num_simulations simulations from node.
+
+        :param early_stop: true to stop as soon as the most visited child can no longer be overtaken by the
+            visits of the simulations left, which cuts pi short, so it is meant for moves which are not policy
+            targets. The move chosen deterministically may still differ from that of the full search, as the
+            simulations skipped could have proven the leading child a loss, which masks it, or a trailing child a win
+        :return: the number of simulations run
+        """
+        if self.make_unmake:
+            board = Board(self.board_size, zobrist=self.zobrist)
+            board.load_state(state)
+
+        if self.stats is not None:
+            instrument(history, self.stats, {'push': 'history', 'pop': 'history', 'get_input': 'history'})
+            if self.make_unmake:
+                instrument(board, self.stats, {'make_move': 'move', 'unmake_move': 'move'})
+
+        num_done = 0
+        while num_done < num_simulations:
+            if node.result is not None:
+                break  # node is proven, so more simulations can not change its move
+            if early_stop and self.is_decided(node, num_simulations - num_done):
+                break
+
+            if self.num_parallel_leaves > 1:
+                num_done += self.search_parallel(node, board, history,
+                                                 min(self.num_parallel_leaves, num_simulations - num_done))
+                continue
+
+            if self.make_unmake:
+                self.search_in_place(False, node, board, history)
+            else:
+                self.search(action=None, start_node=node, start_state=state, history=history)
+            if self.tree == 'node':
+                node.N += 1
+            num_done += 1
+
+        if self.stats is not None:
+            self.stats.count('simulations', num_done)
+        return num_done
+
+    def is_decided(self, node, num_simulations_left):
+        """True if the most visited child of node stays ahead of all the others after num_simulations_left more
+        simulations, i.e. a forced or obvious move, or if node is proven. The visits only bound the move as long as
+        no child gets proven by the simulations left, see run_simulations."""
+        if node.result is not None:
+            return True
+        if self.node_cls.is_leaf_node(node):
+            return False
+
+        Ns = self.get_child_visits(node)
+        num_children = len(Ns) if node.valid is None else int(node.valid.sum())
+        if num_children < 2:
+            return Ns.any()  # a forced move, e.g. a block, once it has a visit to be sampled
+        second_N, first_N = np.partition(Ns, -2)[-2:]
+        return first_N - second_N > num_simulations_left
+
+    def get_child_visits(self, node):
+        """The visit counts of the children of node, where the children proven to lose count as unvisited unless
+        node is proven lost, so that they are neither played nor policy targets."""
+        Ns = node.N if self.tree == 'array' else np.array([child_node.N for child_node in node.child_nodes])
+        if node.valid is not None and node.result is None:
+            Ns = np.where(node.valid, Ns, 0)
+        return Ns
+
+    def get_child_by_action(self, node, action):
+        """Return the child of an expanded node reached by action, None if action was pruned from node."""
+        idxes = np.flatnonzero(node.actions == action)
+        if not len(idxes):
+            return None
+        idx = int(idxes[0])
+        return node.get_child(idx) if self.tree == 'array' else node.child_nodes[idx]
+
+    def get_visits(self, node):
+        """The number of simulations which have passed through node."""
+        return node.visits if self.tree == 'array' else node.N
+
     def sample_actions(self, node):
 
-        Ns = [child_node.N for child_node in node.child_nodes]
+        if node.result is not None and node.result >= 0:
+            # the move proving a win or a draw is played whatever its visits, and is the policy target
+            Ns = np.zeros(len(node.actions), dtype=np.int64)
+            Ns[node.solved_idx] = 1
+        else:
+            Ns = self.get_child_visits(node)
+            if not Ns.any():
+                # no visit to go by, e.g. a root proven lost before any simulation
+                Ns = np.ones(len(node.actions), dtype=np.int64) if node.valid is None or node.result is not None \
+                    else node.valid.astype(np.int64)
+        Ns = Ns.tolist()
         sum_N = sum(Ns)
         pi = {node.actions[idx]: N/sum_N for idx, N in enumerate(Ns)}
 
@@ -117,58 +545,265 @@ class MCTS(object):
             raise ValueError('Unknown value!!!')
 
         action = node.actions[idx]
-        next_node = node.child_nodes[idx]
+        next_node = node.get_child(idx) if self.tree == 'array' else node.child_nodes[idx]
         pi = [pi.get(i, 0) for i in range(self.num_actions)]
         return action, next_node, pi
 
-    def get_probs_and_v(self, state, player_id, history_buffer_black, history_buffer_white):
+    def get_probs_and_v(self, state, player_id, history, position_hash=None, valid_actions=None):
         """Given the current state, return prior prob for each valid action and v for the current state.
 
         :param state: the current state
         :param player_id: the player who is gonna put the stone on the current state
-        :param history_buffer_black: history states for black stones, not including the current state
-        :param history_buffer_white: history states for black stones, not including the current state
+        :param history: an instance of the HistoryPlanes class including the current state
+        :param position_hash: the Zobrist hash of the current state if it is known
+        :param valid_actions: the actions to expand the current state with, every empty cell by default
         :return:
         """
-        global batch_res
-        valid_actions = np.argwhere(state.reshape(-1) == 0).reshape(-1)
+        if valid_actions is None:
+            valid_actions = np.argwhere(state.reshape(-1) == 0).reshape(-1)
+
+        x = collect_self_play_data(player_id, history) if self.use_nn else None
+        key, k = self.get_cache_key(player_id, state, position_hash=position_hash)
+        probs, v = self.evaluate_batch([x], [key], [k])
+
+        return valid_actions, self.get_priors(probs[0], valid_actions), v[0].item()
+
+    def get_valid_actions(self, board, player_id):
+        """Return the actions to expand a position with and its value if the pruning knows it is decided.
 
+        :param board: an instance of the Board class holding the position
+        :return: the actions and the value for player_id, which is None if the network has to evaluate the position
+        """
+        if self.pruner is None:
+            return np.argwhere(board.state.reshape(-1) == 0).reshape(-1), None
+
+        valid_actions, v = self.pruner.prune(board, player_id)
+        if self.stats is not None:
+            self.stats.count('pruned_actions', int((board.state == 0).sum()) - len(valid_actions))
+            if v is not None:
+                self.stats.count('decided_leaves')
+        return valid_actions, v
+
+    def get_priors(self, probs, valid_actions):
+        """The priors of the children from the probs of all the cells, which are renormalized when pruned."""
+        priors = self.add_dirichlet_noise(probs)[valid_actions]
+        if self.pruner is not None and priors.sum() > 0:
+            priors = priors / priors.sum()
+        return priors
+
+    def get_cache_key(self, player_id, state, position_hash=None):
+        """Return the cache key of a position and the dihedral transform to evaluate it under.
+
+        :param position_hash: the Zobrist hash of state if it is known
+        """
+        if not self.use_nn:
+            return None, 0
+
+        if self.symmetry == 'canonical':
+            # the canonical orientation is the one with the smallest hash
+            hashes = self.zobrist.hash_states(state.reshape(-1)[self.symmetries.perms])
+            k = int(np.argmin(hashes))
+            return self.zobrist.get_key(int(hashes[k]), player_id), k
+
+        k = np.random.randint(Symmetries.num_transforms) if self.symmetry == 'random' else 0
+        if self.cache is None:
+            return None, k
+        if position_hash is None:
+            position_hash = self.zobrist.hash_state(state)
+        return self.zobrist.get_key(position_hash, player_id), k
+
+    def evaluate_batch(self, xs, keys=None, transforms=None):
+        """Return probs and v for a list of network inputs.
+
+        :param xs: a list of network inputs, which is only used for its length if use_nn is false
+        :param keys: the cache keys of the inputs, None to bypass the cache
+        :param transforms: the dihedral transform to evaluate each input under, None for no transform
+        :return: probs with shape (len(xs), num_actions) and v with shape (len(xs),) as numpy arrays
+        """
         # tell if we are gonna use neural net to get probs and v
-        if self.use_nn:
-            x = collect_self_play_data(player_id, state, history_buffer_black,
-                                       history_buffer_white, update_buffer=False)
-            idx = threading.current_thread().name
-            batch_buffer.put([idx, x], block=True)
+        if not self.use_nn:
+            probs = np.empty((len(xs), self.num_actions))
+            v = np.empty(len(xs))
+            for i in range(len(xs)):
+                probs[i] = np.random.random(self.num_actions)
+                v[i] = np.random.uniform(-1, 1, 1).item()
+            return probs, v
 
-            while idx not in batch_res:
-                time.sleep(0.0001)
+        request = self.prepare_batch(xs, keys, transforms)
+        new_probs, new_v = self.evaluator(np.stack(request.inputs)) if request.inputs else (None, None)
+        return self.finish_batch(request, new_probs, new_v)
 
-            probs, v = batch_res[idx]
-            del batch_res[idx]
+    def prepare_batch(self, xs, keys=None, transforms=None):
+        """Look a list of network inputs up in the cache and transform the inputs which are missing.
 
-            probs = probs.cpu().numpy()
-            v = v.item()
+        evaluate_batch is prepare_batch, a call of the evaluator on the inputs of the request and finish_batch, which
+        are split so that the evaluator can also be awaited, see AsyncSelfPlay.
 
-        else:
-            probs = np.random.random(self.num_actions)
-            v = np.random.uniform(-1, 1, 1).item()
+        :return: an instance of the EvaluationRequest class, whose inputs are to be evaluated
+        """
+        if self.symmetries is None or transforms is None:
+            transforms = [0] * len(xs)
+        request = EvaluationRequest(transforms)
+        if self.cache is None or keys is None:
+            request.inputs = self.transform_inputs(xs, transforms)
+            request.input_transforms = transforms
+            return request
+
+        request.probs = np.empty((len(xs), self.num_actions), dtype=np.float32)
+        request.v = np.empty(len(xs))
+        # key -> indexes of the inputs, so a position appearing twice in a batch is evaluated once
+        request.missing = missing = {}
+        for i, key in enumerate(keys):
+            entry = self.cache.get(key)
+            if entry is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                request.probs[i], request.v[i] = entry
+
+        first_idxs = [idxs[0] for idxs in missing.values()]
+        request.input_transforms = [transforms[i] for i in first_idxs]
+        request.inputs = self.transform_inputs([xs[i] for i in first_idxs], request.input_transforms)
+        return request
 
+    def finish_batch(self, request, new_probs, new_v):
+        """Merge the outputs of the evaluator on the inputs of request with the cached outputs.
+
+        :return: probs with shape (len(xs), num_actions) and v with shape (len(xs),) as numpy arrays
+        """
+        if request.missing is None:
+            return self.inverse_transform(new_probs, request.transforms), new_v
+
+        # in canonical mode the cache keeps probs in the canonical orientation, otherwise in the original one
+        cache_transformed = self.symmetry == 'canonical'
+        probs, v = request.probs, request.v
+        if request.missing:
+            if not cache_transformed:
+                new_probs = self.inverse_transform(new_probs, request.input_transforms)
+            for (key, idxs), each_probs, each_v in zip(request.missing.items(), new_probs, new_v):
+                self.cache.put(key, each_probs, float(each_v))
+                probs[idxs] = each_probs
+                v[idxs] = each_v
+
+        if cache_transformed:
+            probs = self.inverse_transform(probs, request.transforms)
+        return probs, v
+
+    def transform_inputs(self, xs, transforms):
+        if self.symmetries is not None:
+            xs = [self.symmetries.transform_planes(x, k) for x, k in zip(xs, transforms)]
+        return xs
+
+    def inverse_transform(self, probs, transforms):
+        if self.symmetries is None:
+            return probs
+        return self.symmetries.inverse_transform_policies(probs, np.asarray(transforms))
+
+    def add_dirichlet_noise(self, probs):
         # tell if we are gonna add dirichlet noise every time we expand a leaf node in order to enhance exploration
         if self.add_noise:
             noise = np.random.dirichlet([self.alpha]*self.num_actions)
             probs = (1 - self.eps) * probs + self.eps * noise
-
-        return valid_actions, probs[valid_actions], v
+        return probs
 
     def choose_max_ucb_move(self, start_node, start_state):
+        best_idx, best_action, best_child_node = self.select_child(start_node)
+        best_state = Board.get_new_state(start_state, best_action, start_node.player_id)
+        return best_idx, best_action, best_child_node, best_state
 
-        child_stats = [[child_node.Q, child_node.p, child_node.N] for child_node in start_node.child_nodes]
-        best_idx = pynode.get_max_ucb_child(self.c_puct, start_node.N, child_stats)
+    def select_child(self, start_node):
+        if self.tree == 'array':
+            best_idx = self.choose_max_ucb_idx(start_node)
+            return best_idx, start_node.actions[best_idx], start_node.get_child(best_idx)
 
-        best_action = start_node.actions[best_idx]
-        best_child_node = start_node.child_nodes[best_idx]
-        best_state = Board.get_new_state(start_state, best_action, start_node.player_id)
-        return best_action, best_child_node, best_state
+        child_nodes = start_node.child_nodes
+        if start_node.valid is None:
+            child_stats = [[child_node.Q, child_node.p, child_node.N] for child_node in child_nodes]
+            best_idx = pynode.get_max_ucb_child(self.c_puct, start_node.N, child_stats)
+        else:
+            idxs = np.flatnonzero(start_node.valid).tolist()
+            child_stats = [[child_nodes[i].Q, child_nodes[i].p, child_nodes[i].N] for i in idxs]
+            best_idx = idxs[pynode.get_max_ucb_child(self.c_puct, start_node.N, child_stats)]
+        return best_idx, start_node.actions[best_idx], child_nodes[best_idx]
+
+    def backup(self, start_node, best_idx, best_child_node, v):
+        """Update the stats of the edge from start_node to best_child_node with v, which is from start_node's view."""
+        if self.tree == 'array':
+            start_node.update(best_idx, v)
+        else:
+            best_child_node.Q = ((best_child_node.Q * best_child_node.N) + v) / (best_child_node.N + 1)
+            best_child_node.N += 1
+
+    def choose_max_ucb_idx(self, start_node):
+        # the children's stats are read in place from the arrays, and the node is counted as visited right away
+        best_idx, start_node.visits = pynode.get_max_ucb_child_np(self.c_puct, start_node.visits,
+                                                                  start_node.P, start_node.N, start_node.W,
+                                                                  start_node.valid)
+        return best_idx
+
+
+class SearchSession(object):
+    """
+    A stateful search over one game, which keeps the relevant subtree after every move of either side.
+
+    Both the moves chosen by search and the moves coming from elsewhere, e.g. a human in the GUI, go through
+    advance, so the visits below the move played are reused by the next search.
+    """
+
+    def __init__(self, mcts, history_len_per_player=2):
+        self.mcts = mcts
+        self.board_size = mcts.board_size
+        self.history_len_per_player = history_len_per_player
+        self.reset()
+
+    def reset(self):
+        self.board = Board(self.board_size)
+        self.player_id = 1  # 1 for black 2 for white
+        self.history = init_history(self.history_len_per_player, self.board_size)
+        self.root = self.mcts.create_root(self.player_id)
+        self.num_moves = 0
+        self.num_simulations = 0
+        self.num_reused_visits = 0
+
+    def search(self, num_simulations, early_stop=False):
+        """Run num_simulations more simulations from the current position and return the action chosen and pi.
+
+        The action is not played, call advance to play it.
+
+        :param early_stop: true to stop once the move chosen is decided, see MCTS.run_simulations
+        """
+        self.num_simulations += self.mcts.run_simulations(self.root, self.board.state, num_simulations, self.history,
+                                                          early_stop=early_stop)
+        action, _, pi = self.mcts.sample_actions(self.root)
+        return action, pi
+
+    def advance(self, action):
+        """Play action for the player to move and keep the subtree below it.
+
+        :param action: a two-dimensional tuple or an int type move value
+        :return: the number of visits of the subtree kept
+        """
+        if isinstance(action, tuple):
+            action = loc_2_idx(action, self.board_size)
+
+        next_root = None
+        if not self.mcts.node_cls.is_leaf_node(self.root):
+            next_root = self.mcts.get_child_by_action(self.root, action)
+        if next_root is None:
+            next_root = self.mcts.create_root(switch_player(self.player_id))
+        next_root.parent = None
+
+        self.board.make_move(action, self.player_id)
+        self.history.push(self.player_id, action)
+        self.player_id = switch_player(self.player_id)
+        self.root = next_root
+        self.num_moves += 1
+
+        reused_visits = self.mcts.get_visits(next_root)
+        self.num_reused_visits += reused_visits
+        return reused_visits
+
+    def is_over(self):
+        return self.board.winning_flag or self.board.is_full()
 
 
 def change_sampling_strategy(mcts, strategy_change_point, num_moves):
@@ -178,96 +813,111 @@ def change_sampling_strategy(mcts, strategy_change_point, num_moves):
         mcts.strategy = 'deterministically'
 
 
-def update_history_buffer(player_id, state, history_buffer_black, history_buffer_white):
-    # 1 for black 2 for white
-    if player_id == 1:
-        # append last player's move
-        white_plane = np.zeros_like(state, dtype=np.float32)
-        white_plane[state == 2] = 1
-        history_buffer_white.append(white_plane)
-    else:
-        # append last player's move
-        black_plane = np.zeros_like(state, dtype=np.float32)
-        black_plane[state == 1] = 1
-        history_buffer_black.append(black_plane)
-
+def collect_self_play_data(player_id, history):
+    return history.get_input(player_id)
 
-def collect_self_play_data(player_id, state, history_buffer_black, history_buffer_white, update_buffer=True):
-    if update_buffer:
-        update_history_buffer(player_id, state, history_buffer_black, history_buffer_white)
 
-    # 1 for black 2 for white
-    if player_id == 1:
-        player_indicator = np.ones_like(state, dtype=np.float32)
-    else:
-        player_indicator = np.zeros_like(state, dtype=np.float32)
+def init_history(history_len_per_player, board_size):
+    history = HistoryPlanes(history_len_per_player, board_size)
+    history.push(2, None)  # the plane of white stones for the empty board, as white is regarded as the last player
+    return history
 
-    x = np.stack((player_indicator, *history_buffer_white, *history_buffer_black))
-    return x
 
+def self_play(config, evaluator, num_games, writer, model_version, reporter=None, profiler=None):
+    """Play games until config.max_games games have been finished by all the self-play threads and processes.
 
-def init_history_buffer(history_buffer_len_per_player, state):
-    history_buffer_black = deque(maxlen=history_buffer_len_per_player)
-    history_buffer_white = deque(maxlen=history_buffer_len_per_player)
-    for _ in range(history_buffer_len_per_player):
-        history_buffer_black.append(np.zeros_like(state, dtype=np.float32))
-        history_buffer_white.append(np.zeros_like(state, dtype=np.float32))
-    return history_buffer_black, history_buffer_white
+    :param config: an instance of the SelfPlayConfig class
+    :param evaluator: the evaluator of MCTS, None to search with random priors and values instead of the model
+    :param num_games: a multiprocessing.Value counting the finished games
+    :param writer: an instance of the ShardWriter class the finished games go to
+    :param model_version: a multiprocessing.Value of the version of the model serving, -1 for random weights,
+        which tags every position and invalidates the evaluation cache when it changes
+    :param reporter: an instance of the Reporter class summing up the counters of this thread, None for no summary
+    :param profiler: an instance of the SamplingProfiler class to sample this thread, None for no profiling
+    """
+    board_size = config.board_size
+    stats = reporter.register() if reporter is not None else Stats()
+    if profiler is not None:
+        profiler.add_thread()
 
+    cache = EvaluationCache(config.cache_mb) if config.cache_mb > 0 else None
+    mcts = get_mcts_cls(config)(board_size, c_puct=config.c_puct, use_nn=evaluator is not None, evaluator=evaluator,
+                                num_parallel_leaves=config.num_parallel_leaves, cache=cache, symmetry=config.symmetry,
+                                pruning=config.pruning, pruning_radius=config.pruning_radius,
+                                stats=stats if config.instrument else None)
+    init_state = Board(board_size).init_state
+    version = model_version.value
 
-def self_play(max_games, lock):
-    global num_games
-    while num_games < max_games:
+    while num_games.value < config.max_games:
         player_id = 1  # 1 for black 2 for white
-        node = Node(parent=None, p=None, player_id=player_id)
-        state = board.init_state
-        history_buffer_black, history_buffer_white = init_history_buffer(history_buffer_len_per_player, state)
+        node = mcts.create_root(player_id)
+        state = init_state
+        history = init_history(config.history_len_per_player, board_size)
+        change_sampling_strategy(mcts, config.strategy_change_point, 0)
 
         # self-play until we have a winner or the number of moves exceeds the max_moves
         num_moves = 0
-        data_points = []
-        tik = time.time()
+        num_saved_simulations = 0
+        xs, pis, player_ids, versions, moves = [], [], [], [], []
         while 1:
-            action, node, pi = mcts.get_one_move_by_simulations(node, state, num_simulations,
-                                                                deepcopy(history_buffer_black),
-                                                                deepcopy(history_buffer_white))
-            x = collect_self_play_data(player_id, state, history_buffer_black, history_buffer_white)
-            data_points.append([player_id, x, pi])
+            if model_version.value != version:
+                version = model_version.value
+                if cache is not None:
+                    cache.clear()  # the outputs of the previous model
+
+            # playout cap randomization: only the moves with a full search are policy targets, the others get a fast
+            # search without noise, which may stop early, and are played but not recorded
+            full_search = np.random.random() < config.full_search_prob
+            mcts.add_noise = full_search
+            num_done = mcts.run_simulations(node, state,
+                                            config.num_simulations if full_search else config.num_fast_simulations,
+                                            history, early_stop=config.early_stop and not full_search)
+            num_saved_simulations += config.num_simulations - num_done
+
+            action, next_node, pi = mcts.sample_actions(node)
+            next_node.parent = None
+            node = next_node
+            if full_search:
+                xs.append(collect_self_play_data(player_id, history))
+                pis.append(pi)
+                player_ids.append(player_id)
+                versions.append(version)
+                moves.append(num_moves)
+                stats.count('full_searches')
             state = Board.get_new_state(state, action, player_id)
+            history.push(player_id, action)
             num_moves += 1
-            lock.acquire()
-            print(os.getpid(), threading.current_thread().name, num_moves, time.time() - tik)
-            tik = time.time()
-            lock.release()
+            stats.count('moves')
 
-            change_sampling_strategy(mcts, strategy_change_point, num_moves)
+            change_sampling_strategy(mcts, config.strategy_change_point, num_moves)
 
             if Board.has_won(action, state, board_size):
-                lock.acquire()
-                num_games += 1
-                print('{pid}, {thread_id}: {num} of games! Play {player_id} has won the game!'
-                      .format(pid=os.getpid(), thread_id=threading.current_thread().name,
-                              num=num_games, player_id=player_id))
-                lock.release()
-
-                for player_id_for_x, x, pi in data_points:
-                    if player_id_for_x == player_id:
-                        self_play_buffer.put((x, pi, 1), block=True)
-                    else:
-                        self_play_buffer.put((x, pi, -1), block=True)
+                with num_games.get_lock():
+                    num_games.value += 1
+                    game_id = num_games.value
+                stats.count('games')
+                stats.count('black_wins' if player_id == 1 else 'white_wins')
+                stats.count('saved_simulations', num_saved_simulations)
+                if cache is not None:
+                    stats.count('cache_hits', cache.hits - stats.counts['cache_hits'])
+                    stats.count('cache_lookups', cache.hits + cache.misses - stats.counts['cache_lookups'])
+
+                if xs:
+                    zs = np.where(np.array(player_ids) == player_id, 1, -1)
+                    writer.put(np.stack(xs), np.array(pis), zs, player_ids, game_id, versions, moves)
 
                 break
-            elif num_moves == max_moves:
+            elif num_moves == config.max_moves:
                 break
 
             player_id = switch_player(player_id)
 
 
-def self_play_multi_threads(max_games, lock):
+def self_play_multi_threads(config, evaluator, num_games, writer, model_version, reporter=None, profiler=None):
 
     t_list = [threading.Thread(target=self_play, name='thread_{idx}'.format(idx=idx), daemon=True,
-                               args=(max_games, lock))
-              for idx in range(num_threads)]
+                               args=(config, evaluator, num_games, writer, model_version, reporter, profiler))
+              for idx in range(config.num_threads)]
 
     for t in t_list:
         t.start()
@@ -275,91 +925,105 @@ def self_play_multi_threads(max_games, lock):
         t.join()
 
 
-def batch_inference():
-    global num_games, batch_res
+def build_shard_writer(config):
+    return ShardWriter(config.data_dir, config.in_channels, config.board_size, shard_size=config.shard_size)
 
-    with torch.no_grad():
-        while 1:
-            if num_games >= max_games:
-                break
 
-            if batch_buffer.full():
-                data = [batch_buffer.get(block=False) for _ in range(batch_size)]
-                idx, x = list(zip(*data))
-                x = torch.from_numpy(np.stack(x)).cuda()
-                load_model_event.wait()
-                probs, v = model(x)
-                for i, id_ in enumerate(idx):
-                    batch_res[id_] = [probs[i], v[i]]
-
-            if self_play_buffer.full():
-                data = [self_play_buffer.get(block=False) for _ in range(self_play_buffer_len)]
-                file_name = '_'.join(['data', str(os.getpid()), datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')])
-                with open(file_name, 'wb') as f:
-                    pickle.dump(data, f)
-
-
-def get_model():
-    # TODO: get new model according to the number of self-play games, rather than scan the folder
-    global current_model_name, model
-
-    while 1:
-        models = sorted([each for each in os.listdir('../models') if 'model_' in each])
-        if models:
-            newest_model_name = models[-1]
-            if current_model_name == newest_model_name:
-                time.sleep(60*10)
-            else:
-                load_model_event.clear()
-                state_dict = torch.load('../models/' + newest_model_name)
-                model.load_state_dict(state_dict)
-                current_model_name = newest_model_name
-                load_model_event.set()
-        else:
-            time.sleep(60*10)
+def watch_models(config, inference_server, model_version, stop_event=None):
+    """Swap every new version published to config.model_dir into inference_server within seconds.
 
+    :param model_version: a multiprocessing.Value set to the version serving right after every swap
+    """
+    def swap(version, state_dict):
+        inference_server.load_state_dict(state_dict, version)
+        model_version.value = version
 
-if __name__ == '__main__':
+    ModelRegistry(config.model_dir).watch(swap, poll_interval=config.model_poll_interval, stop_event=stop_event,
+                                          best=config.follow_best_model)
 
-    board_size = 11
-    max_moves = board_size**2
-    num_simulations = 400
-    strategy_change_point = 10
 
-    history_buffer_len_per_player = 2
-    in_channels = history_buffer_len_per_player * 2 + 1
-    self_play_buffer_len = 5000
-    self_play_buffer = Queue(maxsize=self_play_buffer_len)
+def build_reporter(config, name):
+    """The Reporter of a process, which logs to TensorBoard under config.log_dir/name."""
+    log_dir = os.path.join(config.log_dir, name) if config.log_dir is not None else None
+    return Reporter(config.summary_interval, log_dir=log_dir)
 
-    num_games = 0
-    max_games = 63
-    num_threads = 64
-    lock = threading.Lock()
 
-    batch_res = {}
-    batch_size = 32
-    batch_buffer = Queue(maxsize=batch_size)
+def build_profiler(config):
+    return SamplingProfiler(config.profile_interval) if config.profile_path is not None else None
 
-    current_model_name = None
-    model = Model(in_channels, num_filters=128, num_blocks=5, board_size=board_size)
-    model.cuda()
-    model.eval()
-    load_model_event = threading.Event()
-    load_model_event.set()
 
-    board = Board(board_size)
-    mcts = MCTS(board_size, use_nn=True)
+def build_backend(config):
+    """Build the inference backend and return it with the batch size to use, which is autotuned if asked."""
+    model = Model(config.in_channels, num_filters=config.num_filters, num_blocks=config.num_blocks,
+                  board_size=config.board_size)
+    backend = InferenceBackend(model, device=config.device, num_threads=config.num_inference_threads,
+                               fold_bn=config.fold_bn)
 
-    model_scan_thread = threading.Thread(target=get_model, daemon=True)
-    batch_inference_thread = threading.Thread(target=batch_inference, daemon=True)
+    batch_size = config.batch_size
+    if config.autotune_batch_size:
+        batch_size, _ = backend.autotune_batch_size(max_latency=config.max_batch_latency)
+    return backend, batch_size
 
-    tik = time.time()
-    batch_inference_thread.start()
-    if num_threads != 1:
-        self_play_multi_threads(max_games, lock)
+
+def get_mcts_cls(config):
+    """The MCTS class of config, NativeMCTS if config.native_search is true and MCTS otherwise."""
+    if config.native_search:
+        from native_mcts import NativeMCTS
+        return NativeMCTS
+    return MCTS
+
+
+def run_self_play(config):
+    """Self-play in threads of the current process, in config.num_workers processes if it is positive, in lockstep
+    by the current thread if config.num_lockstep_games is positive, or by coroutines of the current thread if
+    config.num_async_games is positive."""
+    if config.num_workers > 0:
+        from self_play_mp import run_self_play_processes
+        return run_self_play_processes(config)
+    if config.num_lockstep_games > 0:
+        from lockstep import run_lockstep_self_play
+        return run_lockstep_self_play(config)
+    if config.num_async_games > 0:
+        from async_self_play import run_async_self_play
+        return run_async_self_play(config)
+
+    num_games = multiprocessing.Value('i', 0)
+    model_version = multiprocessing.Value('i', -1)
+    writer = build_shard_writer(config)
+
+    reporter = build_reporter(config, 'self_play')
+    profiler = build_profiler(config)
+
+    backend, batch_size = build_backend(config)
+    inference_server = InferenceServer(backend, batch_size, max_wait=config.max_wait,
+                                       stats=reporter.register() if config.instrument else None)
+    model_watch_thread = threading.Thread(target=watch_models, args=(config, inference_server, model_version),
+                                          daemon=True)
+
+    inference_server.start()
+    model_watch_thread.start()
+    writer.start()
+    reporter.start()
+    if profiler is not None:
+        profiler.start()
+    if config.num_threads != 1:
+        self_play_multi_threads(config, inference_server.evaluate, num_games, writer, model_version, reporter,
+                                profiler)
     else:
-        self_play(max_games, lock)
-    batch_inference_thread.join()
+        self_play(config, inference_server.evaluate, num_games, writer, model_version, reporter, profiler)
+    inference_server.stop()
+    writer.close()
+    reporter.stop()
+    if profiler is not None:
+        profiler.stop()
+        profiler.dump(config.profile_path)
 
+
+if __name__ == '__main__':
+
+    config = SelfPlayConfig()
+
+    tik = time.time()
+    run_self_play(config)
     tok = time.time()
-    print((tok-tik) / max_games)
+    print((tok-tik) / config.max_games)
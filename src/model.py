@@ -8,6 +8,8 @@ Created on 2020/4/5
 
 
 import time
+import copy
+import threading
 import numpy as np
 import torch
 import torch.nn as nn
@@ -66,9 +68,9 @@ class Model(nn.Module):
         out = self.relu(out)
         out = self.residual_layers(out)
 
-        probs = self.policy_head(out)
+        logits = self.policy_head(out)  # the log probs up to a constant, see InferenceBackend.forward
         v = self.value_head(out)
-        return probs, v
+        return logits, v
 
     def make_residual_layers(self, block, num_blocks):
         layers = [block(self.num_filters, self.num_filters) for _ in range(num_blocks)]
@@ -98,34 +100,137 @@ class Model(nn.Module):
         return value_head
 
 
+def fold_batch_norm(model):
+    """Return a copy of the model in eval mode, where every BatchNorm2d following a Conv2d is folded into the conv.
+
+    The BatchNorm1d layers of the heads normalize each position separately, so they cannot be folded into a conv.
+    """
+    model = copy.deepcopy(model).eval()
+
+    def fold(conv, bn):
+        scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+        bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+        folded = nn.Conv2d(conv.in_channels, conv.out_channels, kernel_size=conv.kernel_size, stride=conv.stride,
+                           padding=conv.padding, bias=True).to(conv.weight.device)
+        folded.weight.data.copy_(conv.weight * scale.reshape(-1, 1, 1, 1))
+        folded.bias.data.copy_((bias - bn.running_mean) * scale + bn.bias)
+        return folded
+
+    with torch.no_grad():
+        for module in [model] + [block for block in model.residual_layers if isinstance(block, BasicBlock)]:
+            module.conv1 = fold(module.conv1, module.bn1)
+            module.bn1 = nn.Identity()
+            if isinstance(module, BasicBlock):
+                module.conv2 = fold(module.conv2, module.bn2)
+                module.bn2 = nn.Identity()
+    return model
+
+
+class InferenceBackend(object):
+    """
+    Device-agnostic inference of Model, which maps a numpy batch to numpy probs and v and can be used as the
+    evaluator of MCTS.
+
+    New weights are double buffered: they are loaded into a copy of the model while the current one keeps serving,
+    and the copy replaces it by a single assignment, so forward passes never wait for a load.
+    """
+
+    def __init__(self, model, device=None, num_threads=None, fold_bn=False):
+        """
+        :param model: an instance of the Model class
+        :param device: the device to run on, by default cuda if it is available and cpu otherwise
+        :param num_threads: the number of intra-op threads of torch on cpu, None to keep the default
+        :param fold_bn: true to fold the BatchNorm layers following convs into the convs
+        """
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = torch.device(device)
+        self.fold_bn = fold_bn
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        self.model = model.to(self.device).eval()
+        self.inference_model = fold_batch_norm(self.model) if fold_bn else self.model
+        self.version = -1  # the version of the weights serving, -1 for the initial random weights
+        # torch.inference_mode is only available from torch 1.9 on
+        self._inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
+        self._load_lock = threading.Lock()
+
+    def load_state_dict(self, state_dict, version=-1):
+        with self._load_lock:
+            model = copy.deepcopy(self.model)
+            model.load_state_dict(state_dict)
+            inference_model = fold_batch_norm(model) if self.fold_bn else model
+
+            # forward only reads inference_model, so this assignment is the swap
+            self.inference_model = inference_model
+            self.model = model
+            self.version = version
+
+    def forward(self, x):
+        """Run the model on a tensor and return probs and v as tensors on the device."""
+        with self._inference_mode():
+            logits, v = self.inference_model(x.to(self.device))
+            return torch.softmax(logits, dim=1), v
+
+    def __call__(self, xs):
+        probs, v = self.forward(torch.from_numpy(np.ascontiguousarray(xs, dtype=np.float32)))
+        return probs.cpu().numpy(), v.cpu().numpy().reshape(-1)
+
+    def benchmark(self, batch_size, num_repeats=10, num_warmups=2):
+        """Return the mean latency in seconds of one forward pass with the given batch size."""
+        model = self.inference_model
+        x = torch.rand(batch_size, model.in_channels, model.board_size, model.board_size)
+        for _ in range(num_warmups):
+            self(x.numpy())
+
+        tik = time.time()
+        for _ in range(num_repeats):
+            self(x.numpy())
+        return (time.time() - tik) / num_repeats
+
+    def autotune_batch_size(self, batch_sizes=(1, 2, 4, 8, 16, 32, 64, 128, 256), max_latency=None, num_repeats=10):
+        """Find the batch size with the highest throughput on the current machine.
+
+        :param batch_sizes: candidate batch sizes
+        :param max_latency: if given, only batch sizes whose forward pass takes at most max_latency seconds count
+        :return:
+            batch_size: the best batch size
+            results: a list of (batch_size, latency, samples/sec) for every candidate
+        """
+        results = []
+        for batch_size in batch_sizes:
+            latency = self.benchmark(batch_size, num_repeats=num_repeats)
+            results.append((batch_size, latency, batch_size / latency))
+
+        candidates = [each for each in results if max_latency is None or each[1] <= max_latency]
+        if not candidates:
+            candidates = results[:1]
+        batch_size = max(candidates, key=lambda each: each[2])[0]
+        return batch_size, results
+
+
 if __name__ == '__main__':
     # writer = SummaryWriter('../logs/model_test_0')
 
     in_channels = 5
     board_size = 11
-    batch_size = 8192
     num_filters = 128
     num_blocks = 5
-
-    dummy_input = np.random.random((batch_size, in_channels, board_size, board_size)).astype(np.float32)
-    dummy_input = torch.from_numpy(dummy_input).cuda()
+    num_threads = None  # intra-op threads on cpu, None for the default of torch
 
     model = Model(in_channels, num_filters=num_filters, num_blocks=num_blocks, board_size=board_size)
     model.eval()
-    model.cuda()
-    cnt = 0
-    accu_time = 0
-    while cnt <= 5:
-        with torch.no_grad():
-            cnt += 1
-            tik = time.time()
-            probs, v = model(dummy_input)
-            tok = time.time()
-            accu_time += tok - tik
-            # print(tok-tik)
-
-    print('time used per sample: {time}'.format(time=accu_time/cnt/batch_size))
-    print('time used totally: {time}'.format(time=accu_time))
+
+    for fold_bn in (False, True):
+        backend = InferenceBackend(model, num_threads=num_threads, fold_bn=fold_bn)
+        batch_size, results = backend.autotune_batch_size()
+        print('device: {device}, fold_bn: {fold_bn}, threads: {threads}'
+              .format(device=backend.device, fold_bn=fold_bn, threads=torch.get_num_threads()))
+        for each_batch_size, latency, samples_per_sec in results:
+            print('batch size: {bs:5d}, latency: {latency:.6f}s, samples/sec: {sps:.1f}'
+                  .format(bs=each_batch_size, latency=latency, sps=samples_per_sec))
+        print('best batch size: {bs}'.format(bs=batch_size))
 
     pytorch_total_params = sum(p.numel() for p in model.parameters())
     print('num of weights: {weights}'.format(weights=pytorch_total_params))
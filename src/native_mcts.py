@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+
+from mcts import MCTS, PendingLeaves
+from symmetry import Symmetries
+import pynode
+
+PRUNING_MODES = {None: 0, 'forced': 1, 'radius': 2, 'forced_radius': 3}
+
+
+class NativeNode(object):
+    __slots__ = ('tree', 'action', 'parent')
+
+    def __init__(self, tree, action=None):
+        """A node of a pynode.SearchTree, which is the root of the tree, or the child of the root reached by action.
+
+        It reads like an ArrayNode, so the methods of MCTS sampling the moves and walking the tree work on it. A tree
+        only keeps the subtree of its root, so a child becomes the root of the tree as soon as it is used, which frees
+        the nodes above it.
+
+        :param tree: an instance of the pynode.SearchTree class
+        :param action: the action from the root of tree to this node, None for the root
+        """
+        self.tree = tree
+        self.action = action
+        self.parent = None
+
+    def get_tree(self):
+        """The tree with this node as its root."""
+        if self.action is not None:
+            self.tree.advance(self.action)
+            self.action = None
+        return self.tree
+
+    @property
+    def player_id(self):
+        return self.get_tree().player_id
+
+    @property
+    def visits(self):
+        return self.get_tree().visits
+
+    @property
+    def result(self):
+        return self.get_tree().result
+
+    @property
+    def solved_idx(self):
+        return self.get_tree().solved_idx
+
+    @property
+    def actions(self):
+        return self.get_tree().actions
+
+    @property
+    def N(self):
+        return self.get_tree().N
+
+    @property
+    def valid(self):
+        return self.get_tree().valid
+
+    def get_child(self, idx):
+        tree = self.get_tree()
+        return NativeNode(tree, int(tree.actions[idx]))
+
+    @staticmethod
+    def is_leaf_node(node):
+        return node.get_tree().is_leaf()
+
+
+class NativeLeaves(PendingLeaves):
+    __slots__ = ('tree',)
+
+    def __init__(self, tree):
+        """The leaves selected by a pynode.SearchTree, which keeps their paths, see NativeMCTS.select_leaves."""
+        super(NativeLeaves, self).__init__()
+        self.tree = tree
+
+
+class NativeMCTS(MCTS):
+    """
+    A drop-in MCTS whose tree lives in the pynode extension, where the whole select, expand and backup loop runs
+    with the GIL released and Python only evaluates the batches of leaves.
+
+    It searches like MCTS on the array tree with make_unmake, including pruning, the solver, virtual losses and
+    dirichlet noise, but without a cache, so symmetry is None or 'random'. Its nodes are NativeNodes, and the
+    moves are sampled and the trees reused by the methods of MCTS as they are.
+    """
+
+    def __init__(self, board_size, strategy='stochastically', c_puct=5, use_nn=True, add_noise=True, alpha=0.03,
+                 eps=0.25, num_parallel_leaves=1, virtual_loss=1, evaluator=None, cache=None, symmetry=None,
+                 pruning=None, pruning_radius=2, stats=None):
+        """See MCTS, a cache is not supported."""
+        if cache is not None:
+            raise ValueError('The native search does not support a cache!!!')
+        super(NativeMCTS, self).__init__(board_size, strategy=strategy, c_puct=c_puct, use_nn=use_nn,
+                                         add_noise=add_noise, alpha=alpha, eps=eps,
+                                         num_parallel_leaves=num_parallel_leaves, virtual_loss=virtual_loss,
+                                         evaluator=evaluator, symmetry=symmetry, pruning=pruning,
+                                         pruning_radius=pruning_radius, stats=stats)
+        # the roots of the native trees read like ArrayNodes, so the array code paths of MCTS apply
+        self.node_cls = NativeNode
+        self.pruning = PRUNING_MODES[pruning]
+        self.pruning_radius = pruning_radius
+
+    def create_root(self, player_id):
+        tree = pynode.SearchTree(self.board_size, player_id, c_puct=self.c_puct, virtual_loss=self.virtual_loss,
+                                 pruning=self.pruning, pruning_radius=self.pruning_radius, alpha=self.alpha,
+                                 eps=self.eps, seed=np.random.randint(2 ** 31))
+        return NativeNode(tree)
+
+    def run_simulations(self, node, state, num_simulations, history, early_stop=False):
+        """See MCTS.run_simulations, where the loop runs in the extension."""
+        tree = node.get_tree()
+        tree.set_root(state, history.get_input(tree.player_id))
+        num_done = tree.run(num_simulations, self.num_parallel_leaves, self.evaluate_inputs, early_stop,
+                            self.add_noise)
+        if self.stats is not None:
+            self.stats.count('simulations', num_done)
+        return num_done
+
+    def is_decided(self, node, num_simulations_left):
+        return node.get_tree().is_decided(num_simulations_left)
+
+    def select_leaves(self, node, board, history, num_leaves):
+        """See MCTS.select_leaves, where paths holds the ids of the leaves in the tree, which keeps their paths."""
+        tree = node.get_tree()
+        tree.set_root(board.state, history.get_input(tree.player_id))
+        inputs, num_done = tree.select_leaves(num_leaves)
+
+        leaves = NativeLeaves(tree)
+        leaves.num_done = num_done
+        leaves.paths = tree.pending_leaves
+        leaves.xs = list(inputs)
+        leaves.keys = [None] * len(inputs)
+        leaves.transforms = self.get_transforms(len(inputs))
+        return leaves
+
+    def expand_leaves(self, leaves, probs, v):
+        leaves.tree.expand_leaves(probs, v, self.add_noise)
+
+    def search_parallel(self, node, board, history, num_leaves):
+        leaves = self.select_leaves(node, board, history, num_leaves)
+        if leaves.paths:
+            probs, v = self.evaluate_batch(leaves.xs, leaves.keys, leaves.transforms)
+            self.expand_leaves(leaves, probs, v)
+        return leaves.num_done + len(leaves.paths)
+
+    def evaluate_inputs(self, inputs):
+        """The evaluation of a batch of network inputs for the extension, see evaluate_batch."""
+        return self.evaluate_batch(list(inputs), None, self.get_transforms(len(inputs)))
+
+    def get_transforms(self, num_inputs):
+        if self.symmetry != 'random':
+            return [0] * num_inputs
+        return np.random.randint(Symmetries.num_transforms, size=num_inputs).tolist()
@@ -1,7 +1,13 @@
 #include <pybind11/pybind11.h>
-#include <pybind11/stl.h >
+#include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 #include <vector>
 #include <algorithm>
+#include <bitset>
+#include <cstdint>
+#include <cstring>
+#include <random>
+#include <stdexcept>
 using std::vector;
 using std::max;
 using std::min;
@@ -29,6 +35,49 @@ int get_max_ucb_child(double c_puct, int parent_N, vector<vector<double>> child_
     return best_idx;
 }
 
+py::tuple get_max_ucb_child_np(double c_puct, int parent_N,
+                               py::array_t<double, py::array::c_style> P,
+                               py::array_t<int, py::array::c_style> N,
+                               py::array_t<double, py::array::c_style> W,
+                               py::object valid) {
+    // same as get_max_ucb_child, but reads the children's stats in place from the numpy arrays of an ArrayNode,
+    // where Q is W / N (0 for unvisited children) and children with valid[i] == false are skipped.
+    auto p = P.unchecked<1>();
+    auto n = N.unchecked<1>();
+    auto w = W.unchecked<1>();
+    py::ssize_t num_children = p.shape(0);
+    if (n.shape(0) != num_children || w.shape(0) != num_children) {
+        throw std::invalid_argument("P, N and W must have the same length");
+    }
+
+    const bool* mask = nullptr;
+    py::array_t<bool, py::array::c_style> valid_array;
+    if (!valid.is_none()) {
+        valid_array = valid.cast<py::array_t<bool, py::array::c_style>>();
+        if (valid_array.shape(0) != num_children) {
+            throw std::invalid_argument("valid must have the same length as P");
+        }
+        mask = valid_array.data();
+    }
+
+    double sqrt_parent_N = sqrt((double)parent_N);
+    double best_U = -INFINITY;
+    int best_idx = -1;
+    for (py::ssize_t i = 0; i < num_children; i++) {
+        if (mask != nullptr && !mask[i]) {
+            continue;
+        }
+        double Q = n(i) > 0 ? w(i) / n(i) : 0.0;
+        double U = Q + c_puct * p(i) * sqrt_parent_N / (1.0 + n(i));
+        if (U > best_U) {
+            best_U = U;
+            best_idx = (int)i;
+        }
+    }
+
+    return py::make_tuple(best_idx, parent_N + 1);
+}
+
 bool is_five_in_a_row(int x, int y, vector<vector<int>> state, int board_size, int player_id) {
     int counter = 0;
     for (int i = max(0, x - 5 + 1); i < min(board_size, x + 5); i++) {
@@ -95,31 +144,882 @@ bool is_five_in_a_row(int x, int y, vector<vector<int>> state, int board_size, i
 }
 
 
-//
-//void update_Q(Node& node, double v) {
-//    node.Q = (node.Q * node.N + v) / (1.0 + node.N);
-//}
-//
-//void update_N(Node& node) {
-//    node.N++;
-//}
-//
-//bool is_leaf_node(Node node) {
-//    if (node.actions.empty()) {
-//        return true;
-//    }
-//    else {
-//        return false;
-//    }
-//}
-//
-//void clear_parent_info(Node& node) {
-//    delete node.parent;
-//    node.parent = NULL;
-//}
+class BitBoard {
+    // Gomoku position stored as one bitset per player and per line (row, column, diagonal and anti-diagonal),
+    // so a stone touches 4 words and five in a row through it is checked with a few shifts per line.
+    friend class SearchTree;
+
+public:
+    BitBoard(int board_size) {
+        if (board_size < 5 || board_size > 64) {
+            throw std::invalid_argument("board_size must be in [5, 64]");
+        }
+        this->board_size = board_size;
+        this->num_stones = 0;
+        this->cells.assign(board_size * board_size, 0);
+        for (int i = 0; i < 2; i++) {
+            this->rows[i].assign(board_size, 0);
+            this->cols[i].assign(board_size, 0);
+            this->diags[i].assign(2 * board_size - 1, 0);
+            this->anti_diags[i].assign(2 * board_size - 1, 0);
+        }
+    }
+
+public:
+    int board_size, num_stones;
+
+private:
+    std::vector<int> cells;
+    std::vector<uint64_t> rows[2], cols[2], diags[2], anti_diags[2];
+
+    void check_loc(int x, int y) {
+        if (x < 0 || x >= this->board_size || y < 0 || y >= this->board_size) {
+            throw std::out_of_range("location out of the board");
+        }
+    }
+
+    void flip(int x, int y, int player_id) {
+        // a stone at (x, y) is bit y of row x, bit x of column y, and bit x of its diagonal and anti-diagonal
+        int k = player_id - 1;
+        this->rows[k][x] ^= uint64_t(1) << y;
+        this->cols[k][y] ^= uint64_t(1) << x;
+        this->diags[k][x - y + this->board_size - 1] ^= uint64_t(1) << x;
+        this->anti_diags[k][x + y] ^= uint64_t(1) << x;
+    }
+
+    static bool has_five_through(uint64_t line, int bit) {
+        // bit i of run is set iff bits i, ..., i + 4 of line are all set
+        uint64_t run = line & (line >> 1) & (line >> 2) & (line >> 3) & (line >> 4);
+        int low = max(0, bit - 4);
+        uint64_t window = ((uint64_t(1) << (bit - low + 1)) - 1) << low;
+        return (run & window) != 0;
+    }
+
+public:
+    int get(int x, int y) {
+        check_loc(x, y);
+        return this->cells[x * this->board_size + y];
+    }
+
+    bool make_move(int x, int y, int player_id) {
+        // put a stone and return true if it makes five in a row
+        check_loc(x, y);
+        if (player_id != 1 && player_id != 2) {
+            throw std::invalid_argument("player_id must be 1 or 2");
+        }
+        if (this->cells[x * this->board_size + y] != 0) {
+            throw std::invalid_argument("location is already occupied");
+        }
+        this->cells[x * this->board_size + y] = player_id;
+        this->num_stones++;
+        flip(x, y, player_id);
+        return is_five_in_a_row(x, y);
+    }
+
+    void unmake_move(int x, int y) {
+        check_loc(x, y);
+        int player_id = this->cells[x * this->board_size + y];
+        if (player_id == 0) {
+            throw std::invalid_argument("location is empty");
+        }
+        flip(x, y, player_id);
+        this->cells[x * this->board_size + y] = 0;
+        this->num_stones--;
+    }
+
+    bool is_five_in_a_row(int x, int y) {
+        // check if the stone at (x, y) is part of five in a row of its owner
+        check_loc(x, y);
+        int player_id = this->cells[x * this->board_size + y];
+        if (player_id == 0) {
+            return false;
+        }
+        int k = player_id - 1;
+        return has_five_through(this->rows[k][x], y)
+            || has_five_through(this->cols[k][y], x)
+            || has_five_through(this->diags[k][x - y + this->board_size - 1], x)
+            || has_five_through(this->anti_diags[k][x + y], x);
+    }
+
+    bool is_full() {
+        return this->num_stones == this->board_size * this->board_size;
+    }
+
+    py::array_t<uint8_t> scan_threats(int player_id) {
+        // flags of every cell for the player to move, 0 for the occupied cells:
+        // 1 the player makes five there, 2 the opponent would make five there, i.e. a forced block,
+        // 4 the player makes a four there, i.e. a stone which threatens five, 8 the player makes two threats of five
+        // at once there, e.g. an open four, 16 and 32 are the same as 4 and 8 for the opponent,
+        // e.g. 32 is where an open three of the opponent becomes an open four
+        if (player_id != 1 && player_id != 2) {
+            throw std::invalid_argument("player_id must be 1 or 2");
+        }
+        py::array_t<uint8_t> flags(this->board_size * this->board_size);
+        scan_threats_into(player_id, flags.mutable_data());
+        return flags;
+    }
+
+    void scan_threats_into(int player_id, uint8_t* flags) {
+        static const uint8_t own_flags[4] = {0, 4, 4 | 8, 1}, opponent_flags[4] = {0, 16, 16 | 32, 2};
+        int n = this->board_size;
+        for (int x = 0; x < n; x++) {
+            for (int y = 0; y < n; y++) {
+                uint8_t flag = 0;
+                if (this->cells[x * n + y] == 0) {
+                    flag = own_flags[scan_cell(player_id - 1, x, y)] | opponent_flags[scan_cell(2 - player_id, x, y)];
+                }
+                flags[x * n + y] = flag;
+            }
+        }
+    }
+
+    void reset() {
+        std::fill(this->cells.begin(), this->cells.end(), 0);
+        this->num_stones = 0;
+        for (int i = 0; i < 2; i++) {
+            std::fill(this->rows[i].begin(), this->rows[i].end(), 0);
+            std::fill(this->cols[i].begin(), this->cols[i].end(), 0);
+            std::fill(this->diags[i].begin(), this->diags[i].end(), 0);
+            std::fill(this->anti_diags[i].begin(), this->anti_diags[i].end(), 0);
+        }
+    }
+
+private:
+    static const int dxs[4], dys[4];
+
+    uint64_t get_line(int k, int x, int y, int d, int& bit) {
+        // the bitset of player k on the line d through (x, y), where (x, y) is the given bit
+        switch (d) {
+            case 0: bit = y; return this->rows[k][x];
+            case 1: bit = x; return this->cols[k][y];
+            case 2: bit = x; return this->diags[k][x - y + this->board_size - 1];
+            default: bit = x; return this->anti_diags[k][x + y];
+        }
+    }
+
+    bool makes_five(int k, int x, int y, int d) {
+        // check if a stone of player k on the empty cell (x, y) would make five in a row along the line d
+        int bit;
+        uint64_t line = get_line(k, x, y, d, bit);
+        return has_five_through(line | uint64_t(1) << bit, bit);
+    }
+
+    bool makes_five(int k, int x, int y) {
+        return makes_five(k, x, y, 0) || makes_five(k, x, y, 1) || makes_five(k, x, y, 2) || makes_five(k, x, y, 3);
+    }
+
+    int count_threats(int k, int x, int y) {
+        // the number of empty cells where player k makes five through a stone of k on (x, y), i.e. the cells on the
+        // 4 lines through (x, y) within 4 cells which make five with the stone but not without it
+        int n = this->board_size, num_threats = 0;
+        bool made_five[4][9];
+        for (int d = 0; d < 4; d++) {
+            for (int s = -4; s <= 4; s++) {
+                int i = x + s * dxs[d], j = y + s * dys[d];
+                made_five[d][s + 4] = s != 0 && i >= 0 && i < n && j >= 0 && j < n && this->cells[i * n + j] == 0
+                    && makes_five(k, i, j, d);
+            }
+        }
+
+        flip(x, y, k + 1);
+        for (int d = 0; d < 4; d++) {
+            for (int s = -4; s <= 4; s++) {
+                int i = x + s * dxs[d], j = y + s * dys[d];
+                if (s == 0 || i < 0 || i >= n || j < 0 || j >= n || this->cells[i * n + j] != 0) {
+                    continue;
+                }
+                num_threats += !made_five[d][s + 4] && makes_five(k, i, j, d);
+            }
+        }
+        flip(x, y, k + 1);
+        return num_threats;
+    }
+
+    int scan_cell(int k, int x, int y) {
+        // 3 if player k makes five on the empty cell (x, y), else the number of threats of five it makes, up to 2
+        // a four needs 3 stones of k within 4 cells of (x, y) on one line, which most cells do not have
+        int max_stones = 0;
+        for (int d = 0; d < 4; d++) {
+            int bit;
+            uint64_t line = get_line(k, x, y, d, bit);
+            uint64_t window = bit >= 4 ? uint64_t(0x1FF) << (bit - 4) : uint64_t(0x1FF) >> (4 - bit);
+            max_stones = max(max_stones, (int)std::bitset<64>(line & window).count());
+        }
+        if (max_stones < 3) {
+            return 0;
+        }
+        if (max_stones >= 4 && makes_five(k, x, y)) {
+            return 3;
+        }
+        return min(count_threats(k, x, y), 2);
+    }
+};
+
+const int BitBoard::dxs[4] = {0, 1, 1, 1};  // rows, columns, diagonals and anti-diagonals
+const int BitBoard::dys[4] = {1, 0, 1, -1};
+
+
+
+class SearchTree {
+    // The monte carlo tree of one game in native memory, searched like MCTS.select_leaves and MCTS.expand_leaves on
+    // the array tree, with the same PUCT, virtual losses, dirichlet noise, pruning and solver. The position of the
+    // root is set by every search from its state and its history planes, the network inputs of the leaves are
+    // derived from them, and the GIL is released while the tree is searched.
+    // A tree only keeps the subtree of its root, which is compacted into fresh arrays when the root advances.
+public:
+    // pruning: 0 for none, 1 'forced', 2 'radius' and 3 'forced_radius', see MovePruner
+    SearchTree(int board_size, int player_id, double c_puct, double virtual_loss, int pruning, int pruning_radius,
+               double alpha, double eps, uint64_t seed) : board(board_size), rng(seed) {
+        if (player_id != 1 && player_id != 2) {
+            throw std::invalid_argument("player_id must be 1 or 2");
+        }
+        if (pruning < 0 || pruning > 3) {
+            throw std::invalid_argument("unknown pruning");
+        }
+        this->board_size = board_size;
+        this->num_actions = board_size * board_size;
+        this->c_puct = c_puct;
+        this->virtual_loss = virtual_loss;
+        this->pruning = pruning;
+        this->pruning_radius = pruning_radius;
+        this->alpha = alpha;
+        this->eps = eps;
+        this->num_channels = 0;
+        this->num_done = 0;
+        reset(player_id);
+    }
+
+public:
+    int board_size, num_actions, pruning, pruning_radius;
+    double c_puct, virtual_loss, alpha, eps;
+
+private:
+    static const int unknown = 2;  // the result of a node which is not proven
+
+    struct TreeNode {
+        int player_id, visits, first_edge, num_edges;
+        int result, solved_idx, num_solved;  // see Node in mcts.py
+    };
+
+    struct Edge {
+        int action, child, N;  // child is -1 until the edge is selected for the first time
+        bool valid;            // false if the child is proven to lose
+        double P, W;
+    };
+
+    struct Step {
+        int node, edge;
+    };
+
+    vector<TreeNode> nodes;  // nodes[0] is the root
+    vector<Edge> edges;      // the edges of a node are contiguous
+    vector<TreeNode> spare_nodes;  // the arrays the tree is compacted into, which keep their memory across moves
+    vector<Edge> spare_edges;
+    BitBoard board;
+    vector<float> root_planes;
+    int num_channels;
+
+    // the leaves selected by select_leaves, which wait for expand_leaves
+    vector<vector<Step>> pending_paths;
+    vector<int> pending_leaves;
+    vector<vector<int>> pending_actions;
+    vector<float> pending_inputs;
+    int num_done;
+
+    std::mt19937_64 rng;
+
+public:
+    void reset(int player_id) {
+        // drop the tree and start over from a new root
+        this->nodes.clear();
+        this->edges.clear();
+        this->nodes.push_back(new_node(player_id));
+        clear_pending();
+    }
+
+    void set_root(py::array_t<int64_t, py::array::c_style | py::array::forcecast> state,
+                  py::array_t<float, py::array::c_style | py::array::forcecast> planes) {
+        // the position of the root, i.e. its state with shape (board_size, board_size) and its history planes with
+        // shape (channels, board_size, board_size), as returned by HistoryPlanes.get_input
+        int n = this->board_size;
+        if (state.ndim() != 2 || state.shape(0) != n || state.shape(1) != n) {
+            throw std::invalid_argument("state must have shape (board_size, board_size)");
+        }
+        if (planes.ndim() != 3 || planes.shape(0) % 2 != 1 || planes.shape(1) != n || planes.shape(2) != n) {
+            throw std::invalid_argument("planes must have shape (2 * history_len + 1, board_size, board_size)");
+        }
+        this->board.reset();
+        const int64_t* s = state.data();
+        for (int i = 0; i < this->num_actions; i++) {
+            if (s[i] != 0) {
+                this->board.make_move(i / n, i % n, (int)s[i]);
+            }
+        }
+        this->num_channels = (int)planes.shape(0);
+        this->root_planes.assign(planes.data(), planes.data() + this->num_channels * this->num_actions);
+        clear_pending();
+    }
+
+    void advance(int action) {
+        // make the child of the root reached by action the new root and free the rest of the tree
+        TreeNode root = this->nodes[0];
+        int child = -1;
+        for (int e = root.first_edge; e >= 0 && e < root.first_edge + root.num_edges; e++) {
+            if (this->edges[e].action == action) {
+                child = this->edges[e].child;
+                break;
+            }
+        }
+        if (child < 0) {
+            reset(3 - root.player_id);
+            return;
+        }
+
+        // copy the subtree of child breadth first, so the parents keep coming before their children
+        vector<TreeNode>& new_nodes = this->spare_nodes;
+        vector<Edge>& new_edges = this->spare_edges;
+        new_nodes.assign(1, this->nodes[child]);
+        new_edges.clear();
+        for (size_t i = 0; i < new_nodes.size(); i++) {
+            int first_edge = new_nodes[i].first_edge;
+            if (first_edge < 0) {
+                continue;
+            }
+            new_nodes[i].first_edge = (int)new_edges.size();
+            for (int e = first_edge; e < first_edge + new_nodes[i].num_edges; e++) {
+                Edge edge = this->edges[e];
+                if (edge.child >= 0) {
+                    new_nodes.push_back(this->nodes[edge.child]);
+                    edge.child = (int)new_nodes.size() - 1;
+                }
+                new_edges.push_back(edge);
+            }
+        }
+        this->nodes.swap(new_nodes);
+        this->edges.swap(new_edges);
+        clear_pending();
+    }
+
+    py::tuple select_leaves(int num_leaves) {
+        // select up to num_leaves distinct leaves with virtual losses, see MCTS.select_leaves
+        // :return: the network inputs of the leaves to evaluate with shape (num_leaves, channels, n, n), and the
+        //     number of simulations which have ended at a proven node
+        if (this->num_channels == 0) {
+            throw std::logic_error("set_root must be called before searching");
+        }
+        {
+            py::gil_scoped_release release;
+            select_leaves_impl(num_leaves);
+        }
+        return py::make_tuple(get_pending_inputs(), this->num_done);
+    }
+
+    void expand_leaves(py::array_t<float, py::array::c_style | py::array::forcecast> probs,
+                       py::array_t<double, py::array::c_style | py::array::forcecast> v, bool add_noise) {
+        // expand the leaves selected by select_leaves with their probs and v and replace their virtual losses
+        py::ssize_t num_leaves = (py::ssize_t)this->pending_leaves.size();
+        if (probs.ndim() != 2 || probs.shape(0) != num_leaves || probs.shape(1) != this->num_actions
+            || v.ndim() != 1 || v.shape(0) != num_leaves) {
+            throw std::invalid_argument("probs and v must have shapes (num_leaves, num_actions) and (num_leaves,)");
+        }
+        py::gil_scoped_release release;
+        expand_leaves_impl(probs.data(), v.data(), add_noise);
+    }
+
+    int run(int num_simulations, int num_parallel_leaves, py::object evaluate, bool early_stop, bool add_noise) {
+        // run num_simulations simulations from the root, see MCTS.run_simulations, where evaluate maps a batch of
+        // network inputs to probs and v
+        // :return: the number of simulations run
+        if (this->num_channels == 0) {
+            throw std::logic_error("set_root must be called before searching");
+        }
+        int num_done = 0;
+        while (num_done < num_simulations) {
+            if (this->nodes[0].result != unknown) {
+                break;  // the root is proven, so more simulations can not change its move
+            }
+            if (early_stop && is_decided(num_simulations - num_done)) {
+                break;
+            }
+
+            {
+                py::gil_scoped_release release;
+                select_leaves_impl(min(num_parallel_leaves, num_simulations - num_done));
+            }
+            num_done += this->num_done;
+            if (this->pending_leaves.empty()) {
+                continue;
+            }
+
+            py::tuple outputs = evaluate(get_pending_inputs());
+            auto probs = outputs[0].cast<py::array_t<float, py::array::c_style | py::array::forcecast>>();
+            auto v = outputs[1].cast<py::array_t<double, py::array::c_style | py::array::forcecast>>();
+            num_done += (int)this->pending_leaves.size();
+            expand_leaves(probs, v, add_noise);
+        }
+        return num_done;
+    }
+
+    bool is_decided(int num_simulations_left) {
+        // see MCTS.is_decided
+        const TreeNode& root = this->nodes[0];
+        if (root.result != unknown) {
+            return true;
+        }
+        if (root.first_edge < 0) {
+            return false;
+        }
+        int num_valid = 0, first_N = 0, second_N = 0;
+        for (int e = root.first_edge; e < root.first_edge + root.num_edges; e++) {
+            if (!this->edges[e].valid) {
+                continue;
+            }
+            num_valid++;
+            int N = this->edges[e].N;
+            if (N > first_N) {
+                second_N = first_N;
+                first_N = N;
+            }
+            else if (N > second_N) {
+                second_N = N;
+            }
+        }
+        if (num_valid < 2) {
+            return first_N > 0;
+        }
+        return first_N - second_N > num_simulations_left;
+    }
+
+    // the stats of the root, with the same meaning as the attributes of ArrayNode
+    int get_player_id() { return this->nodes[0].player_id; }
+
+    int get_visits() { return this->nodes[0].visits; }
+
+    int get_solved_idx() { return this->nodes[0].solved_idx; }
+
+    bool is_leaf() { return this->nodes[0].first_edge < 0; }
+
+    py::object get_result() {
+        int result = this->nodes[0].result;
+        return result == unknown ? py::object(py::none()) : py::object(py::int_(result));
+    }
+
+    py::array_t<int64_t> get_actions() {
+        const TreeNode& root = this->nodes[0];
+        py::array_t<int64_t> actions(max(root.num_edges, 0));
+        for (int i = 0; i < root.num_edges; i++) {
+            actions.mutable_data()[i] = this->edges[root.first_edge + i].action;
+        }
+        return actions;
+    }
+
+    py::array_t<int32_t> get_N() {
+        const TreeNode& root = this->nodes[0];
+        py::array_t<int32_t> N(max(root.num_edges, 0));
+        for (int i = 0; i < root.num_edges; i++) {
+            N.mutable_data()[i] = this->edges[root.first_edge + i].N;
+        }
+        return N;
+    }
+
+    py::object get_valid() {
+        // None if no child of the root is proven to lose
+        const TreeNode& root = this->nodes[0];
+        py::array_t<bool> valid(max(root.num_edges, 0));
+        bool all_valid = true;
+        for (int i = 0; i < root.num_edges; i++) {
+            valid.mutable_data()[i] = this->edges[root.first_edge + i].valid;
+            all_valid = all_valid && this->edges[root.first_edge + i].valid;
+        }
+        return all_valid ? py::object(py::none()) : py::object(valid);
+    }
+
+    vector<int> get_pending_leaves() { return this->pending_leaves; }
+
+    int get_num_nodes() { return (int)this->nodes.size(); }
+
+private:
+    static TreeNode new_node(int player_id) {
+        return TreeNode{player_id, 0, -1, 0, unknown, -1, 0};
+    }
+
+    void clear_pending() {
+        this->pending_paths.clear();
+        this->pending_leaves.clear();
+        this->pending_actions.clear();
+        this->pending_inputs.clear();
+        this->num_done = 0;
+    }
+
+    py::array_t<float> get_pending_inputs() {
+        int n = this->board_size;
+        py::array_t<float> inputs({(py::ssize_t)this->pending_leaves.size(), (py::ssize_t)this->num_channels,
+                                   (py::ssize_t)n, (py::ssize_t)n});
+        std::memcpy(inputs.mutable_data(), this->pending_inputs.data(), this->pending_inputs.size() * sizeof(float));
+        return inputs;
+    }
+
+    void select_leaves_impl(int num_leaves) {
+        clear_pending();
+        for (int i = 0; i < num_leaves; i++) {
+            if (this->nodes[0].result != unknown) {
+                break;  // the root is proven, so its move is known
+            }
+
+            vector<Step> path;
+            int leaf = select_leaf(path);
+            int result = this->nodes[leaf].result;
+            if (result != unknown) {
+                backup_path(path, -result);
+                this->num_done++;
+            }
+            else if (std::find(this->pending_leaves.begin(), this->pending_leaves.end(), leaf)
+                     != this->pending_leaves.end()) {
+                revert_path(path);
+                unwind_path(path);
+                break;
+            }
+            else {
+                vector<int> actions;
+                int v = get_valid_actions(this->nodes[leaf].player_id, actions);
+                if (v != unknown) {
+                    // a decided position is expanded and backed up right away, without the network
+                    expand(leaf, actions, vector<double>(actions.size(), 1.0 / actions.size()));
+                    this->nodes[leaf].result = v;
+                    this->nodes[leaf].solved_idx = v == 1 ? 0 : -1;
+                    solve_path(path, leaf);
+                    backup_path(path, -v);
+                    this->num_done++;
+                }
+                else {
+                    write_input(path, this->nodes[leaf].player_id);
+                    this->pending_paths.push_back(path);
+                    this->pending_leaves.push_back(leaf);
+                    this->pending_actions.push_back(actions);
+                }
+            }
+            unwind_path(path);
+        }
+    }
+
+    void expand_leaves_impl(const float* probs, const double* v, bool add_noise) {
+        vector<double> noise(this->num_actions);
+        for (size_t i = 0; i < this->pending_leaves.size(); i++) {
+            const float* leaf_probs = probs + i * this->num_actions;
+            if (add_noise) {
+                sample_dirichlet(noise);
+            }
+
+            const vector<int>& actions = this->pending_actions[i];
+            vector<double> priors(actions.size());
+            double sum = 0.0;
+            for (size_t j = 0; j < actions.size(); j++) {
+                int a = actions[j];
+                priors[j] = add_noise ? (1 - this->eps) * leaf_probs[a] + this->eps * noise[a] : leaf_probs[a];
+                sum += priors[j];
+            }
+            if (this->pruning != 0 && sum > 0) {
+                for (double& prior : priors) {
+                    prior /= sum;
+                }
+            }
+
+            expand(this->pending_leaves[i], actions, priors);
+            backup_path(this->pending_paths[i], -v[i]);
+        }
+        clear_pending();
+    }
+
+    void sample_dirichlet(vector<double>& noise) {
+        std::gamma_distribution<double> gamma(this->alpha, 1.0);
+        double sum = 0.0;
+        for (double& each : noise) {
+            each = gamma(this->rng);
+            sum += each;
+        }
+        for (double& each : noise) {
+            each = sum > 0 ? each / sum : 1.0 / noise.size();
+        }
+    }
+
+    int select_leaf(vector<Step>& path) {
+        // walk down from the root to a leaf or a proven node with virtual losses, see MCTS.select_leaf
+        int node = 0;
+        while (this->nodes[node].result == unknown && this->nodes[node].first_edge >= 0) {
+            int e = select_edge(node);
+            this->edges[e].N++;
+            this->edges[e].W -= this->virtual_loss;
+            path.push_back({node, e});
+
+            int player_id = this->nodes[node].player_id, action = this->edges[e].action;
+            bool won = this->board.make_move(action / this->board_size, action % this->board_size, player_id);
+            if (this->edges[e].child < 0) {
+                this->nodes.push_back(new_node(3 - player_id));
+                this->edges[e].child = (int)this->nodes.size() - 1;
+            }
+            node = this->edges[e].child;
+            if (this->nodes[node].result == unknown && (won || this->board.is_full())) {
+                this->nodes[node].result = won ? -1 : 0;  // the player who is gonna play has lost, or a draw
+                solve_path(path, node);
+            }
+        }
+        return node;
+    }
+
+    int select_edge(int node) {
+        // the edge with the max PUCT among the children which are not proven to lose, see get_max_ucb_child_np
+        TreeNode& parent = this->nodes[node];
+        double sqrt_parent_N = sqrt((double)parent.visits);
+        double best_U = -INFINITY;
+        int best_e = -1;
+        for (int e = parent.first_edge; e < parent.first_edge + parent.num_edges; e++) {
+            const Edge& edge = this->edges[e];
+            if (!edge.valid) {
+                continue;
+            }
+            double Q = edge.N > 0 ? edge.W / edge.N : 0.0;
+            double U = Q + this->c_puct * edge.P * sqrt_parent_N / (1.0 + edge.N);
+            if (U > best_U) {
+                best_U = U;
+                best_e = e;
+            }
+        }
+        parent.visits++;
+        return best_e;
+    }
+
+    void expand(int node, const vector<int>& actions, const vector<double>& priors) {
+        TreeNode& leaf = this->nodes[node];
+        leaf.visits++;
+        leaf.first_edge = (int)this->edges.size();
+        leaf.num_edges = (int)actions.size();
+        for (size_t i = 0; i < actions.size(); i++) {
+            this->edges.push_back(Edge{actions[i], -1, 0, true, priors[i], 0.0});
+        }
+    }
+
+    void backup_path(const vector<Step>& path, double v) {
+        // replace the virtual losses on path with v, which is from the view of the player who played the last move
+        for (auto it = path.rbegin(); it != path.rend(); ++it) {
+            this->edges[it->edge].W += this->virtual_loss + v;
+            v = -v;
+        }
+    }
+
+    void revert_path(const vector<Step>& path) {
+        for (const Step& step : path) {
+            this->edges[step.edge].N--;
+            this->edges[step.edge].W += this->virtual_loss;
+            this->nodes[step.node].visits--;
+        }
+    }
+
+    void unwind_path(const vector<Step>& path) {
+        for (auto it = path.rbegin(); it != path.rend(); ++it) {
+            int action = this->edges[it->edge].action;
+            this->board.unmake_move(action / this->board_size, action % this->board_size);
+        }
+    }
+
+    void solve_path(const vector<Step>& path, int node) {
+        // propagate the proof of node, the last node of path, to the nodes on path as far as it proves them
+        for (auto it = path.rbegin(); it != path.rend(); ++it) {
+            if (!solve_child(it->node, it->edge, -this->nodes[node].result)) {
+                return;
+            }
+            node = it->node;
+        }
+    }
+
+    bool solve_child(int node, int e, int v) {
+        // see MCTS.solve_child
+        TreeNode& parent = this->nodes[node];
+        if (v == 1) {
+            parent.result = 1;
+            parent.solved_idx = e - parent.first_edge;
+            return true;
+        }
+
+        parent.num_solved++;
+        if (v == -1) {
+            this->edges[e].valid = false;
+        }
+        if (parent.num_solved < parent.num_edges) {
+            return false;
+        }
+
+        int best = -2;
+        for (int i = parent.first_edge; i < parent.first_edge + parent.num_edges; i++) {
+            int child = this->edges[i].child;
+            if (child >= 0 && this->nodes[child].result != unknown && -this->nodes[child].result > best) {
+                best = -this->nodes[child].result;
+                parent.solved_idx = i - parent.first_edge;
+            }
+        }
+        parent.result = best;
+        return true;
+    }
+
+    int get_valid_actions(int player_id, vector<int>& actions) {
+        // the actions to expand the position on the board with, and its value for player_id if the pruning knows
+        // it is decided, unknown otherwise, see MovePruner.prune
+        if (this->pruning == 0 || this->pruning == 2) {
+            get_radius_actions(this->pruning == 0 ? -1 : this->pruning_radius, actions);
+            return unknown;
+        }
+
+        vector<uint8_t> flags(this->num_actions);
+        this->board.scan_threats_into(player_id, flags.data());
+        static const uint8_t masks[4] = {1, 2, 8, 32};  // WIN, BLOCK, DOUBLE_FOUR and OPPONENT_DOUBLE_FOUR
+        vector<int> found[4];
+        for (int i = 0; i < this->num_actions; i++) {
+            for (int j = 0; j < 4; j++) {
+                if (flags[i] & masks[j]) {
+                    found[j].push_back(i);
+                }
+            }
+        }
+
+        if (!found[0].empty()) {
+            actions.swap(found[0]);
+            return 1;
+        }
+        if (!found[1].empty()) {
+            // two fours of the opponent can not both be blocked
+            int v = found[1].size() > 1 ? -1 : unknown;
+            actions.swap(found[1]);
+            return v;
+        }
+        if (!found[2].empty()) {
+            actions.swap(found[2]);
+            return 1;
+        }
+        if (!found[3].empty()) {
+            for (int i = 0; i < this->num_actions; i++) {
+                if (flags[i] & (32 | 4)) {
+                    actions.push_back(i);
+                }
+            }
+            return unknown;
+        }
+        get_radius_actions(this->pruning == 3 ? this->pruning_radius : -1, actions);
+        return unknown;
+    }
+
+    void get_radius_actions(int radius, vector<int>& actions) {
+        // the empty cells within radius cells of a stone, or every empty cell if radius is negative or there is
+        // none, see get_radius_mask
+        int n = this->board_size;
+        const vector<int>& cells = this->board.cells;
+        if (radius >= 0 && this->board.num_stones > 0) {
+            for (int x = 0; x < n; x++) {
+                for (int y = 0; y < n; y++) {
+                    if (cells[x * n + y] == 0 && has_stone_near(x, y, radius)) {
+                        actions.push_back(x * n + y);
+                    }
+                }
+            }
+            if (!actions.empty()) {
+                return;
+            }
+        }
+        for (int i = 0; i < this->num_actions; i++) {
+            if (cells[i] == 0) {
+                actions.push_back(i);
+            }
+        }
+    }
+
+    bool has_stone_near(int x, int y, int radius) {
+        int n = this->board_size;
+        for (int i = max(0, x - radius); i <= min(n - 1, x + radius); i++) {
+            for (int j = max(0, y - radius); j <= min(n - 1, y + radius); j++) {
+                if (this->board.cells[i * n + j] != 0) {
+                    return true;
+                }
+            }
+        }
+        return false;
+    }
+
+    void write_input(const vector<Step>& path, int player_id) {
+        // append the history planes of the leaf at the end of path, see HistoryPlanes.get_input, which are the
+        // planes of the root shifted by the moves of each player on path
+        int n2 = this->num_actions, history_len = (this->num_channels - 1) / 2;
+        size_t offset = this->pending_inputs.size();
+        this->pending_inputs.resize(offset + (size_t)this->num_channels * n2);
+        float* input = this->pending_inputs.data() + offset;
+        std::fill(input, input + n2, player_id == 1 ? 1.0f : 0.0f);
+
+        for (int k = 1; k <= 2; k++) {
+            // the planes of player k from the oldest to the newest, white first
+            int base = k == 1 ? 1 + history_len : 1;
+            vector<int> moves;
+            for (const Step& step : path) {
+                if (this->nodes[step.node].player_id == k) {
+                    moves.push_back(this->edges[step.edge].action);
+                }
+            }
+            int num_moves = (int)moves.size();
+            const float* newest = this->root_planes.data() + (size_t)(base + history_len - 1) * n2;
+            for (int age = 0; age < history_len; age++) {
+                float* plane = input + (size_t)(base + history_len - 1 - age) * n2;
+                if (age < num_moves) {
+                    std::memcpy(plane, newest, n2 * sizeof(float));
+                    for (int i = 0; i < num_moves - age; i++) {
+                        plane[moves[i]] = 1.0f;
+                    }
+                }
+                else {
+                    std::memcpy(plane, newest - (size_t)(age - num_moves) * n2, n2 * sizeof(float));
+                }
+            }
+        }
+    }
+};
+
 
 PYBIND11_MODULE(pynode, m) {
     m.def("calc_ucb", &calc_ucb);
     m.def("get_max_ucb_child", &get_max_ucb_child);
+    m.def("get_max_ucb_child_np", &get_max_ucb_child_np,
+          py::arg("c_puct"), py::arg("parent_N"), py::arg("P").noconvert(), py::arg("N").noconvert(),
+          py::arg("W").noconvert(), py::arg("valid") = py::none());
     m.def("is_five_in_a_row", &is_five_in_a_row);
+
+    py::class_<BitBoard>(m, "BitBoard")
+        .def(py::init<int>(), py::arg("board_size"))
+        .def_readonly("board_size", &BitBoard::board_size)
+        .def_readonly("num_stones", &BitBoard::num_stones)
+        .def("get", &BitBoard::get)
+        .def("make_move", &BitBoard::make_move)
+        .def("unmake_move", &BitBoard::unmake_move)
+        .def("is_five_in_a_row", &BitBoard::is_five_in_a_row)
+        .def("is_full", &BitBoard::is_full)
+        .def("scan_threats", &BitBoard::scan_threats, py::arg("player_id"))
+        .def("reset", &BitBoard::reset);
+
+    py::class_<SearchTree>(m, "SearchTree")
+        .def(py::init<int, int, double, double, int, int, double, double, uint64_t>(), py::arg("board_size"),
+             py::arg("player_id"), py::arg("c_puct"), py::arg("virtual_loss"), py::arg("pruning"),
+             py::arg("pruning_radius"), py::arg("alpha"), py::arg("eps"), py::arg("seed"))
+        .def_readonly("board_size", &SearchTree::board_size)
+        .def_property_readonly("player_id", &SearchTree::get_player_id)
+        .def_property_readonly("visits", &SearchTree::get_visits)
+        .def_property_readonly("result", &SearchTree::get_result)
+        .def_property_readonly("solved_idx", &SearchTree::get_solved_idx)
+        .def_property_readonly("actions", &SearchTree::get_actions)
+        .def_property_readonly("N", &SearchTree::get_N)
+        .def_property_readonly("valid", &SearchTree::get_valid)
+        .def_property_readonly("pending_leaves", &SearchTree::get_pending_leaves)
+        .def_property_readonly("num_nodes", &SearchTree::get_num_nodes)
+        .def("is_leaf", &SearchTree::is_leaf)
+        .def("reset", &SearchTree::reset, py::arg("player_id"))
+        .def("set_root", &SearchTree::set_root, py::arg("state"), py::arg("planes"))
+        .def("advance", &SearchTree::advance, py::arg("action"))
+        .def("select_leaves", &SearchTree::select_leaves, py::arg("num_leaves"))
+        .def("expand_leaves", &SearchTree::expand_leaves, py::arg("probs"), py::arg("v"), py::arg("add_noise"))
+        .def("run", &SearchTree::run, py::arg("num_simulations"), py::arg("num_parallel_leaves"),
+             py::arg("evaluate"), py::arg("early_stop"), py::arg("add_noise"))
+        .def("is_decided", &SearchTree::is_decided, py::arg("num_simulations_left"));
 }
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import os
+import re
+import time
+
+import torch
+
+
+def get_model_version(model_name):
+    """The version of a model file named as by ModelRegistry.get_path, e.g. 1000 for model_00001000.pth, -1 for any
+    other name, such as the model_1000.pth of old folders which get_path would never find."""
+    match = re.match(r'model_(\d{8})\.pth$', model_name)
+    return int(match.group(1)) if match else -1
+
+
+def atomic_save(obj, path):
+    """torch.save by a rename, where the temporary name does not contain 'model_' so that it is never loaded."""
+    tmp_path = os.path.join(os.path.dirname(path), 'tmp_' + os.path.basename(path).replace('model_', ''))
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry(object):
+    """
+    The versioned models of model_dir, i.e. model_<version>.pth files plus a version file holding the latest one.
+
+    publish writes the weights and then the version file, each under a temporary name followed by a rename, so a
+    reader sees either the previous version or the complete new one. Readers only need to poll the tiny version file
+    to notice a new model, instead of listing the folder. A second version file holds the best version, which is
+    moved by promote, e.g. when a new version passes the gating of the arena.
+    """
+
+    version_file = 'LATEST'
+    best_version_file = 'BEST'
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+
+    def get_path(self, version):
+        return os.path.join(self.model_dir, 'model_{version:08d}.pth'.format(version=version))
+
+    def publish(self, state_dict, version):
+        """Publish the weights as the given version and make it the latest one."""
+        os.makedirs(self.model_dir, exist_ok=True)
+        atomic_save(state_dict, self.get_path(version))
+        self._write_version(self.version_file, version)
+
+    def promote(self, version):
+        """Make a published version the best one."""
+        self._write_version(self.best_version_file, version)
+
+    def _write_version(self, file_name, version):
+        tmp_path = os.path.join(self.model_dir, 'tmp_' + file_name)
+        with open(tmp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, os.path.join(self.model_dir, file_name))
+
+    def _read_version(self, file_name):
+        try:
+            with open(os.path.join(self.model_dir, file_name)) as f:
+                return int(f.read())
+        except (IOError, ValueError):
+            return None
+
+    def best_version(self):
+        """The best version promoted, -1 if there is none."""
+        version = self._read_version(self.best_version_file)
+        return -1 if version is None else version
+
+    def latest_version(self):
+        """The latest version published, -1 if there is none.
+
+        Folders written before the version file existed fall back to the newest model_<version>.pth file.
+        """
+        version = self._read_version(self.version_file)
+        if version is not None:
+            return version
+
+        if not os.path.isdir(self.model_dir):
+            return -1
+        return max([get_model_version(each) for each in os.listdir(self.model_dir)], default=-1)
+
+    def load(self, version):
+        return torch.load(self.get_path(version), map_location='cpu')
+
+    def watch(self, callback, poll_interval=1.0, stop_event=None, best=False):
+        """Call callback(version, state_dict) for the latest version and then for every new version published.
+
+        :param callback: a function which swaps the weights in
+        :param poll_interval: the seconds between two reads of the version file
+        :param stop_event: a threading or multiprocessing Event to stop watching, None to watch forever
+        :param best: true to follow the best version instead of the latest one
+        """
+        current_version = -1
+        while stop_event is None or not stop_event.is_set():
+            version = self.best_version() if best else self.latest_version()
+            if version != current_version and version >= 0:
+                callback(version, self.load(version))
+                current_version = version
+            time.sleep(poll_interval)
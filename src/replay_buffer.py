@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, DataLoader
+
+from shards import list_shards, load_shard, decode_planes, get_board_size, get_game_starts
+from symmetry import Symmetries
+
+
+class ReplayBuffer(object):
+    """
+    A sliding window over the self-play shards of data_dir, which are memory mapped rather than loaded into RAM.
+
+    The window holds the newest shards containing at least window_games games, i.e. it is rounded up to whole
+    shards. Minibatches are sampled uniformly over its positions, or with recency weighting, where the weight of a
+    position halves every half_life_games games played after it.
+    """
+
+    def __init__(self, data_dir, window_games=10000, sampling='uniform', half_life_games=None, augment=True,
+                 seed=None):
+        """
+        :param data_dir: the folder of the self-play shards
+        :param window_games: the number of the newest games to sample from
+        :param sampling: 'uniform' or 'recency'
+        :param half_life_games: the half life of the weights in games for 'recency', window_games / 4 by default
+        :param augment: true to apply a random one of the 8 dihedral transforms to every sample
+        :param seed: the seed of the random number generator
+        """
+        if sampling not in ('uniform', 'recency'):
+            raise ValueError('Unknown sampling method!!!')
+
+        self.data_dir = data_dir
+        self.window_games = window_games
+        self.sampling = sampling
+        self.half_life_games = half_life_games if half_life_games is not None else window_games / 4
+        self.augment = augment
+        self.rng = np.random.default_rng(seed)
+
+        self.board_size = None
+        self.symmetries = None
+        self._shards = {}  # path -> (records, whether each position is the first of a game)
+        self._paths = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._cdf = None
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def refresh(self):
+        """Map the shards written since the last refresh and drop the shards which have left the window.
+
+        :return: the number of positions in the window
+        """
+        paths = list_shards(self.data_dir)
+
+        # walk from the newest shard back until the window is full
+        window, num_games = [], 0
+        for path in reversed(paths):
+            if num_games >= self.window_games:
+                break
+            if path not in self._shards:
+                records = load_shard(path)
+                # the first position of each game, which is not always move 0 with playout cap randomization
+                self._shards[path] = (records, get_game_starts(records))
+            window.append(path)
+            num_games += int(self._shards[path][1].sum())
+        window.reverse()
+
+        for path in set(self._shards) - set(window):
+            del self._shards[path]
+        self._paths = window
+        self._offsets = np.concatenate(([0], np.cumsum([len(self._shards[path][0]) for path in window])))
+
+        if window and self.board_size is None:
+            self.board_size = get_board_size(self._shards[window[0]][0])
+            self.symmetries = Symmetries(self.board_size)
+
+        if self.sampling == 'recency' and window:
+            # the number of games started after each position, counted from the newest position
+            starts = np.concatenate([self._shards[path][1] for path in window])
+            age = np.cumsum(starts[::-1])[::-1] - starts
+            self._cdf = np.cumsum(0.5 ** (age / self.half_life_games))
+        return len(self)
+
+    def sample_indices(self, batch_size):
+        if not len(self):
+            raise RuntimeError('The replay buffer is empty!!!')
+        if self.sampling == 'uniform':
+            return self.rng.integers(0, len(self), size=batch_size)
+        return np.searchsorted(self._cdf, self.rng.random(batch_size) * self._cdf[-1], side='right')
+
+    def gather(self, indices):
+        """The records at the given positions of the window, read shard by shard from the memory maps."""
+        shard_ids = np.searchsorted(self._offsets, indices, side='right') - 1
+        order = np.argsort(shard_ids, kind='stable')
+        indices, shard_ids = indices[order], shard_ids[order]
+
+        parts = []
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            records = self._shards[self._paths[shard_id]][0]
+            parts.append(records[np.sort(indices[mask] - self._offsets[shard_id])])
+        return np.concatenate(parts)
+
+    def sample(self, batch_size):
+        """Sample a minibatch.
+
+        :return: x with shape (batch_size, in_channels, N, N), pi with shape (batch_size, N * N) and z with shape
+            (batch_size,), all as float32 numpy arrays
+        """
+        records = self.gather(self.sample_indices(batch_size))
+        x = decode_planes(records['planes'], self.board_size)
+        pi = records['pi'].astype(np.float32)
+        z = records['z'].astype(np.float32)
+
+        if self.augment:
+            x, pi = self.transform_batch(x, pi, self.rng.integers(0, Symmetries.num_transforms, size=len(x)))
+        return x, pi, z
+
+    def transform_batch(self, x, pi, ks):
+        """Apply transform ks[i] to sample i of x and pi, all the samples at once."""
+        perms = self.symmetries.perms[ks]
+        batch_size, in_channels = x.shape[:2]
+        x = np.take_along_axis(x.reshape(batch_size, in_channels, -1), perms[:, None, :], axis=2)
+        pi = np.take_along_axis(pi, perms, axis=1)
+        return x.reshape(batch_size, in_channels, self.board_size, self.board_size), pi
+
+
+class ReplayDataset(IterableDataset):
+    """
+    An endless stream of minibatches from a ReplayBuffer for a DataLoader with batch_size=None.
+
+    Each DataLoader worker builds its own buffer, with its own memory maps and seed, and refreshes it every
+    refresh_every batches, so the new shards of a running self-play are picked up.
+    """
+
+    def __init__(self, batch_size, refresh_every=100, seed=0, wait=10, **buffer_kwargs):
+        """
+        :param batch_size: the number of samples per minibatch
+        :param refresh_every: the number of minibatches between two refreshes of the buffer
+        :param seed: the base seed, worker i uses seed + i
+        :param wait: the seconds between two refreshes while there is no shard yet
+        :param buffer_kwargs: the arguments of ReplayBuffer except seed
+        """
+        super(ReplayDataset, self).__init__()
+        self.batch_size = batch_size
+        self.refresh_every = refresh_every
+        self.seed = seed
+        self.wait = wait
+        self.buffer_kwargs = buffer_kwargs
+
+    def __iter__(self):
+        worker_info = torch.utils.data.get_worker_info()
+        worker_id = worker_info.id if worker_info is not None else 0
+        buffer = ReplayBuffer(seed=self.seed + worker_id, **self.buffer_kwargs)
+        while not buffer.refresh():
+            time.sleep(self.wait)
+
+        num_batches = 1
+        while 1:
+            if num_batches % self.refresh_every == 0:
+                buffer.refresh()
+            x, pi, z = buffer.sample(self.batch_size)
+            num_batches += 1
+            yield torch.from_numpy(x), torch.from_numpy(pi), torch.from_numpy(z)
+
+
+def build_data_loader(data_dir, batch_size, num_workers=2, prefetch_factor=2, refresh_every=100, seed=0,
+                      pin_memory=False, **buffer_kwargs):
+    """A DataLoader of (x, pi, z) minibatches sampled from the self-play shards in data_dir."""
+    dataset = ReplayDataset(batch_size, refresh_every=refresh_every, seed=seed, data_dir=data_dir, **buffer_kwargs)
+    if num_workers == 0:
+        return DataLoader(dataset, batch_size=None, pin_memory=pin_memory)
+    return DataLoader(dataset, batch_size=None, num_workers=num_workers, prefetch_factor=prefetch_factor,
+                      pin_memory=pin_memory, persistent_workers=True)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import os
+import time
+import queue
+import threading
+import multiprocessing
+
+import numpy as np
+import torch
+
+
+class SharedChannels(object):
+    """
+    Shared-memory slots through which the self-play threads of all worker processes talk to the inference process.
+
+    Every self-play thread owns one channel, i.e. `capacity` input slots and `capacity` output slots. A thread writes
+    its network inputs into its input slots and puts its channel id into `ready`; the inference process batches the
+    inputs of several channels into one forward pass, writes probs and v into the output slots and releases the
+    channel's semaphore. Only channel ids go through the queue, the arrays are never pickled.
+    """
+
+    def __init__(self, ctx, num_channels, capacity, in_shape, num_actions):
+        """
+        :param ctx: a multiprocessing context
+        :param num_channels: the number of self-play threads over all the worker processes
+        :param capacity: the max number of inputs a thread sends at once, i.e. num_parallel_leaves
+        :param in_shape: the shape of one network input
+        :param num_actions: the number of actions, outputs are stored as num_actions probs followed by v
+        """
+        self.num_channels = num_channels
+        self.capacity = capacity
+        self.in_shape = tuple(in_shape)
+        self.num_actions = num_actions
+
+        self._inputs = ctx.RawArray('f', num_channels * capacity * int(np.prod(in_shape)))
+        self._outputs = ctx.RawArray('f', num_channels * capacity * (num_actions + 1))
+        self._counts = ctx.RawArray('i', num_channels)
+        self.ready = ctx.Queue()
+        self.done = [ctx.Semaphore(0) for _ in range(num_channels)]
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_views'] = None  # numpy views are rebuilt in each process
+        return state
+
+    def views(self):
+        if self._views is None:
+            inputs = np.frombuffer(self._inputs, dtype=np.float32)
+            outputs = np.frombuffer(self._outputs, dtype=np.float32)
+            counts = np.frombuffer(self._counts, dtype=np.int32)
+            self._views = (inputs.reshape((self.num_channels, self.capacity) + self.in_shape),
+                           outputs.reshape(self.num_channels, self.capacity, self.num_actions + 1),
+                           counts)
+        return self._views
+
+
+class ChannelClient(object):
+    """
+    The evaluator of MCTS in a worker process, which sends the inputs through one channel of SharedChannels.
+    """
+
+    def __init__(self, channels, channel_id):
+        self.channels = channels
+        self.channel_id = channel_id
+
+    def __call__(self, xs):
+        inputs, outputs, counts = self.channels.views()
+        n = len(xs)
+        assert n <= self.channels.capacity, 'more inputs than the capacity of the channel'
+
+        inputs[self.channel_id, :n] = xs
+        counts[self.channel_id] = n
+        self.channels.ready.put(self.channel_id)
+        self.channels.done[self.channel_id].acquire()
+
+        out = outputs[self.channel_id, :n]
+        return out[:, :-1].copy(), out[:, -1].copy()
+
+
+class SharedMemoryInferenceServer(object):
+    """
+    Runs in the inference process, owns the Model and serves the channels of SharedChannels in batches.
+
+    Like InferenceServer, a batch is dispatched when batch_size inputs are pending or when the first of them
+    has waited config.max_wait seconds.
+    """
+
+    def __init__(self, config, channels, backend, batch_size, stats=None):
+        """
+        :param stats: an instance of the Stats class to record the forward time and the histogram of the batch
+            sizes in, None for no recording
+        """
+        self.config = config
+        self.channels = channels
+        self.backend = backend
+        self.batch_size = batch_size
+        self.stats = stats
+
+    def load_state_dict(self, state_dict, version=-1):
+        self.backend.load_state_dict(state_dict, version)
+
+    def _next_batch(self, stop_event):
+        ready = self.channels.ready
+        counts = self.channels.views()[2]
+        while not stop_event.is_set():
+            try:
+                ids = [ready.get(timeout=0.1)]
+                break
+            except queue.Empty:
+                continue
+        else:
+            return []
+
+        num_inputs = int(counts[ids[0]])
+        deadline = time.monotonic() + self.config.max_wait
+        while num_inputs < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                channel_id = ready.get(timeout=remaining)
+            except queue.Empty:
+                break
+            ids.append(channel_id)
+            num_inputs += int(counts[channel_id])
+        return ids
+
+    def serve(self, stop_event):
+        inputs, outputs, counts = self.channels.views()
+        while 1:
+            ids = self._next_batch(stop_event)
+            if not ids:
+                break
+
+            x = np.concatenate([inputs[channel_id, :counts[channel_id]] for channel_id in ids])
+            tik = time.monotonic()
+            probs, v = self.backend(x)
+            if self.stats is not None:
+                self.stats.count('evaluations', len(x))
+                self.stats.add_time('forward', time.monotonic() - tik)
+                self.stats.add_value('batch_size', len(x))
+
+            start = 0
+            for channel_id in ids:
+                n = counts[channel_id]
+                outputs[channel_id, :n, :-1] = probs[start:start + n]
+                outputs[channel_id, :n, -1] = v[start:start + n]
+                start += n
+                self.channels.done[channel_id].release()
+
+
+def inference_process(config, channels, stop_event, model_version):
+    from mcts import build_backend, build_reporter, watch_models
+
+    reporter = build_reporter(config, 'inference')
+    backend, batch_size = build_backend(config)
+    server = SharedMemoryInferenceServer(config, channels, backend, batch_size,
+                                         stats=reporter.register() if config.instrument else None)
+    threading.Thread(target=watch_models, args=(config, server, model_version, stop_event), daemon=True).start()
+    if config.instrument:
+        reporter.start()
+    server.serve(stop_event)
+    reporter.stop()
+
+
+def worker_process(config, channels, worker_id, num_games, model_version):
+    from mcts import self_play, build_shard_writer, build_reporter, build_profiler
+
+    # the search is pure python, so every worker keeps torch to one thread
+    torch.set_num_threads(1)
+
+    writer = build_shard_writer(config)
+    writer.start()
+    reporter = build_reporter(config, 'worker_{idx}'.format(idx=worker_id))
+    reporter.start()
+    profiler = build_profiler(config)
+    if profiler is not None:
+        profiler.start()
+
+    t_list = []
+    for idx in range(config.num_threads):
+        channel_id = worker_id * config.num_threads + idx
+        t_list.append(threading.Thread(target=self_play, name='worker_{w}_thread_{t}'.format(w=worker_id, t=idx),
+                                       args=(config, ChannelClient(channels, channel_id), num_games,
+                                             writer, model_version, reporter, profiler), daemon=True))
+    for t in t_list:
+        t.start()
+    for t in t_list:
+        t.join()
+    writer.close()
+    reporter.stop()
+    if profiler is not None:
+        profiler.stop()
+        root, ext = os.path.splitext(config.profile_path)
+        profiler.dump('{root}_worker_{idx}{ext}'.format(root=root, idx=worker_id, ext=ext))
+
+
+def run_self_play_processes(config):
+    """Self-play in config.num_workers processes with config.num_threads threads each and one inference process."""
+    ctx = multiprocessing.get_context('spawn')
+    channels = SharedChannels(ctx, config.num_workers * config.num_threads, config.num_parallel_leaves,
+                              (config.in_channels, config.board_size, config.board_size), config.board_size ** 2)
+    num_games = ctx.Value('i', 0)
+    model_version = ctx.Value('i', -1)
+    stop_event = ctx.Event()
+
+    server = ctx.Process(target=inference_process, args=(config, channels, stop_event, model_version),
+                         name='inference')
+    workers = [ctx.Process(target=worker_process, args=(config, channels, worker_id, num_games, model_version),
+                           name='worker_{idx}'.format(idx=worker_id))
+               for worker_id in range(config.num_workers)]
+
+    server.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop_event.set()
+    server.join()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import os
+import glob
+import queue
+import datetime
+import threading
+
+import numpy as np
+
+
+def get_record_dtype(in_channels, board_size):
+    """
+    The dtype of one self-play record, i.e. one position of a game.
+
+    planes holds the 0/1 network input with the cells of every plane packed into bits, pi is stored as float16,
+    and the rest are the outcome and the metadata of the position. game_start marks the first position recorded of
+    a game, as a game may be split over two shards.
+    """
+    num_actions = board_size ** 2
+    return np.dtype([('planes', np.uint8, (in_channels, (num_actions + 7) // 8)),
+                     ('pi', np.float16, (num_actions,)),
+                     ('z', np.int8),
+                     ('player_id', np.uint8),
+                     ('move', np.uint16),
+                     ('game_id', np.int64),
+                     ('model_version', np.int32),
+                     ('game_start', np.bool_)])
+
+
+def encode_game(xs, pis, zs, player_ids, game_id, model_version, moves=None):
+    """
+    Pack the positions of one game into records.
+
+    :param xs: the network inputs of the game with shape (num_moves, in_channels, board_size, board_size)
+    :param pis: the search probs with shape (num_moves, num_actions)
+    :param zs: the outcomes from the view of the player to move, with shape (num_moves,)
+    :param player_ids: the players to move, with shape (num_moves,)
+    :param game_id: a unique id of the game
+    :param model_version: the version of the model which has played each position, or of the whole game
+    :param moves: the move numbers of the positions, None if every position of the game is recorded
+    :return: a structured array of records with the dtype of get_record_dtype
+    """
+    xs = np.asarray(xs)
+    num_moves, in_channels, board_size = xs.shape[:3]
+
+    records = np.empty(num_moves, dtype=get_record_dtype(in_channels, board_size))
+    records['planes'] = np.packbits(xs.reshape(num_moves, in_channels, -1).astype(np.uint8), axis=-1)
+    records['pi'] = pis
+    records['z'] = zs
+    records['player_id'] = player_ids
+    records['move'] = np.arange(num_moves) if moves is None else moves
+    records['game_id'] = game_id
+    records['model_version'] = model_version
+    records['game_start'] = np.arange(num_moves) == 0
+    return records
+
+
+def decode_planes(planes, board_size):
+    """Unpack the planes of records back to float32 network inputs with shape (batch, in_channels, N, N)."""
+    num_actions = board_size ** 2
+    x = np.unpackbits(planes, axis=-1, count=num_actions)
+    return x.reshape(planes.shape[:-1] + (board_size, board_size)).astype(np.float32)
+
+
+def get_board_size(records):
+    return int(round(np.sqrt(records.dtype['pi'].shape[0])))
+
+
+def get_game_starts(records):
+    """Whether each record is the first position recorded of its game."""
+    if 'game_start' in records.dtype.names:
+        return np.asarray(records['game_start'])
+    # the shards written before game_start, where a game continued from the previous shard counts twice
+    game_ids = np.asarray(records['game_id'])
+    return np.concatenate(([True], game_ids[1:] != game_ids[:-1]))
+
+
+def list_shards(data_dir):
+    """The finished shards in data_dir, the oldest first."""
+    return sorted(glob.glob(os.path.join(data_dir, 'shard_*.npy')))
+
+
+def load_shard(path):
+    """Memory map the records of a shard."""
+    return np.load(path, mmap_mode='r')
+
+
+class ShardWriter(object):
+    """
+    Appends the records of finished games to shard files in a background thread.
+
+    Self-play threads hand over whole games by put, which never blocks. Every shard_size records are written into
+    a new shard file, a .npy of records which can be memory mapped by load_shard. A shard is written under a
+    temporary name and renamed when complete, so readers never see a partial shard, and the names hold the time,
+    the pid and a sequence number, so two shards never overwrite each other.
+    """
+
+    def __init__(self, data_dir, in_channels, board_size, shard_size=5000):
+        """
+        :param data_dir: the folder of the shards
+        :param in_channels: the number of planes of the network input
+        :param board_size: the size of the board
+        :param shard_size: the number of records per shard
+        """
+        self.data_dir = data_dir
+        self.board_size = board_size
+        self.shard_size = shard_size
+        self.dtype = get_record_dtype(in_channels, board_size)
+
+        self.num_shards = 0
+        self.num_records = 0
+
+        self._queue = queue.Queue()
+        self._buffer = np.empty(shard_size, dtype=self.dtype)
+        self._buffer_len = 0
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='shard_writer', daemon=True)
+        self._thread.start()
+
+    def put(self, xs, pis, zs, player_ids, game_id, model_version, moves=None):
+        """Queue the positions of one game, see encode_game for the arguments."""
+        self._queue.put((xs, pis, zs, player_ids, game_id, model_version, moves))
+
+    def close(self):
+        """Write the games queued so far, including a last partial shard, and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while 1:
+            game = self._queue.get()
+            if game is None:
+                break
+            self._append(encode_game(*game))
+        self._flush()
+
+    def _append(self, records):
+        while len(records):
+            n = min(len(records), self.shard_size - self._buffer_len)
+            self._buffer[self._buffer_len:self._buffer_len + n] = records[:n]
+            self._buffer_len += n
+            records = records[n:]
+            if self._buffer_len == self.shard_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffer_len:
+            return
+
+        file_name = 'shard_{time}_{pid}_{seq:06d}.npy'.format(
+            time=datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S'), pid=os.getpid(), seq=self.num_shards)
+        path = os.path.join(self.data_dir, file_name)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, self._buffer[:self._buffer_len])
+        os.replace(path + '.tmp', path)
+
+        self.num_shards += 1
+        self.num_records += self._buffer_len
+        self._buffer_len = 0
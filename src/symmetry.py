@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+
+
+class Symmetries(object):
+    """
+    The 8 dihedral transforms of a square board, i.e. 4 rotations with or without a flip.
+
+    perms[k] is transform k as a permutation of the flattened cells: cell i of the transformed board holds what
+    cell perms[k][i] of the original board holds. Transform 0 is the identity.
+    """
+
+    num_transforms = 8
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        cells = np.arange(board_size ** 2).reshape(board_size, board_size)
+        self.perms = np.stack([self.transform(cells, k).reshape(-1) for k in range(self.num_transforms)])
+        self.inv_perms = np.argsort(self.perms, axis=1)
+
+    @staticmethod
+    def transform(planes, k):
+        """Apply transform k to the last two axes of planes, which returns a view."""
+        planes = np.rot90(planes, k % 4, axes=(-2, -1))
+        if k >= 4:
+            planes = np.flip(planes, axis=-1)
+        return planes
+
+    def transform_planes(self, x, k):
+        return x if k == 0 else np.ascontiguousarray(self.transform(x, k))
+
+    def transform_policy(self, probs, k):
+        """Map probs over the original cells to the cells of the board under transform k."""
+        return probs[..., self.perms[k]]
+
+    def inverse_transform_policy(self, probs, k):
+        """Map probs over the cells of the board under transform k back to the original cells."""
+        return probs[..., self.inv_perms[k]]
+
+    def inverse_transform_policies(self, probs, ks):
+        """Row-wise inverse_transform_policy for probs with shape (batch, num_actions) and ks with shape (batch,)."""
+        return np.take_along_axis(probs, self.inv_perms[ks], axis=1)
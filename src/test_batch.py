@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from board import Board
+from mcts import MCTS, init_history
+from symmetry import Symmetries
+from transposition import EvaluationCache
+
+BOARD_SIZE = 7
+HISTORY_LEN_PER_PLAYER = 2
+NUM_POSITIONS = 6
+NUM_ROUNDS = 2
+
+
+def get_positions(num_positions, seed=0):
+    """Random positions as (player to move, state, network input), followed by a position seen twice and the
+    rotation of another one, whose inputs are rotated along."""
+    rng = np.random.RandomState(seed)
+    positions = []
+    for i in range(num_positions):
+        board, history, player_id = Board(BOARD_SIZE), init_history(HISTORY_LEN_PER_PLAYER, BOARD_SIZE), 1
+        for action in rng.choice(BOARD_SIZE ** 2, 2 * i + 1, replace=False):
+            board.make_move(int(action), player_id)
+            history.push(player_id, int(action))
+            player_id = 2 if player_id == 1 else 1
+        positions.append((player_id, board.state.copy(), history.get_input(player_id)))
+
+    player_id, state, x = positions[1]
+    rotated = (player_id, Symmetries.transform(state, 1).copy(), np.ascontiguousarray(Symmetries.transform(x, 1)))
+    return positions + [positions[0], rotated]
+
+
+@pytest.mark.parametrize('symmetry, use_cache', [(None, False), (None, True), ('canonical', True),
+                                               ('random', False), ('random', True)])
+def test_batch_matches_direct_evaluation(linear_evaluator, symmetry, use_cache):
+    np.random.seed(0)
+    evaluator = linear_evaluator(BOARD_SIZE, HISTORY_LEN_PER_PLAYER)
+    reference = linear_evaluator(BOARD_SIZE, HISTORY_LEN_PER_PLAYER)
+    mcts = MCTS(BOARD_SIZE, evaluator=evaluator, cache=EvaluationCache() if use_cache else None, symmetry=symmetry)
+    symmetries = Symmetries(BOARD_SIZE)
+    positions = get_positions(NUM_POSITIONS)
+
+    # the outputs of the first evaluation of each cache key, mapped back to the original orientation
+    first_outputs = {}
+    for _ in range(NUM_ROUNDS):
+        keys, transforms = zip(*[mcts.get_cache_key(player_id, state) for player_id, state, _ in positions])
+        xs = [x for _, _, x in positions]
+        request = mcts.prepare_batch(xs, list(keys), list(transforms))
+        new_probs, new_v = evaluator(np.stack(request.inputs)) if request.inputs else (None, None)
+        probs, v = mcts.finish_batch(request, new_probs, new_v)
+
+        for i, (x, key, k) in enumerate(zip(xs, keys, transforms)):
+            expected_probs, expected_v = reference(symmetries.transform_planes(x, k)[None])
+            expected_probs = symmetries.inverse_transform_policy(expected_probs[0], k)
+            if use_cache and symmetry != 'canonical':
+                # a cache hit returns the outputs of the transform the key was first evaluated under
+                expected_probs, expected_v = first_outputs.setdefault(key, (expected_probs, expected_v))
+            np.testing.assert_allclose(probs[i], expected_probs, rtol=1e-6, err_msg='position {i}'.format(i=i))
+            np.testing.assert_allclose(v[i], expected_v[0], rtol=1e-6, err_msg='position {i}'.format(i=i))
+
+    # the cache evaluates every key once, the position seen twice and the rotation included under canonical
+    num_keys = NUM_POSITIONS + (symmetry != 'canonical')
+    assert len(evaluator.inputs) == (num_keys if use_cache else NUM_ROUNDS * len(positions))
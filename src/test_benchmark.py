@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import pytest
+
+import benchmark
+from board import Board
+from config import SelfPlayConfig
+from mcts import init_history
+
+BOARD_SIZE = 9
+NUM_SIMULATIONS = 200
+
+
+def get_won_positions(board_size, history_len_per_player, num_positions, num_moves, seed):
+    """Positions where black to move has an open four, so that every search proves its root at once."""
+    positions = []
+    for _ in range(num_positions):
+        board, history = Board(board_size), init_history(history_len_per_player, board_size)
+        for col in range(2, 6):
+            for player_id, action in ((1, 4 * board_size + col), (2, 7 * board_size + col)):
+                board.make_move(action, player_id)
+                history.push(player_id, action)
+        positions.append((board.state.copy(), history, 1))
+    return positions
+
+
+@pytest.mark.parametrize('native', [False, True])
+def test_bench_search_counts_simulations_run(monkeypatch, native):
+    config = SelfPlayConfig(board_size=BOARD_SIZE, num_simulations=NUM_SIMULATIONS)
+    result = benchmark.bench_search(config, None, num_positions=2, native=native)
+    assert result['num_simulations'] == 2 * NUM_SIMULATIONS
+
+    monkeypatch.setattr(benchmark, 'get_positions', get_won_positions)
+    result = benchmark.bench_search(config, None, num_positions=2, native=native)
+    assert 0 < result['num_simulations'] < 2 * NUM_SIMULATIONS
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from history import HistoryPlanes
+from utils import idx_2_loc
+
+BOARD_SIZE = 5
+NUM_STEPS = 400
+
+
+class ReferenceHistory(object):
+    """The planes of both players as plain stacks, with the input built from the last planes of each stack."""
+
+    def __init__(self, history_len, board_size):
+        self.history_len = history_len
+        self.board_size = board_size
+        # 1 for black 2 for white, both starting with history_len empty planes
+        self.stacks = {player_id: [np.zeros((board_size, board_size), dtype=np.float32)] * history_len
+                       for player_id in (1, 2)}
+        self.cells = {1: [], 2: []}
+
+    def push(self, player_id, cell):
+        plane = self.stacks[player_id][-1].copy()
+        if cell is not None:
+            plane[idx_2_loc(cell, self.board_size)] = 1
+        self.stacks[player_id].append(plane)
+        self.cells[player_id].append(cell)
+
+    def pop(self, player_id):
+        self.stacks[player_id].pop()
+        return self.cells[player_id].pop()
+
+    def get_input(self, player_id):
+        indicator = np.full((1, self.board_size, self.board_size), 1 if player_id == 1 else 0, dtype=np.float32)
+        # the planes of white then black, each from the oldest to the newest
+        return np.concatenate([indicator, self.stacks[2][-self.history_len:], self.stacks[1][-self.history_len:]])
+
+
+@pytest.mark.parametrize('history_len', [1, 2, 3, 4])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_history_matches_reference(history_len, seed):
+    rng = np.random.RandomState(seed)
+    history = HistoryPlanes(history_len, BOARD_SIZE)
+    reference = ReferenceHistory(history_len, BOARD_SIZE)
+    empty = set(range(BOARD_SIZE ** 2))
+
+    for _ in range(NUM_STEPS):
+        player_id = int(rng.randint(1, 3))
+        if reference.cells[player_id] and rng.random_sample() < 0.4:
+            history.pop(player_id)
+            cell = reference.pop(player_id)
+            if cell is not None:
+                empty.add(cell)
+        else:
+            # a stone on an empty cell, given as an int or a tuple, or no stone
+            cell = int(rng.choice(sorted(empty))) if empty and rng.random_sample() < 0.9 else None
+            action = cell
+            if cell is not None:
+                empty.remove(cell)
+                if rng.random_sample() < 0.5:
+                    action = idx_2_loc(cell, BOARD_SIZE)
+            history.push(player_id, action)
+            reference.push(player_id, cell)
+
+        for each in (1, 2):
+            np.testing.assert_array_equal(history.get_input(each), reference.get_input(each))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from mcts import MCTS, SearchSession
+
+BOARD_SIZE = 9
+HISTORY_LEN_PER_PLAYER = 2
+NUM_MOVES = 10
+NUM_SIMULATIONS = 150
+
+
+def snapshot(session):
+    """The board and the history planes of session, without the player indicator, which get_input rewrites."""
+    history = session.history
+    return (session.board.state.copy(), history.planes[1:].copy(), list(history.heads),
+            [list(cells) for cells in history.cells])
+
+
+def play(evaluator, tree, make_unmake, seed):
+    """The actions and pi of NUM_MOVES moves, checking that every search leaves the board and the history as it
+    found them."""
+    np.random.seed(seed)
+    mcts = MCTS(BOARD_SIZE, evaluator=evaluator, tree=tree, make_unmake=make_unmake)
+    session = SearchSession(mcts, HISTORY_LEN_PER_PLAYER)
+    actions, pis = [], []
+    for _ in range(NUM_MOVES):
+        state, planes, heads, cells = snapshot(session)
+        action, pi = session.search(NUM_SIMULATIONS)
+        new_state, new_planes, new_heads, new_cells = snapshot(session)
+        np.testing.assert_array_equal(new_state, state)
+        np.testing.assert_array_equal(new_planes, planes)
+        assert (new_heads, new_cells) == (heads, cells)
+
+        actions.append(action)
+        pis.append(pi)
+        session.advance(action)
+        if session.is_over():
+            break
+    return actions, np.array(pis)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_make_unmake_matches_copying(linear_evaluator, seed):
+    results, inputs = [], []
+    for tree in ('array', 'node'):
+        for make_unmake in (True, False):
+            evaluator = linear_evaluator(BOARD_SIZE, HISTORY_LEN_PER_PLAYER)
+            results.append(play(evaluator, tree, make_unmake, seed))
+            inputs.append(np.stack(evaluator.inputs))
+
+    actions, pis = results[0]
+    for each_actions, each_pis in results[1:]:
+        assert each_actions == actions
+        np.testing.assert_allclose(each_pis, pis)
+    for each_inputs in inputs[1:]:
+        np.testing.assert_array_equal(each_inputs, inputs[0])
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from mcts import MCTS, SearchSession
+from native_mcts import NativeMCTS
+
+BOARD_SIZE = 9
+HISTORY_LEN_PER_PLAYER = 2
+NUM_MOVES = 30
+NUM_SIMULATIONS = 100
+
+
+@pytest.mark.parametrize('num_parallel_leaves', [1, 4])
+@pytest.mark.parametrize('pruning', [None, 'forced', 'radius', 'forced_radius'])
+def test_native_search_matches_mcts(linear_evaluator, num_parallel_leaves, pruning):
+    # every leaf gets its own priors and value, which pins the inputs built by the native tree as well as its search
+    evaluator = linear_evaluator(BOARD_SIZE, HISTORY_LEN_PER_PLAYER)
+    sessions = [SearchSession(mcts_cls(BOARD_SIZE, strategy='deterministically', add_noise=False, evaluator=evaluator,
+                                       num_parallel_leaves=num_parallel_leaves, pruning=pruning),
+                              HISTORY_LEN_PER_PLAYER)
+                for mcts_cls in (MCTS, NativeMCTS)]
+    session, native_session = sessions
+
+    for move in range(NUM_MOVES):
+        action, pi = session.search(NUM_SIMULATIONS)
+        native_action, native_pi = native_session.search(NUM_SIMULATIONS)
+        assert native_action == action, 'move {move}'.format(move=move)
+        np.testing.assert_allclose(native_pi, pi, atol=1e-6, err_msg='move {move}'.format(move=move))
+        assert native_session.root.result == session.root.result, 'move {move}'.format(move=move)
+        assert native_session.num_simulations == session.num_simulations, 'move {move}'.format(move=move)
+
+        for each in sessions:
+            each.advance(action)
+        if session.is_over():
+            break
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from board import Board
+from mcts import MCTS, SearchSession, init_history
+
+BOARD_SIZE = 9
+NUM_MOVES = 10
+NUM_SIMULATIONS = 200
+
+
+def walk(node):
+    """The expanded nodes of the array tree below node, including itself."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.actions is not None:
+            yield node
+            stack.extend(node.child_nodes.values())
+
+
+@pytest.mark.parametrize('pruning', [None, 'forced'])
+def test_parallel_leaves_leave_no_virtual_loss(pruning):
+    # a virtual loss left on an edge would take its value sum far below -N, as the values are within [-1, 1]
+    np.random.seed(0)
+    mcts = MCTS(BOARD_SIZE, use_nn=False, num_parallel_leaves=8, virtual_loss=1000, pruning=pruning)
+    session = SearchSession(mcts, 2)
+    for _ in range(NUM_MOVES):
+        root = session.root
+        # the first simulation on an unexpanded root expands it without passing through a child
+        num_visits = root.N.sum() if root.actions is not None else -1
+        num_simulations = session.num_simulations
+        action, _ = session.search(NUM_SIMULATIONS)
+        assert root.N.sum() - num_visits == session.num_simulations - num_simulations
+
+        for node in walk(root):
+            assert (np.abs(node.W) <= node.N + 1e-9).all()
+            for idx, child_node in node.child_nodes.items():
+                if child_node.actions is not None and child_node.result is None:
+                    assert child_node.visits == node.N[idx]
+
+        session.advance(action)
+        if session.is_over():
+            break
+
+
+def test_one_parallel_leaf_matches_serial_search():
+    roots = []
+    for parallel in (False, True):
+        np.random.seed(0)
+        mcts = MCTS(BOARD_SIZE, strategy='deterministically', use_nn=False)
+        board, history = Board(BOARD_SIZE), init_history(2, BOARD_SIZE)
+        root = mcts.create_root(1)
+        if parallel:
+            for _ in range(NUM_SIMULATIONS):
+                mcts.search_parallel(root, board, history, 1)
+        else:
+            mcts.run_simulations(root, board.state, NUM_SIMULATIONS, history)
+        roots.append(root)
+
+    nodes, parallel_nodes = list(walk(roots[0])), list(walk(roots[1]))
+    assert len(parallel_nodes) == len(nodes)
+    for node, parallel_node in zip(nodes, parallel_nodes):
+        np.testing.assert_array_equal(parallel_node.actions, node.actions)
+        np.testing.assert_array_equal(parallel_node.N, node.N)
+        np.testing.assert_allclose(parallel_node.W, node.W)
+        assert parallel_node.visits == node.visits
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import torch
+
+from registry import ModelRegistry
+
+
+def test_latest_version_without_version_file(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.latest_version() == -1
+
+    # a model named before the 8 digit versions, which get_path can not find, is never the latest one
+    torch.save({}, str(tmp_path / 'model_1000.pth'))
+    torch.save({}, str(tmp_path / 'tmp_00000300.pth'))
+    assert registry.latest_version() == -1
+
+    torch.save({'step': 20}, registry.get_path(20))
+    torch.save({'step': 300}, registry.get_path(300))
+    assert registry.latest_version() == 300
+    assert registry.load(registry.latest_version()) == {'step': 300}
+
+
+def test_version_file_wins(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.publish({'step': 20}, 20)
+    torch.save({}, registry.get_path(300))
+    assert registry.latest_version() == 20
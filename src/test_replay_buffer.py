@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+
+from shards import ShardWriter
+from replay_buffer import ReplayBuffer
+
+BOARD_SIZE = 5
+IN_CHANNELS = 5
+
+
+def write_games(data_dir, game_lens, shard_size):
+    rng = np.random.RandomState(0)
+    writer = ShardWriter(data_dir, IN_CHANNELS, BOARD_SIZE, shard_size=shard_size)
+    writer.start()
+    for game_id, game_len in enumerate(game_lens):
+        xs = rng.randint(2, size=(game_len, IN_CHANNELS, BOARD_SIZE, BOARD_SIZE))
+        pis = np.full((game_len, BOARD_SIZE ** 2), 1 / BOARD_SIZE ** 2)
+        writer.put(xs, pis, np.ones(game_len), np.ones(game_len), game_id, 0)
+    writer.close()
+    return writer
+
+
+def test_games_split_over_shards_count_once(tmp_path):
+    game_lens = [4, 9, 6, 10, 3, 8]
+    writer = write_games(str(tmp_path), game_lens, shard_size=7)
+    assert writer.num_shards > 1
+
+    buffer = ReplayBuffer(str(tmp_path), window_games=len(game_lens), sampling='recency')
+    assert buffer.refresh() == sum(game_lens)
+    starts = np.concatenate([buffer._shards[path][1] for path in buffer._paths])
+    np.testing.assert_array_equal(np.flatnonzero(starts), np.cumsum([0] + game_lens[:-1]))
+
+    # every position of the newest game is 0 games old
+    assert np.allclose(np.diff(buffer._cdf[-game_lens[-1]:]), 1)
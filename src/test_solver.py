@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from board import Board
+from mcts import MCTS, SearchSession
+from native_mcts import NativeMCTS
+
+BOARD_SIZE = 6
+NUM_EMPTY = 7
+NUM_POSITIONS = 15
+NUM_SIMULATIONS = 3000
+
+
+def get_endgames(num_positions, seed=0):
+    """Random positions of BOARD_SIZE with NUM_EMPTY empty cells and no five in a row, as lists of moves."""
+    rng = np.random.RandomState(seed)
+    endgames = []
+    while len(endgames) < num_positions:
+        board, moves, player_id = Board(BOARD_SIZE), [], 1
+        for action in rng.permutation(BOARD_SIZE ** 2)[:BOARD_SIZE ** 2 - NUM_EMPTY]:
+            if board.make_move(int(action), player_id):
+                break
+            moves.append(int(action))
+            player_id = 3 - player_id
+        else:
+            endgames.append(moves)
+    return endgames
+
+
+def negamax(board, player_id):
+    """The exact value of board for player_id to move, 1 win, 0 draw or -1 loss."""
+    best = -1
+    for action in np.flatnonzero(board.state.reshape(-1) == 0):
+        action = int(action)
+        v = 1 if board.make_move(action, player_id) else -negamax(board, 3 - player_id)
+        board.unmake_move(action)
+        best = max(best, v)
+        if best == 1:
+            break
+    return best if (board.state == 0).any() else 0
+
+
+@pytest.fixture(scope='module')
+def endgames():
+    """The endgames as (moves, exact value for the player to move)."""
+    res = []
+    for moves in get_endgames(NUM_POSITIONS):
+        board = Board(BOARD_SIZE)
+        for i, action in enumerate(moves):
+            board.make_move(action, 1 + i % 2)
+        res.append((moves, negamax(board, 1 + len(moves) % 2)))
+    return res
+
+
+@pytest.mark.parametrize('mcts_cls, tree, make_unmake, num_parallel_leaves, pruning', [
+    (MCTS, 'array', True, 1, None),
+    (MCTS, 'array', True, 8, None),
+    (MCTS, 'array', False, 1, None),
+    (MCTS, 'node', True, 1, None),
+    (MCTS, 'node', False, 1, None),
+    (MCTS, 'array', True, 8, 'forced'),
+    (NativeMCTS, None, None, 1, None),
+    (NativeMCTS, None, None, 8, 'forced'),
+])
+def test_proven_values_match_negamax(endgames, mcts_cls, tree, make_unmake, num_parallel_leaves, pruning):
+    kwargs = {'tree': tree, 'make_unmake': make_unmake} if mcts_cls is MCTS else {}
+    num_proven = 0
+    for i, (moves, exact) in enumerate(endgames):
+        np.random.seed(i)
+        mcts = mcts_cls(BOARD_SIZE, strategy='deterministically', use_nn=False, add_noise=False,
+                        num_parallel_leaves=num_parallel_leaves, pruning=pruning, **kwargs)
+        session = SearchSession(mcts, history_len_per_player=2)
+        for action in moves:
+            session.advance(action)
+        player_id = session.player_id
+        action, _ = session.search(NUM_SIMULATIONS)
+
+        result = session.root.result
+        if result is None:
+            continue
+        num_proven += 1
+        assert result == exact, 'position {i}'.format(i=i)
+        if result >= 0:
+            # the move played keeps the proven value
+            board = session.board
+            v = 1 if board.make_move(action, player_id) else -negamax(board, 3 - player_id)
+            board.unmake_move(action)
+            assert v == exact, 'position {i}'.format(i=i)
+    assert num_proven > 0
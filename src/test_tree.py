@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+import pytest
+
+from mcts import MCTS, SearchSession
+
+BOARD_SIZE = 9
+NUM_MOVES = 12
+NUM_SIMULATIONS = 200
+
+
+def play(tree, make_unmake, seed):
+    """The actions and pi of NUM_MOVES moves searched with random priors and values under seed."""
+    np.random.seed(seed)
+    session = SearchSession(MCTS(BOARD_SIZE, use_nn=False, tree=tree, make_unmake=make_unmake), 2)
+    actions, pis = [], []
+    for _ in range(NUM_MOVES):
+        action, pi = session.search(NUM_SIMULATIONS)
+        actions.append(action)
+        pis.append(pi)
+        session.advance(action)
+        if session.is_over():
+            break
+    return actions, np.array(pis)
+
+
+@pytest.mark.parametrize('make_unmake', [True, False])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_node_tree_matches_array_tree(make_unmake, seed):
+    actions, pis = play('array', make_unmake, seed)
+    node_actions, node_pis = play('node', make_unmake, seed)
+    assert node_actions == actions
+    np.testing.assert_allclose(node_pis, pis)
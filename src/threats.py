@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import numpy as np
+
+# the flags of every cell returned by BitBoard.scan_threats for the player to move
+WIN = 1                  # the player makes five
+BLOCK = 2                # the opponent would make five, i.e. a forced block
+FOUR = 4                 # the player makes a four, i.e. threatens five
+DOUBLE_FOUR = 8          # the player makes two threats of five at once, e.g. an open four, which wins
+OPPONENT_FOUR = 16
+OPPONENT_DOUBLE_FOUR = 32  # e.g. where an open three of the opponent becomes an open four
+
+
+def get_radius_mask(state, radius):
+    """The empty cells within radius cells of a stone in both directions, or every empty cell if there is none, e.g.
+    on an empty board.
+
+    :param state: the state with shape (board_size, board_size)
+    :return: a bool array with shape (board_size ** 2,)
+    """
+    stones = state != 0
+    if not stones.any():
+        return np.ones(state.size, dtype=bool)
+
+    # dilate the stones by radius in both directions with shifted ors over a padded copy
+    board_size = state.shape[0]
+    padded = np.zeros((board_size + 2 * radius,) * 2, dtype=bool)
+    padded[radius:radius + board_size, radius:radius + board_size] = stones
+    rows = np.zeros((board_size, board_size + 2 * radius), dtype=bool)
+    for dx in range(2 * radius + 1):
+        rows |= padded[dx:dx + board_size]
+    near = np.zeros((board_size, board_size), dtype=bool)
+    for dy in range(2 * radius + 1):
+        near |= rows[:, dy:dy + board_size]
+    mask = near & ~stones
+    return (mask if mask.any() else ~stones).reshape(-1)
+
+
+class MovePruner(object):
+    """
+    Restricts the moves a leaf of MCTS is expanded with, from the threats found by BitBoard.scan_threats in one pass.
+
+    'forced' expands only the forced moves of a tactical position, in the order of urgency: the wins of the player to
+    move, the blocks of the fours of the opponent, the moves making an open four, and the moves stopping an open
+    three of the opponent plus the fours of the player, which gain a tempo. Quiet positions keep every empty cell.
+    'radius' expands only the empty cells within radius cells of a stone. 'forced_radius' applies 'radius' to the
+    quiet positions of 'forced'.
+
+    The forced modes also know the value of the positions which are decided, i.e. a win on the next move, an open
+    four the opponent can not stop or two fours of the opponent, so the network is not called for them.
+    """
+
+    def __init__(self, mode='forced', radius=2):
+        """
+        :param mode: 'forced', 'radius' or 'forced_radius'
+        :param radius: the max distance in cells of a move to a stone for 'radius' and 'forced_radius'
+        """
+        if mode not in ('forced', 'radius', 'forced_radius'):
+            raise ValueError('Unknown pruning!!!')
+        self.mode = mode
+        self.radius = radius
+
+    def prune(self, board, player_id):
+        """Return the actions to expand a position with and its value if it is decided.
+
+        :param board: an instance of the Board class holding the position
+        :param player_id: the player to move
+        :return:
+            actions: the indexes of the cells to expand
+            v: the value of the position for the player to move, 1 or -1 if it is decided and None otherwise
+        """
+        if self.mode == 'radius':
+            return np.flatnonzero(get_radius_mask(board.state, self.radius)), None
+
+        flags = board.bitboard.scan_threats(player_id)
+        wins = np.flatnonzero(flags & WIN)
+        if len(wins):
+            return wins, 1.0
+
+        blocks = np.flatnonzero(flags & BLOCK)
+        if len(blocks):
+            # two fours of the opponent can not both be blocked
+            return blocks, -1.0 if len(blocks) > 1 else None
+
+        double_fours = np.flatnonzero(flags & DOUBLE_FOUR)
+        if len(double_fours):
+            return double_fours, 1.0
+
+        if (flags & OPPONENT_DOUBLE_FOUR).any():
+            return np.flatnonzero(flags & (OPPONENT_DOUBLE_FOUR | FOUR)), None
+
+        if self.mode == 'forced_radius':
+            return np.flatnonzero(get_radius_mask(board.state, self.radius)), None
+        return np.flatnonzero(board.state.reshape(-1) == 0), None
@@ -6,5 +6,181 @@ Created on 2020/4/22
 @author: Siqi Miao
 """
 
-# TODO: 1. one thread to check if we have enough data to continue training
-# TODO: 2. train and save the model
+import os
+import math
+import time
+
+import torch
+import torch.nn.functional as F
+from torch.utils.tensorboard import SummaryWriter
+
+from config import TrainConfig
+from model import Model
+from registry import ModelRegistry, atomic_save
+from replay_buffer import build_data_loader
+
+
+class Trainer(object):
+    """
+    Trains Model on the self-play shards with the AlphaZero loss, i.e. the cross entropy between pi and the policy
+    plus the mean squared error between z and the value.
+
+    Every checkpoint_every steps the weights are published to the ModelRegistry of model_dir with the step as the
+    version, which self-play swaps in within seconds, and the optimizer state is saved as trainer_state.pth so that
+    a run can be resumed.
+    """
+
+    def __init__(self, config):
+        """
+        :param config: an instance of the TrainConfig class
+        """
+        self.config = config
+        if config.device is None:
+            config.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = torch.device(config.device)
+        if config.num_threads is not None:
+            torch.set_num_threads(config.num_threads)
+        torch.manual_seed(config.seed)
+
+        self.model = Model(config.in_channels, num_filters=config.num_filters, num_blocks=config.num_blocks,
+                           board_size=config.board_size).to(self.device)
+        self.optimizer = self.build_optimizer()
+        self.scheduler = torch.optim.lr_scheduler.LambdaLR(self.optimizer, self.get_lr_factor)
+        # float16 needs loss scaling on cuda, bfloat16 on cpu does not
+        self.amp_dtype = torch.float16 if self.device.type == 'cuda' else torch.bfloat16
+        use_scaler = config.amp and self.device.type == 'cuda'
+        # torch.amp.GradScaler replaces torch.cuda.amp.GradScaler from torch 2.3 on
+        self.scaler = torch.amp.GradScaler('cuda', enabled=use_scaler) if hasattr(torch.amp, 'GradScaler') \
+            else torch.cuda.amp.GradScaler(enabled=use_scaler)
+        self.step = 0
+
+        os.makedirs(config.model_dir, exist_ok=True)
+        self.registry = ModelRegistry(config.model_dir)
+        self.restore()
+
+    def build_optimizer(self):
+        config = self.config
+        if config.optimizer == 'sgd':
+            return torch.optim.SGD(self.model.parameters(), lr=config.lr, momentum=config.momentum,
+                                   weight_decay=config.weight_decay, nesterov=config.momentum > 0)
+        elif config.optimizer == 'adam':
+            return torch.optim.AdamW(self.model.parameters(), lr=config.lr, weight_decay=config.weight_decay)
+        else:
+            raise ValueError('Unknown optimizer!!!')
+
+    def get_lr_factor(self, step):
+        """The learning rate at step as a multiple of config.lr."""
+        config = self.config
+        if step < config.warmup_steps:
+            return (step + 1) / config.warmup_steps
+
+        if config.lr_schedule == 'constant':
+            return 1.0
+        elif config.lr_schedule == 'step':
+            return config.lr_gamma ** sum(step >= milestone for milestone in config.lr_milestones)
+        elif config.lr_schedule == 'cosine':
+            progress = (step - config.warmup_steps) / max(1, config.num_steps - config.warmup_steps)
+            return 0.5 * (1 + math.cos(math.pi * min(1.0, progress)))
+        else:
+            raise ValueError('Unknown lr schedule!!!')
+
+    @staticmethod
+    def compute_loss(logits, v, pi, z):
+        policy_loss = -(pi * F.log_softmax(logits.float(), dim=1)).sum(dim=1).mean()
+        value_loss = F.mse_loss(v.float().reshape(-1), z)
+        return policy_loss + value_loss, policy_loss, value_loss
+
+    def train_step(self, x, pi, z):
+        non_blocking = self.device.type == 'cuda'
+        x = x.to(self.device, non_blocking=non_blocking)
+        pi = pi.to(self.device, non_blocking=non_blocking)
+        z = z.to(self.device, non_blocking=non_blocking)
+
+        # torch.autocast needs torch 1.10, see requirements.txt
+        with torch.autocast(self.device.type, dtype=self.amp_dtype, enabled=self.config.amp):
+            logits, v = self.model(x)
+        loss, policy_loss, value_loss = self.compute_loss(logits, v, pi, z)
+
+        self.optimizer.zero_grad(set_to_none=True)
+        self.scaler.scale(loss).backward()
+        self.scaler.step(self.optimizer)
+        self.scaler.update()
+        self.scheduler.step()
+        self.step += 1
+        return loss.item(), policy_loss.item(), value_loss.item()
+
+    def save_checkpoint(self):
+        """Save the state of the training and publish the weights for self-play, each by an atomic rename."""
+        state_dict = {k: v.cpu() for k, v in self.model.state_dict().items()}
+        atomic_save({'step': self.step, 'model': state_dict, 'optimizer': self.optimizer.state_dict(),
+                     'scheduler': self.scheduler.state_dict(), 'scaler': self.scaler.state_dict()},
+                    os.path.join(self.config.model_dir, 'trainer_state.pth'))
+        self.registry.publish(state_dict, self.step)
+
+    def restore(self):
+        path = os.path.join(self.config.model_dir, 'trainer_state.pth')
+        if not os.path.exists(path):
+            return
+        state = torch.load(path, map_location=self.device)
+        self.model.load_state_dict(state['model'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.scheduler.load_state_dict(state['scheduler'])
+        self.scaler.load_state_dict(state['scaler'])
+        self.step = state['step']
+
+    def build_data_loader(self):
+        config = self.config
+        return build_data_loader(config.data_dir, config.batch_size, num_workers=config.num_loader_workers,
+                                 prefetch_factor=config.prefetch_factor, seed=config.seed + self.step,
+                                 pin_memory=self.device.type == 'cuda', window_games=config.window_games,
+                                 sampling=config.sampling, half_life_games=config.half_life_games,
+                                 augment=config.augment)
+
+    def train(self, num_steps=None):
+        """Train until step num_steps, config.num_steps by default."""
+        config = self.config
+        num_steps = config.num_steps if num_steps is None else num_steps
+        writer = SummaryWriter(config.log_dir)
+        data_iter = iter(self.build_data_loader())
+        self.model.train()
+
+        losses = [0.0, 0.0, 0.0]
+        num_logged, num_samples, data_time = 0, 0, 0.0
+        tik = time.time()
+        while self.step < num_steps:
+            data_tik = time.time()
+            x, pi, z = next(data_iter)
+            data_time += time.time() - data_tik
+
+            for i, each in enumerate(self.train_step(x, pi, z)):
+                losses[i] += each
+            num_logged += 1
+            num_samples += len(x)
+
+            if self.step % config.log_every == 0:
+                elapsed = time.time() - tik
+                for name, total in zip(('total', 'policy', 'value'), losses):
+                    writer.add_scalar('loss/' + name, total / num_logged, self.step)
+                writer.add_scalar('lr', self.scheduler.get_last_lr()[0], self.step)
+                writer.add_scalar('throughput/samples_per_sec', num_samples / elapsed, self.step)
+                writer.add_scalar('throughput/data_wait_ratio', data_time / elapsed, self.step)
+                print('step: {step}, loss: {loss:.4f}, policy: {p:.4f}, value: {v:.4f}, samples/sec: {sps:.1f}, '
+                      'data wait: {wait:.1%}'.format(step=self.step, loss=losses[0] / num_logged,
+                                                      p=losses[1] / num_logged, v=losses[2] / num_logged,
+                                                      sps=num_samples / elapsed, wait=data_time / elapsed))
+                losses = [0.0, 0.0, 0.0]
+                num_logged, num_samples, data_time = 0, 0, 0.0
+                tik = time.time()
+
+            if self.step % config.checkpoint_every == 0:
+                self.save_checkpoint()
+
+        if self.step % config.checkpoint_every != 0:
+            self.save_checkpoint()
+        writer.close()
+
+
+if __name__ == '__main__':
+
+    config = TrainConfig(num_threads=os.cpu_count())
+    Trainer(config).train()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+Created on 2026/10/18
+
+@author: Siqi Miao
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ZobristHash(object):
+    """
+    Zobrist keys of a board, so that the same stones reached in different move orders get the same hash.
+    """
+
+    def __init__(self, board_size, seed=0):
+        self.board_size = board_size
+        num_actions = board_size ** 2
+
+        rng = np.random.RandomState(seed)
+        # key_array[player_id, cell], where row 0 is for empty cells and is thus all zeros
+        self.key_array = np.zeros((3, num_actions), dtype=np.uint64)
+        self.key_array[1:] = rng.randint(0, 2**63, size=(2, num_actions), dtype=np.uint64)
+        self.keys = self.key_array.tolist()  # python ints are faster to xor one by one
+        self.side_keys = [0] + rng.randint(0, 2**63, size=2, dtype=np.uint64).tolist()
+        self._cells = np.arange(num_actions)
+
+    def hash_state(self, state):
+        """The hash of all the stones of a state."""
+        return int(np.bitwise_xor.reduce(self.key_array[state.reshape(-1), self._cells]))
+
+    def hash_states(self, states):
+        """The hashes of a batch of flattened states with shape (batch, num_actions), as a uint64 array."""
+        return np.bitwise_xor.reduce(self.key_array[states, self._cells], axis=1)
+
+    def update(self, position_hash, cell, player_id):
+        """The hash after player_id puts or removes a stone at cell."""
+        return position_hash ^ self.keys[player_id][cell]
+
+    def get_key(self, position_hash, player_id):
+        """The key of a position with player_id to move."""
+        return position_hash ^ self.side_keys[player_id]
+
+
+class EvaluationCache(object):
+    """
+    LRU cache of network outputs (probs, v) keyed by ZobristHash.get_key, bounded by memory.
+
+    It is shared by all the simulations of a search and kept across moves, and it counts hits and misses so that
+    the saved network calls can be seen. The network input also contains history planes, which the key ignores,
+    so a transposition reuses the output of the first move order evaluated.
+    """
+
+    entry_overhead = 200  # rough bytes of the dict entry, the key, the tuple and the array header
+
+    def __init__(self, max_mb=64):
+        self.max_bytes = int(max_mb * 2**20)
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, probs, v):
+        probs = np.asarray(probs, dtype=np.float32)
+        size = probs.nbytes + self.entry_overhead
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.num_bytes -= old[0].nbytes + self.entry_overhead
+            self._entries[key] = (probs, v)
+            self.num_bytes += size
+
+            # evict the least recently used entries
+            while self.num_bytes > self.max_bytes and self._entries:
+                _, (old_probs, _) = self._entries.popitem(last=False)
+                self.num_bytes -= old_probs.nbytes + self.entry_overhead
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.num_bytes = 0
+
+    def get_stats(self):
+        num_lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / num_lookups if num_lookups else 0.0,
+                'entries': len(self._entries), 'mb': self.num_bytes / 2**20}